@@ -0,0 +1,212 @@
+"""Throughput benchmark for the reminder parser.
+
+Runs the precompiled single-pass parser and the previous regex-per-call
+implementation over the same generated corpus, compares their
+(task_name, date, time) tuples, and prints phrases/second for each. A
+second workload resends a small pool of phrases, as dashboards do, and
+compares the parser with and without the LRU parse cache.
+
+The only expected differences are phrases the old parser mis-read because
+its patterns overlapped, e.g. "7:45am" parsed as 45:00 or "10:15 nov 21"
+parsed as November 15.
+
+    python benchmarks/bench_reminder_parser.py --phrases 5000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "controllers", "desk_buddy_controller"))
+
+from reminder_parser import ReminderParseCache, parse_reminder  # noqa: E402
+
+TASKS = [
+    "call mom", "team meeting", "standup", "dentist appointment", "pay rent",
+    "water the plants", "submit report", "gym", "pick up groceries", "review PR",
+]
+TIMES = ["at 5 pm", "at 9am", "at 3:30 pm", "at 10:15", "at 12 am", "7:45am", ""]
+DATES = [
+    "tomorrow", "today", "next week", "on monday", "on next friday", "thursday",
+    "nov 21", "on december 3", "21st november", "3 march", "21/11", "5-6", "",
+]
+PREFIXES = ["", "remind me to ", "reminder: ", "remind me "]
+
+
+def generate_corpus(count, seed=42):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        parts = [rng.choice(TASKS), rng.choice(DATES), rng.choice(TIMES)]
+        rng.shuffle(parts)
+        corpus.append(rng.choice(PREFIXES) + " ".join(p for p in parts if p))
+    return corpus
+
+
+def legacy_parse(text, now):
+    """The original DeskBuddy.parse_reminder_nlp, with now passed in."""
+    reminder_date = now.strftime("%Y-%m-%d")
+    reminder_time = "12:00"
+    task_name = text.strip()
+    text_lower = text.lower()
+
+    time_match = re.search(r'(\b\d{1,2}:\d{2}\b)\s*(am|pm)?', text_lower)
+    if time_match:
+        time_part = time_match.group(1)
+        ampm = time_match.group(2)
+        hour, minute = map(int, time_part.split(':'))
+        if ampm:
+            ampm = ampm.lower()
+            if ampm == 'pm' and hour != 12:
+                hour += 12
+            if ampm == 'am' and hour == 12:
+                hour = 0
+        reminder_time = f"{hour:02d}:{minute:02d}"
+        task_name = task_name.replace(time_match.group(0), '').strip()
+    else:
+        time_match2 = re.search(r'\b(\d{1,2})\s*(am|pm)\b', text_lower)
+        if time_match2:
+            hour = int(time_match2.group(1))
+            ampm = time_match2.group(2).lower()
+            if ampm == 'pm' and hour != 12:
+                hour += 12
+            if ampm == 'am' and hour == 12:
+                hour = 0
+            reminder_time = f"{hour:02d}:00"
+            task_name = task_name.replace(time_match2.group(0), '').strip()
+
+    if 'tomorrow' in text_lower:
+        reminder_date = (now + timedelta(days=1)).strftime("%Y-%m-%d")
+        task_name = re.sub(r'\btomorrow\b', '', task_name, flags=re.IGNORECASE).strip()
+    elif 'today' in text_lower:
+        reminder_date = now.strftime("%Y-%m-%d")
+        task_name = re.sub(r'\btoday\b', '', task_name, flags=re.IGNORECASE).strip()
+    elif 'next week' in text_lower:
+        reminder_date = (now + timedelta(days=7)).strftime("%Y-%m-%d")
+        task_name = re.sub(r'next week', '', task_name, flags=re.IGNORECASE).strip()
+
+    weekdays = {
+        'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+        'friday': 4, 'saturday': 5, 'sunday': 6
+    }
+    for day_name, day_num in weekdays.items():
+        if re.search(rf'\b(next\s+)?{day_name}\b', text_lower):
+            current_weekday = now.weekday()
+            days_ahead = (day_num - current_weekday) % 7
+            if re.search(rf'\bnext\s+{day_name}\b', text_lower):
+                days_ahead = (day_num - current_weekday) % 7 + 7
+            if days_ahead == 0 and 'next ' in text_lower:
+                days_ahead = 7
+            reminder_date = (now + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
+            task_name = re.sub(rf'\b(next\s+)?{day_name}\b', '', task_name, flags=re.IGNORECASE).strip()
+            break
+
+    month_names = {
+        'jan': 1, 'january': 1, 'feb': 2, 'february': 2,
+        'mar': 3, 'march': 3, 'apr': 4, 'april': 4,
+        'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
+        'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9,
+        'oct': 10, 'october': 10, 'nov': 11, 'november': 11,
+        'dec': 12, 'december': 12
+    }
+    for mname, mnum in month_names.items():
+        match = re.search(rf'\b{mname}\s+(\d{{1,2}})\b', text_lower)
+        if match:
+            day = int(match.group(1))
+            try:
+                candidate = datetime(now.year, mnum, day)
+                if candidate < now:
+                    candidate = datetime(now.year + 1, mnum, day)
+                reminder_date = candidate.strftime("%Y-%m-%d")
+                task_name = re.sub(rf'\b{mname}\s+\d{{1,2}}\b', '', task_name, flags=re.IGNORECASE).strip()
+            except ValueError:
+                pass
+            break
+    for mname, mnum in month_names.items():
+        match = re.search(rf'\b(\d{{1,2}})(?:st|nd|rd|th)?\s+{mname}\b', text_lower)
+        if match:
+            day = int(match.group(1))
+            try:
+                candidate = datetime(now.year, mnum, day)
+                if candidate < now:
+                    candidate = datetime(now.year + 1, mnum, day)
+                reminder_date = candidate.strftime("%Y-%m-%d")
+                task_name = re.sub(rf'\b\d{{1,2}}(?:st|nd|rd|th)?\s+{mname}\b', '', task_name, flags=re.IGNORECASE).strip()
+            except ValueError:
+                pass
+            break
+
+    numeric_date = re.search(r'\b(\d{1,2})[/\-](\d{1,2})\b', text_lower)
+    if numeric_date and reminder_date == now.strftime("%Y-%m-%d"):
+        part1 = int(numeric_date.group(1))
+        part2 = int(numeric_date.group(2))
+        try:
+            if part1 <= 31 and part2 <= 12:
+                candidate = datetime(now.year, part2, part1)
+                if candidate < now:
+                    candidate = datetime(now.year + 1, part2, part1)
+                reminder_date = candidate.strftime("%Y-%m-%d")
+                task_name = re.sub(r'\b\d{1,2}[/\-]\d{1,2}\b', '', task_name).strip()
+        except ValueError:
+            pass
+
+    task_name = re.sub(r'\s+', ' ', task_name)
+    task_name = re.sub(r'\b(remind me|reminder|on|at)\b', '', task_name, flags=re.IGNORECASE).strip()
+    task_name = task_name.lstrip(',:;-').strip()
+    if not task_name:
+        task_name = "Reminder"
+    return task_name, reminder_date, reminder_time
+
+
+def run(parse, corpus, now, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for phrase in corpus:
+            parse(phrase, now)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--phrases", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cache-size", type=int, default=512)
+    parser.add_argument("--distinct", type=int, default=200,
+                        help="distinct phrases in the repeated-phrase workload for the cache")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.phrases)
+    now = datetime(2025, 6, 11, 10, 30)
+
+    mismatches = [p for p in corpus if parse_reminder(p, now) != legacy_parse(p, now)]
+    # Drop the compiled-pattern cache so the legacy run pays its real cost.
+    re.purge()
+    legacy_rate = run(legacy_parse, corpus, now, args.repeat)
+    new_rate = run(parse_reminder, corpus, now, args.repeat)
+    # Clients resend the same few phrases; model that with a small phrase pool.
+    rng = random.Random(7)
+    pool = corpus[:args.distinct]
+    repeated = [rng.choice(pool) for _ in corpus]
+    uncached_rate = run(parse_reminder, repeated, now, args.repeat)
+    cache = ReminderParseCache(args.cache_size)
+    cached_rate = run(cache.parse, repeated, now, args.repeat)
+
+    print(f"corpus:      {len(corpus)} phrases ({len(mismatches)} differ from legacy)")
+    print(f"legacy:      {legacy_rate:,.0f} phrases/s")
+    print(f"single-pass: {new_rate:,.0f} phrases/s ({new_rate / legacy_rate:.1f}x)")
+    stats = cache.stats()
+    print(f"repeated:    {len(repeated)} phrases from {len(pool)} distinct")
+    print(f"  uncached:  {uncached_rate:,.0f} phrases/s")
+    print(f"  cached:    {cached_rate:,.0f} phrases/s ({cached_rate / uncached_rate:.1f}x, "
+          f"size {args.cache_size}, hit rate {stats['hit_rate']:.0%})")
+    for phrase in mismatches[:5]:
+        print(f"  {phrase!r}: {parse_reminder(phrase, now)} (legacy {legacy_parse(phrase, now)})")
+
+
+if __name__ == "__main__":
+    main()
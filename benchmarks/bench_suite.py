@@ -0,0 +1,380 @@
+"""Benchmark suite for the controller's hot paths, with JSON results.
+
+Builds a DeskBuddy on the headless mock_controller (installed as the
+`controller` module, so Webots is never loaded) with its task API pointed
+at an in-memory StubTaskService and its sync journal and task database
+in a temp directory, then times:
+
+    parse.unique / parse.repeated   parse_reminder_nlp over a generated corpus
+    command.flask.<action>          POST /command through the Flask test client
+    run_async.roundtrip / .burst    executor submit -> finished, one at a time and in bursts
+    keyboard.dispatch               per-step drain + handle_keys while typing reminders
+    list_tasks_vocal.<n>            nearest/upcoming ordering and listing of n tasks
+    actuators.step                  step loop with overlapping plans and speech; reports
+                                    setpoints requested vs device writes made (and saved)
+
+Results are written as JSON (stdout, or --output). Pass an earlier file
+as --compare to print the change per benchmark; the exit status is 1 when
+any us_per_op got slower by more than --tolerance.
+
+    python benchmarks/bench_suite.py --output before.json
+    python benchmarks/bench_suite.py --compare before.json --output after.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONTROLLER_DIR = os.path.join(HERE, "..", "controllers", "desk_buddy_controller")
+sys.path.insert(0, CONTROLLER_DIR)
+
+import mock_controller  # noqa: E402
+from bench_reminder_parser import generate_corpus  # noqa: E402
+from stub_task_service import StubTaskService  # noqa: E402
+
+# Always the mock, even where the Webots controller module is importable.
+sys.modules["controller"] = mock_controller
+
+
+# -----------------------
+# Measurement
+# -----------------------
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def best_of(repeat, func):
+    """Run func() repeat times; returns the fastest wall time in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def result(ops, seconds, samples=None, **extra):
+    out = {
+        "ops": ops,
+        "seconds": round(seconds, 6),
+        "ops_per_s": round(ops / seconds, 1) if seconds else 0.0,
+        "us_per_op": round(1e6 * seconds / ops, 3) if ops else 0.0,
+    }
+    if samples:
+        out["p50_us"] = round(1e6 * percentile(samples, 50), 3)
+        out["p99_us"] = round(1e6 * percentile(samples, 99), 3)
+    out.update(extra)
+    return out
+
+
+def generate_tasks(count, now, seed=3):
+    """count dated tasks spread a month either side of now, a few undated."""
+    rng = random.Random(seed)
+    names = ["call mom", "standup", "pay rent", "gym", "review PR", "dentist", "submit report"]
+    tasks = []
+    for i in range(count):
+        task = {"id": f"bench-{i}", "name": f"{rng.choice(names)} {i}", "type": "reminder"}
+        if rng.random() < 0.98:
+            due = now + timedelta(minutes=rng.randint(-43200, 43200))
+            task["date"], task["time"] = due.strftime("%Y-%m-%d"), due.strftime("%H:%M")
+        tasks.append(task)
+    return tasks
+
+
+def wait_for_sync(bot, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while bot.sync_queue.stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+# -----------------------
+# Benchmarks
+# -----------------------
+def bench_parse(bot, args):
+    from reminder_parser import ReminderParseCache
+
+    corpus = generate_corpus(args.phrases)
+    rng = random.Random(7)
+    pool = corpus[:args.distinct]
+    repeated = [rng.choice(pool) for _ in corpus]
+
+    def run(phrases):
+        # A fresh cache per run, so every run starts cold.
+        bot.parse_cache = ReminderParseCache(bot.parse_cache_size)
+        for phrase in phrases:
+            bot.parse_reminder_nlp(phrase)
+
+    unique = best_of(args.repeat, lambda: run(corpus))
+    seconds = best_of(args.repeat, lambda: run(repeated))
+    hit_rate = bot.parse_cache.stats()["hit_rate"]
+    return {
+        "parse.unique": result(len(corpus), unique),
+        "parse.repeated": result(len(repeated), seconds, distinct=len(pool), hit_rate=hit_rate),
+    }
+
+
+def bench_commands(bot, args):
+    import desk_buddy_controller as dbc
+
+    client = dbc.app.test_client()
+    bodies = {
+        "list_tasks": {"action": "list_tasks", "limit": 20},
+        "add_reminder": {"action": "add_reminder", "reminder_text": "standup tomorrow at 9am"},
+        "stop_wheels": {"action": "stop_wheels"},
+    }
+    results = {}
+    for action, body in bodies.items():
+        samples = []
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            t0 = time.perf_counter()
+            response = client.post("/command", json=body)
+            samples.append(time.perf_counter() - t0)
+            if response.status_code != 200:
+                raise RuntimeError(f"/command {action} returned {response.status_code}: {response.get_data()}")
+        results[f"command.flask.{action}"] = result(args.requests, time.perf_counter() - start, samples)
+        bot.speech.clear()
+    wait_for_sync(bot)
+    return results
+
+
+def bench_run_async(bot, args):
+    def noop():
+        pass
+
+    samples = []
+    start = time.perf_counter()
+    for _ in range(args.jobs):
+        t0 = time.perf_counter()
+        bot.run_async(noop, lane="general", name="bench").wait()
+        samples.append(time.perf_counter() - t0)
+    roundtrip = result(args.jobs, time.perf_counter() - start, samples)
+
+    # Bursts the size of the lane's queue, so none is rejected.
+    burst = 16
+    start = time.perf_counter()
+    done = 0
+    while done < args.jobs:
+        jobs = [bot.run_async(noop, lane="general", name="bench") for _ in range(min(burst, args.jobs - done))]
+        for job in jobs:
+            job.wait()
+        done += len(jobs)
+    return {
+        "run_async.roundtrip": roundtrip,
+        "run_async.burst": result(done, time.perf_counter() - start, burst=burst),
+    }
+
+
+def bench_keyboard(bot, args):
+    # M opens reminder entry, ENTER (Webots key 4) adds the reminder.
+    typed = "M" + "call mom tomorrow at 5pm" + chr(4)
+    for _ in range(args.reminders):
+        bot.keyboard.type(typed)
+    samples = []
+    keys = 0
+    # type() queues each key for one step, then one step released.
+    for _ in range(2 * len(typed) * args.reminders):
+        bot.step(bot.budget.step_ms)
+        sim_time = bot.getTime()
+        t0 = time.perf_counter()
+        events = bot.keys.drain(sim_time, t0)
+        bot.handle_keys(events, sim_time)
+        bot.keys.flush_echo()
+        samples.append(time.perf_counter() - t0)
+        keys += len(events)
+    bot.speech.clear()
+    wait_for_sync(bot)
+    return {"keyboard.dispatch": result(len(samples), sum(samples), samples, keys=keys,
+                                        reminders=args.reminders)}
+
+
+def bench_actuators(bot, args):
+    # Overlapping plans fight over the wheels, head and LEDs, and speech blinks the eyes too.
+    buffered = [name for name in bot.device_writes() if name != "speaker"]
+    before = bot.device_writes()
+    requested = bot.actuators.stats()["requested"]
+    samples = []
+    for i in range(args.steps):
+        if i % 200 == 0:
+            bot.run_plan(bot.dance_plan(), wait=False)
+            bot.run_plan(bot.all_actions_plan(), wait=False)
+        bot.step(bot.budget.step_ms)
+        sim_time = bot.getTime()
+        t0 = time.perf_counter()
+        bot.scheduler.tick(sim_time)
+        bot.speech.tick(sim_time)
+        bot.flush_actuators()
+        samples.append(time.perf_counter() - t0)
+    bot.scheduler.cancel()
+    bot.speech.clear()
+    after = bot.device_writes()
+    writes = sum(after[name] - before[name] for name in buffered)
+    requested = bot.actuators.stats()["requested"] - requested
+    return {"actuators.step": result(len(samples), sum(samples), samples, requested=requested,
+                                     device_writes=writes, saved=requested - writes)}
+
+
+def bench_list_tasks_vocal(bot, service, args):
+    now = datetime.now()
+    results = {}
+    # The listing's speech is queued but not waited for: no step loop plays it here.
+    bot._wait_speech = lambda utterance: None
+    for count in args.task_counts:
+        with service.lock:
+            service.tasks = generate_tasks(count, now)
+        # A refresh merges into the local store, so start each size from empty.
+        with bot.task_lock:
+            bot.tasks.clear()
+        bot.task_cache.refresh()
+        with bot.task_lock:
+            loaded = len(bot.tasks)
+        if loaded != count:
+            raise RuntimeError(f"expected {count} tasks after refresh, found {loaded}")
+
+        def run():
+            bot.list_tasks_vocal()
+            bot.speech.clear()
+
+        repeat = max(1, args.repeat if count <= 10000 else args.repeat // 2)
+        results[f"list_tasks_vocal.{count}"] = result(1, best_of(repeat, run), tasks=count)
+    return results
+
+
+BENCHMARKS = ["parse", "command", "run_async", "keyboard", "actuators", "list_tasks_vocal"]
+
+
+# -----------------------
+# Runner
+# -----------------------
+def git_revision():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=HERE,
+                               capture_output=True, text=True).stdout.strip()
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args):
+    service = StubTaskService().start()
+    data_dir = tempfile.mkdtemp(prefix="deskbuddy-bench-")
+    os.environ["DESKBUDDY_TASK_API_URL"] = service.url
+    os.environ["DESKBUDDY_TASK_JOURNAL"] = os.path.join(data_dir, "task_journal.jsonl")
+    os.environ["DESKBUDDY_TASK_DB"] = os.path.join(data_dir, "tasks.db")
+
+    import desk_buddy_controller as dbc
+    from async_log import start_logging, stop_logging
+
+    start_logging(args.log_level, stream=sys.stderr)
+    results = {}
+    # Keyboard echo and console prompts are print()s; keep them out of the output.
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot = dbc.DeskBuddy()
+        dbc.robot_instance = bot
+        # Let the startup fetch land; after that tasks are loaded explicitly
+        # per benchmark, with no background revalidation mid-run.
+        deadline = time.monotonic() + 10.0
+        while bot.task_cache.tasks is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        bot.task_cache.ttl = float("inf")
+        for name in [n for n in BENCHMARKS if not args.only or n in args.only]:
+            print(f"running {name}...", file=sys.stderr)
+            if name == "parse":
+                results.update(bench_parse(bot, args))
+            elif name == "command":
+                results.update(bench_commands(bot, args))
+            elif name == "run_async":
+                results.update(bench_run_async(bot, args))
+            elif name == "keyboard":
+                results.update(bench_keyboard(bot, args))
+            elif name == "actuators":
+                results.update(bench_actuators(bot, args))
+            elif name == "list_tasks_vocal":
+                results.update(bench_list_tasks_vocal(bot, service, args))
+        bot.sync_queue.stop()
+        bot.tasks.close()
+        bot.executor.shutdown()
+    stop_logging()
+    service.stop()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print the change per benchmark against baseline. Returns the names that regressed."""
+    regressed = []
+    print(f"{'benchmark':32} {'baseline us':>12} {'now us':>12} {'change':>8}", file=sys.stderr)
+    for name, now in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old or not old.get("us_per_op"):
+            print(f"{name:32} {'-':>12} {now['us_per_op']:>12.3f} {'new':>8}", file=sys.stderr)
+            continue
+        change = now["us_per_op"] / old["us_per_op"] - 1
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSED"
+            regressed.append(name)
+        print(f"{name:32} {old['us_per_op']:>12.3f} {now['us_per_op']:>12.3f} {change:>+8.1%}{flag}",
+              file=sys.stderr)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per throughput benchmark (best is kept)")
+    parser.add_argument("--phrases", type=int, default=5000)
+    parser.add_argument("--distinct", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per /command action")
+    parser.add_argument("--jobs", type=int, default=2000, help="run_async jobs per mode")
+    parser.add_argument("--reminders", type=int, default=20, help="reminders typed in the keyboard benchmark")
+    parser.add_argument("--steps", type=int, default=5000, help="control steps in the actuator benchmark")
+    parser.add_argument("--task-counts", type=lambda s: [int(n) for n in s.split(",")], default=[10000, 100000])
+    parser.add_argument("--log-level", default="OFF")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    started = datetime.now()
+    results = run_suite(args)
+    report = {
+        "suite": "deskbuddy",
+        "revision": git_revision(),
+        "created": started.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressed = compare(results, baseline, args.tolerance)
+        if regressed:
+            print(f"{len(regressed)} regressed: {', '.join(regressed)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Load test for the robot control API.
+
+Opens --clients keep-alive connections and sends --requests requests on
+each, --pipeline at a time, with nothing but the standard library. It
+reports requests/second and p50/p99 latency. Point it at a running
+controller started with DESKBUDDY_API_SERVER=asyncio or =flask to compare
+the two servers under the same load.
+
+    python benchmarks/load_test_api.py --url http://localhost:8000/ping --clients 50
+    python benchmarks/load_test_api.py --url http://localhost:8000/command \\
+        --body '{"action": "list_tasks"}' --pipeline 8
+"""
+import argparse
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def build_request(url, body):
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    if body is None:
+        head = f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n\r\n"
+        return head.encode()
+    data = body.encode()
+    head = (
+        f"POST {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n"
+    )
+    return head.encode() + data
+
+
+class _Reader:
+    """Reads Content-Length framed HTTP/1.1 responses off one socket."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buf = b""
+
+    def _fill(self):
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("server closed the connection")
+        self.buf += chunk
+
+    def response(self):
+        while b"\r\n\r\n" not in self.buf:
+            self._fill()
+        head, _, rest = self.buf.partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        length = 0
+        close = False
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection":
+                close = value.strip().lower() == "close"
+        self.buf = rest
+        while len(self.buf) < length:
+            self._fill()
+        self.buf = self.buf[length:]
+        return status, close
+
+
+def client(host, port, payload, count, depth, latencies, errors):
+    sock = None
+    sent = 0
+    while sent < count:
+        try:
+            if sock is None:
+                sock = socket.create_connection((host, port))
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                reader = _Reader(sock)
+            batch = min(depth, count - sent)
+            start = time.perf_counter()
+            sock.sendall(payload * batch)
+            for _ in range(batch):
+                status, close = reader.response()
+                latencies.append(time.perf_counter() - start)
+                sent += 1
+                if status >= 400:
+                    errors.append(status)
+                if close:
+                    # Server does not keep connections alive; reconnect.
+                    sock.close()
+                    sock = None
+                    break
+        except (OSError, ValueError) as e:
+            errors.append(str(e))
+            sent += 1
+            if sock is not None:
+                sock.close()
+            sock = None
+    if sock is not None:
+        sock.close()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000/ping")
+    parser.add_argument("--body", default=None, help="JSON body; sends POST when given")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500, help="requests per client")
+    parser.add_argument("--pipeline", type=int, default=1, help="requests in flight per connection")
+    args = parser.parse_args()
+
+    parts = urlsplit(args.url)
+    payload = build_request(args.url, args.body)
+    latencies = []
+    errors = []
+    threads = [
+        threading.Thread(
+            target=client,
+            args=(parts.hostname, parts.port or 80, payload, args.requests, args.pipeline, latencies, errors),
+        )
+        for _ in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    total = len(latencies)
+    print(f"url:       {args.url} ({args.clients} clients, pipeline {args.pipeline})")
+    print(f"requests:  {total} in {elapsed:.2f}s ({total / elapsed:,.0f} req/s)")
+    print(f"latency:   p50 {1000 * percentile(latencies, 50):.2f} ms, p99 {1000 * percentile(latencies, 99):.2f} ms")
+    print(f"errors:    {len(errors)}")
+    for error in sorted(set(map(str, errors)))[:5]:
+        print(f"  {error}")
+
+
+if __name__ == "__main__":
+    main()
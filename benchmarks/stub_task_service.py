@@ -0,0 +1,119 @@
+"""In-memory stand-in for the external task service.
+
+Serves the routes TaskApiClient uses (GET, POST and DELETE on the task
+collection, POST /bulk, DELETE /<id>) from a list in memory, so the
+controller can sync tasks without the real service. bench_suite.py
+starts one on a free port; it can also run on its own for load tests:
+
+    python benchmarks/stub_task_service.py --port 3000
+    DESKBUDDY_MOCK=1 DESKBUDDY_TASK_API_URL=http://localhost:3000/api/tasks python controllers/desk_buddy_controller/desk_buddy_controller.py
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubTaskService:
+    """Task service on a background thread. port=0 picks a free port."""
+
+    def __init__(self, tasks=(), host="127.0.0.1", port=0, path="/api/tasks"):
+        self.path = path.rstrip("/")
+        self.tasks = list(tasks)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="stub-task-service", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, body=None):
+                data = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _route(self):
+                with service.lock:
+                    service.requests += 1
+                path = self.path.split("?", 1)[0]
+                if not path.startswith(service.path):
+                    return None
+                return path[len(service.path):].strip("/")
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"null")
+
+            def do_GET(self):
+                if self._route() != "":
+                    return self._reply(404, {"error": "not found"})
+                with service.lock:
+                    tasks = list(service.tasks)
+                self._reply(200, tasks)
+
+            def do_POST(self):
+                route = self._route()
+                if route not in ("", "bulk"):
+                    return self._reply(404, {"error": "not found"})
+                body = self._body()
+                created = body if route == "bulk" else [body]
+                with service.lock:
+                    service.tasks.extend(created)
+                self._reply(201, body)
+
+            def do_DELETE(self):
+                route = self._route()
+                if route is None:
+                    return self._reply(404, {"error": "not found"})
+                with service.lock:
+                    if route == "":
+                        service.tasks.clear()
+                        return self._reply(200, {"deleted": "all"})
+                    kept = [t for t in service.tasks if route not in (t.get("id"), t.get("created"))]
+                    found = len(kept) != len(service.tasks)
+                    service.tasks = kept
+                self._reply(200 if found else 404, {"deleted": route} if found else {"error": "not found"})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    args = parser.parse_args()
+    service = StubTaskService(host=args.host, port=args.port)
+    print(f"stub task service: {service.url}")
+    try:
+        service.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
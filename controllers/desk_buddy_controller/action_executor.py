@@ -0,0 +1,345 @@
+import itertools
+import threading
+import time
+from collections import deque
+
+from instrumented_lock import InstrumentedLock
+from async_log import get_logger
+from metrics import REGISTRY
+
+log = get_logger("executor")
+
+ACTION_SECONDS = REGISTRY.histogram("deskbuddy_action_seconds", "Time actions spent running, by lane and action",
+                                    ["lane", "action", "status"])
+ACTION_WAIT_SECONDS = REGISTRY.histogram("deskbuddy_action_queue_seconds", "Time actions waited in their lane queue",
+                                         ["lane"])
+
+
+# Lane name -> (worker threads, max queued jobs). One lane per actuator group
+# so that a burst of wheel commands cannot starve LED or speech work.
+DEFAULT_LANES = {
+    "wheels": (1, 8),
+    "arms": (1, 8),
+    "leds": (1, 8),
+    "speech": (1, 16),
+    "tasks": (2, 32),
+    "general": (2, 16),
+}
+
+
+_current = threading.local()
+
+
+class ActionCancelled(Exception):
+    """Raised inside an action whose job has been cancelled."""
+
+
+class CancelToken:
+    """Cooperative cancellation flag handed to every job.
+
+    Actions check it between steps (check()) and register cleanup, such as
+    cancelling their motion plan, with on_cancel().
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception as e:
+                log.error("❌ Cancel callback failed: %s", e)
+        return True
+
+    def on_cancel(self, fn):
+        """Call fn() when the token is cancelled (immediately if it already is)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+                return
+        fn()
+
+    def check(self):
+        if self._event.is_set():
+            raise ActionCancelled()
+
+
+def current_token():
+    """The CancelToken of the job running on this thread, or None."""
+    return getattr(_current, "token", None)
+
+
+class ActionJob:
+    """A unit of work queued on one executor lane."""
+
+    def __init__(self, job_id, name, lane, func, coalesce_key=None, resources=()):
+        self.id = job_id
+        self.name = name
+        self.lane = lane
+        self.func = func
+        self.coalesce_key = coalesce_key
+        # Devices the job drives; a preempting job cancels jobs that share one.
+        self.resources = frozenset(resources)
+        self.token = CancelToken()
+        self.status = "queued"
+        self.error = None
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+        self._callbacks = []
+        self._callback_lock = threading.Lock()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def add_done_callback(self, fn):
+        """Call fn(job) once the job finishes (immediately if it already has)."""
+        with self._callback_lock:
+            if not self.done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self):
+        with self._callback_lock:
+            self.done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception as e:
+                log.error("❌ Job callback failed: %s", e)
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "lane": self.lane, "status": self.status}
+
+
+class _LaneStats:
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.preempted = 0
+        # Jobs a worker ran to an end (done, failed or cancelled mid-run);
+        # the wait and run totals cover exactly these.
+        self.finished = 0
+        self.max_depth = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+
+
+class _Lane:
+    def __init__(self, name, workers, maxsize):
+        self.name = name
+        self.workers = workers
+        self.maxsize = maxsize
+        self.pending = deque()
+        self.lock = InstrumentedLock(f"executor.{name}")
+        self.cond = threading.Condition(self.lock)
+        self.running = 0
+        self.stats = _LaneStats()
+
+
+class ActionExecutor:
+    """Fixed-size worker pool with one bounded queue per actuator lane.
+
+    Jobs are admitted while their lane has room. A job submitted with a
+    coalesce key replaces the callable of an identical job that is still
+    waiting instead of growing the queue; anything else is rejected once
+    the lane is full.
+    """
+
+    def __init__(self, lanes=None, default_lane="general", on_job=None):
+        self.default_lane = default_lane
+        # on_job(job) is called when a job starts running and when it finishes.
+        self.on_job = on_job
+        self._ids = itertools.count(1)
+        # Queued and running jobs by id.
+        self._jobs = {}
+        self._lanes = {}
+        self._threads = []
+        self._shutdown = False
+        for name, (workers, maxsize) in (lanes or DEFAULT_LANES).items():
+            lane = _Lane(name, workers, maxsize)
+            self._lanes[name] = lane
+            for i in range(workers):
+                thread = threading.Thread(
+                    target=self._worker, args=(lane,), name=f"action-{name}-{i}", daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+
+    def submit(self, func, lane=None, name=None, coalesce_key=None, resources=(), preempt=False):
+        """Queue func on a lane. Returns the ActionJob, or None if rejected.
+
+        With preempt, queued and running jobs that claim any of resources
+        are cancelled first.
+        """
+        lane_obj = self._lanes.get(lane or self.default_lane, self._lanes[self.default_lane])
+        name = name or getattr(func, "__name__", "action")
+        preempted = len(self.cancel_matching(resources)) if preempt and resources else 0
+        with lane_obj.cond:
+            stats = lane_obj.stats
+            stats.preempted += preempted
+            if self._shutdown:
+                stats.rejected += 1
+                return None
+            if coalesce_key is not None:
+                for job in lane_obj.pending:
+                    if job.coalesce_key == coalesce_key:
+                        job.func = func
+                        stats.coalesced += 1
+                        return job
+            if len(lane_obj.pending) >= lane_obj.maxsize:
+                stats.rejected += 1
+                return None
+            job = ActionJob(next(self._ids), name, lane_obj.name, func, coalesce_key, resources)
+            self._jobs[job.id] = job
+            lane_obj.pending.append(job)
+            stats.submitted += 1
+            stats.max_depth = max(stats.max_depth, len(lane_obj.pending))
+            lane_obj.cond.notify()
+        return job
+
+    def _worker(self, lane):
+        while True:
+            with lane.cond:
+                while not lane.pending and not self._shutdown:
+                    lane.cond.wait()
+                if self._shutdown and not lane.pending:
+                    return
+                job = lane.pending.popleft()
+                lane.running += 1
+            job.started_at = time.perf_counter()
+            job.status = "running"
+            self._notify(job)
+            _current.token = job.token
+            try:
+                job.token.check()
+                job.func()
+                job.status = "cancelled" if job.token.cancelled else "done"
+            except ActionCancelled:
+                job.status = "cancelled"
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+                log.error("❌ Action '%s' failed: %s", job.name, e)
+            finally:
+                _current.token = None
+            job.finished_at = time.perf_counter()
+            waited = job.started_at - job.submitted_at
+            ran = job.finished_at - job.started_at
+            ACTION_WAIT_SECONDS.observe(waited, lane=job.lane)
+            ACTION_SECONDS.observe(ran, lane=job.lane, action=job.name, status=job.status)
+            with lane.cond:
+                lane.running -= 1
+                stats = lane.stats
+                if job.status == "done":
+                    stats.completed += 1
+                elif job.status == "cancelled":
+                    stats.cancelled += 1
+                else:
+                    stats.failed += 1
+                stats.finished += 1
+                stats.wait_total += waited
+                stats.wait_max = max(stats.wait_max, waited)
+                stats.run_total += ran
+                stats.run_max = max(stats.run_max, ran)
+            self._jobs.pop(job.id, None)
+            job._finish()
+            self._notify(job)
+
+    def _notify(self, job):
+        if self.on_job:
+            try:
+                self.on_job(job)
+            except Exception as e:
+                log.error("❌ Job listener failed: %s", e)
+
+    def get_job(self, job_id):
+        """A queued or running job, or None once it has finished."""
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a job: drop it if still queued, signal its token if running.
+
+        Returns the job, or None if it is unknown or already finished.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        lane = self._lanes[job.lane]
+        with lane.cond:
+            queued = job.status == "queued" and job in lane.pending
+            if queued:
+                lane.pending.remove(job)
+                job.status = "cancelled"
+                lane.stats.cancelled += 1
+        job.token.cancel()
+        if queued:
+            self._jobs.pop(job.id, None)
+            job._finish()
+            self._notify(job)
+        return job
+
+    def cancel_matching(self, resources):
+        """Cancel every queued or running job that claims one of resources."""
+        resources = frozenset(resources)
+        return [job for job in list(self._jobs.values())
+                if job.resources & resources and self.cancel(job.id) is not None]
+
+    def stats(self):
+        """Snapshot of queue depth and latency counters per lane."""
+        report = {}
+        for name, lane in self._lanes.items():
+            with lane.cond:
+                s = lane.stats
+                finished = s.finished
+                report[name] = {
+                    "workers": lane.workers,
+                    "capacity": lane.maxsize,
+                    "depth": len(lane.pending),
+                    "max_depth": s.max_depth,
+                    "running": lane.running,
+                    "submitted": s.submitted,
+                    "completed": s.completed,
+                    "failed": s.failed,
+                    "rejected": s.rejected,
+                    "coalesced": s.coalesced,
+                    "cancelled": s.cancelled,
+                    "preempted": s.preempted,
+                    "avg_wait_ms": round(1000 * s.wait_total / finished, 3) if finished else 0.0,
+                    "max_wait_ms": round(1000 * s.wait_max, 3),
+                    "avg_run_ms": round(1000 * s.run_total / finished, 3) if finished else 0.0,
+                    "max_run_ms": round(1000 * s.run_max, 3),
+                }
+        return report
+
+    def lock_stats(self):
+        """Wait-time counters for each lane's queue lock."""
+        return {lane.lock.name: lane.lock.stats() for lane in self._lanes.values()}
+
+    def shutdown(self):
+        """Stop accepting work and let workers exit once their queues drain."""
+        self._shutdown = True
+        for lane in self._lanes.values():
+            with lane.cond:
+                lane.cond.notify_all()
@@ -0,0 +1,100 @@
+from instrumented_lock import InstrumentedLock
+from async_log import get_logger
+
+log = get_logger("actuators")
+
+# Arbitration: within one step the highest priority write to a setpoint
+# wins; at equal priority the latest write wins.
+PRIORITY_MOTION = 1
+PRIORITY_STOP = 2
+
+
+class ActuatorBuffer:
+    """Per-step buffer of desired actuator setpoints.
+
+    Actions on any thread call write(); nothing touches a device until the
+    step loop calls flush(). flush() then sends each setpoint at most once
+    per step, and only if it differs from the last value sent. Every write
+    that never reaches a device (unchanged or superseded within the step)
+    is counted as saved.
+    """
+
+    def __init__(self):
+        self._lock = InstrumentedLock("actuators")
+        self._setters = {}
+        self._sent = {}
+        # key -> (priority, value) for the current step
+        self._pending = {}
+        self.requested = 0
+        self.writes = 0
+        self.unchanged = 0
+        self.superseded = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def register(self, key, setter, initial=None):
+        """Add a setpoint; setter(value) writes it to the device."""
+        self._setters[key] = setter
+        if initial is not None:
+            self._sent[key] = initial
+
+    def write(self, key, value, priority=PRIORITY_MOTION):
+        with self._lock:
+            self._write(key, value, priority)
+
+    def write_many(self, values, priority=PRIORITY_MOTION):
+        """Write several setpoints atomically, e.g. all four wheels."""
+        with self._lock:
+            for key, value in values.items():
+                self._write(key, value, priority)
+
+    def _write(self, key, value, priority):
+        self.requested += 1
+        current = self._pending.get(key)
+        if current is not None:
+            if current[0] > priority:
+                self.rejected += 1
+                return
+            self.superseded += 1
+        self._pending[key] = (priority, value)
+
+    def flush(self):
+        """Send this step's changed setpoints. Returns {key: value} of what was written."""
+        if not self._pending:
+            return {}
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        changed = {}
+        for key, (_, value) in pending.items():
+            if self._sent.get(key) == value:
+                self.unchanged += 1
+                continue
+            try:
+                self._setters[key](value)
+            except Exception as e:
+                self.errors += 1
+                log.error("❌ Actuator write %s=%s failed: %s", key, value, e)
+                continue
+            self._sent[key] = value
+            changed[key] = value
+            self.writes += 1
+        return changed
+
+    def value(self, key):
+        """Last value sent to the device."""
+        return self._sent.get(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requested": self.requested,
+                "writes": self.writes,
+                "saved": self.unchanged + self.superseded + self.rejected,
+                "unchanged": self.unchanged,
+                "superseded": self.superseded,
+                "rejected_lower_priority": self.rejected,
+                "errors": self.errors,
+            }
+
+    def lock_stats(self):
+        return {self._lock.name: self._lock.stats()}
@@ -0,0 +1,284 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+from event_bus import format_sse
+from async_log import get_logger
+
+log = get_logger("api")
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 4 * 1024 * 1024
+
+CORS_HEADERS = (
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
+    b"Access-Control-Allow-Headers: Content-Type\r\n"
+)
+
+
+class BadRequest(Exception):
+    """A request that cannot be read; answered with status, then the connection is closed."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def on_loop(handler):
+    """Mark a route handler as non-blocking, so it is called on the event loop."""
+    handler.on_loop = True
+    return handler
+
+
+class Request:
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    @property
+    def content_type(self):
+        return self.headers.get("content-type", "")
+
+    def json(self):
+        return json.loads(self.body or b"null")
+
+
+class TextResponse:
+    """A non-JSON response body, e.g. the /metrics text format."""
+
+    def __init__(self, body, content_type="text/plain; charset=utf-8", status=200):
+        self.body = body
+        self.content_type = content_type
+        self.status = status
+
+
+class StreamResponse:
+    """A response written incrementally until the client disconnects.
+
+    run(write) is a coroutine; await write(data) sends bytes. It is
+    cancelled as soon as the client closes the connection.
+    """
+
+    def __init__(self, run, content_type="text/event-stream"):
+        self.run = run
+        self.content_type = content_type
+
+
+class AsyncApiServer:
+    """Minimal asyncio HTTP/1.1 server for the robot control API.
+
+    One coroutine per connection instead of one OS thread. Connections are
+    kept alive by default, and pipelined requests are answered in order
+    from the same read buffer. Handlers are plain functions
+    handler(request) -> (payload, status). Many of them take the task lock
+    or write to SQLite, so they run on the loop's thread pool and never
+    stall other connections; only handlers marked with on_loop() are
+    called on the event loop itself. A handler may instead return an
+    awaitable (see await_job), which is awaited on the loop, or a
+    TextResponse or StreamResponse for non-JSON bodies.
+
+    Request bodies need a Content-Length: a malformed one is answered
+    with 400, and chunked uploads with 411.
+    """
+
+    def __init__(self, routes, host="0.0.0.0", port=8000, idle_timeout=30.0):
+        # routes: {(method, path): handler}
+        self.routes = routes
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self.requests = 0
+
+    def serve_forever(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request, keep_alive = await self._read_request(reader)
+                except BadRequest as e:
+                    body = json.dumps({"error": f"Bad request: {e}"}).encode()
+                    self._write_response(writer, e.status, body, "application/json", False)
+                    break
+                if request is None:
+                    break
+                status, body, content_type = await self._respond(request)
+                if isinstance(body, StreamResponse):
+                    await self._stream(reader, writer, status, body)
+                    break
+                self._write_response(writer, status, body, content_type, keep_alive)
+                # Only wait for the socket when the buffer is large; pipelined
+                # responses otherwise go out together.
+                if writer.transport.get_write_buffer_size() > 64 * 1024 or not keep_alive:
+                    await writer.drain()
+                if not keep_alive:
+                    break
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+        except asyncio.IncompleteReadError:
+            return None, False
+        except asyncio.LimitOverrunError:
+            return None, False
+        if len(head) > MAX_HEADER_BYTES:
+            return None, False
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            return None, False
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "identity").lower() != "identity":
+            raise BadRequest(HTTPStatus.LENGTH_REQUIRED, "Transfer-Encoding is not supported, send Content-Length")
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            raise BadRequest(HTTPStatus.BAD_REQUEST, "invalid Content-Length") from None
+        if length < 0:
+            raise BadRequest(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise BadRequest(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "body too large")
+        body = await reader.readexactly(length) if length else b""
+        path, _, query = target.partition("?")
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return Request(method.upper(), path, query, headers, body), keep_alive
+
+    async def _respond(self, request):
+        self.requests += 1
+        if request.method == "OPTIONS":
+            return HTTPStatus.NO_CONTENT, b"", None
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            known = any(path == request.path for _, path in self.routes)
+            status = HTTPStatus.METHOD_NOT_ALLOWED if known else HTTPStatus.NOT_FOUND
+            return status, json.dumps({"error": status.phrase}).encode(), "application/json"
+        try:
+            if getattr(handler, "on_loop", False):
+                result = handler(request)
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(None, handler, request)
+            if asyncio.iscoroutine(result):
+                result = await result
+            if isinstance(result, StreamResponse):
+                return HTTPStatus.OK, result, result.content_type
+            if isinstance(result, TextResponse):
+                return HTTPStatus(result.status), result.body.encode(), result.content_type
+            payload, status = result
+        except ValueError as e:
+            payload, status = {"error": f"Bad request: {e}"}, 400
+        except Exception as e:
+            log.exception("❌ API handler error: %s", e)
+            payload, status = {"error": "Internal server error"}, 500
+        return HTTPStatus(status), json.dumps(payload).encode(), "application/json"
+
+    async def _stream(self, reader, writer, status, response):
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {response.content_type}\r\n"
+            "Cache-Control: no-cache\r\nConnection: close\r\n"
+        ).encode()
+        writer.write(head + CORS_HEADERS + b"\r\n")
+
+        async def write(data):
+            writer.write(data)
+            await writer.drain()
+
+        task = asyncio.ensure_future(response.run(write))
+        # The client sends nothing more; EOF here means it went away.
+        closed = asyncio.ensure_future(reader.read())
+        try:
+            await asyncio.wait({task, closed}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            task.cancel()
+            closed.cancel()
+
+    @staticmethod
+    def _write_response(writer, status, body, content_type, keep_alive):
+        head = [f"HTTP/1.1 {status.value} {status.phrase}\r\n".encode()]
+        if content_type:
+            head.append(f"Content-Type: {content_type}\r\n".encode())
+        head.append(f"Content-Length: {len(body)}\r\n".encode())
+        head.append(b"Connection: keep-alive\r\n" if keep_alive else b"Connection: close\r\n")
+        head.append(CORS_HEADERS)
+        head.append(b"\r\n")
+        writer.write(b"".join(head) + body)
+
+
+async def await_job(job, timeout=None):
+    """Wait on the event loop for an executor job without blocking a thread."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def done(_job):
+        loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+    job.add_done_callback(done)
+    await asyncio.wait_for(future, timeout)
+    return job
+
+
+def sse_response(bus, request, snapshot=None, heartbeat=15.0):
+    """Stream EventBus events as Server-Sent Events.
+
+    The stream opens with a "snapshot" event (snapshot() plus the bus
+    state), then replays anything after the client's Last-Event-ID, then
+    sends each step's batch as it is flushed. A comment line every
+    heartbeat seconds lets the server notice dropped clients.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    try:
+        last_id = int(request.headers.get("last-event-id", ""))
+    except ValueError:
+        last_id = None
+
+    def snapshot_frame():
+        data = dict(snapshot() if snapshot else {})
+        data["state"] = bus.state()
+        return format_sse("snapshot", data)
+
+    async def run(write):
+        sub, missed = bus.subscribe(lambda events: loop.call_soon_threadsafe(queue.put_nowait, events),
+                                    last_id=last_id)
+        try:
+            # snapshot() takes the task lock, so it runs off the event loop.
+            frames = ["retry: 2000\n\n", await loop.run_in_executor(None, snapshot_frame)]
+            frames += [format_sse(e["type"], e, e["id"]) for e in missed]
+            await write("".join(frames).encode())
+            while True:
+                try:
+                    events = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    await write(b": keep-alive\n\n")
+                    continue
+                frames = [format_sse(e["type"], e, e["id"]) for e in events]
+                if sub.overflowed:
+                    sub.overflowed = False
+                    frames.append(await loop.run_in_executor(None, snapshot_frame))
+                await write("".join(frames).encode())
+                sub.ack(len(events))
+        finally:
+            bus.unsubscribe(sub)
+
+    return StreamResponse(run)
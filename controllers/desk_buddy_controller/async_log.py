@@ -0,0 +1,76 @@
+"""Leveled logging that never blocks the caller on stdout.
+
+Modules log through get_logger(). Once start_logging() has run, records
+go into a bounded queue and a background thread writes them out, so the
+step loop, action lanes and API handlers only pay for an enqueue. When
+the queue is full, records are dropped and counted instead of stalling
+the caller.
+
+    DESKBUDDY_LOG_LEVEL  DEBUG, INFO (default), WARNING, ERROR or OFF
+"""
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from metrics import REGISTRY
+
+LOG_LEVEL = os.environ.get("DESKBUDDY_LOG_LEVEL", "INFO")
+
+LOG_MESSAGES = REGISTRY.counter("deskbuddy_log_messages_total", "Log records accepted, by level", ["level"])
+LOG_DROPPED = REGISTRY.counter("deskbuddy_log_dropped_total", "Log records dropped because the log queue was full")
+
+_root = logging.getLogger("deskbuddy")
+_listener = None
+_handler = None
+
+
+class _DroppingQueueHandler(QueueHandler):
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+            return
+        LOG_MESSAGES.inc(level=record.levelname)
+
+
+def get_logger(name):
+    return _root.getChild(name)
+
+
+def parse_level(level):
+    level = str(level).upper()
+    if level in ("OFF", "NONE", "SILENT"):
+        return logging.CRITICAL + 10
+    value = logging.getLevelName(level)
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown log level '{level}'")
+    return value
+
+
+def start_logging(level=LOG_LEVEL, stream=None, max_queue=10000):
+    """Route deskbuddy.* records through a queue drained by a background thread."""
+    global _listener, _handler
+    _root.setLevel(parse_level(level))
+    if _listener is not None:
+        return
+    records = queue.Queue(max_queue)
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(logging.Formatter("%(message)s"))
+    _listener = QueueListener(records, output)
+    _handler = _DroppingQueueHandler(records)
+    _root.addHandler(_handler)
+    _root.propagate = False
+    _listener.start()
+
+
+def stop_logging():
+    """Write out everything still queued and stop the writer thread."""
+    global _listener, _handler
+    if _listener is not None:
+        _root.removeHandler(_handler)
+        _root.propagate = True
+        _listener.stop()
+        _listener = _handler = None
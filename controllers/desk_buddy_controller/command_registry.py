@@ -0,0 +1,266 @@
+import time
+
+from metrics import REGISTRY
+from motion_scheduler import MotionPlan
+
+# Limits for one /sequence request
+MAX_SEQUENCE_STEPS = 256
+MAX_SEQUENCE_DEPTH = 8
+MAX_SEQUENCE_SECONDS = 600.0
+
+COMMAND_SECONDS = REGISTRY.histogram("deskbuddy_command_seconds",
+                                     "Time to validate and run (inline) or queue a command, by action", ["action"])
+COMMAND_REQUESTS = REGISTRY.counter("deskbuddy_command_requests_total",
+                                    "Dispatched commands by action and response status", ["action", "status"])
+
+
+class CommandError(ValueError):
+    """A command request that fails validation (HTTP 400)."""
+
+
+class Param:
+    """One command parameter: its type, default and limits.
+
+    arg is the handler keyword it is passed as, when that differs from the
+    request field name (e.g. to avoid shadowing a builtin).
+    """
+
+    TYPES = ("number", "string", "lines")
+
+    def __init__(self, name, kind="string", default=None, required=False,
+                 minimum=None, maximum=None, max_length=None, description="", arg=None):
+        if kind not in self.TYPES:
+            raise ValueError(f"Unknown parameter type '{kind}'")
+        self.name = name
+        self.arg = arg or name
+        self.kind = kind
+        self.default = default
+        self.required = required
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_length = max_length
+        self.description = description
+
+    def coerce(self, raw):
+        if raw is None or (self.kind == "string" and raw == ""):
+            if self.required:
+                raise CommandError(f"'{self.name}' is required")
+            return self.default
+        if self.kind == "number":
+            if isinstance(raw, bool):
+                raise CommandError(f"'{self.name}' must be a number")
+            try:
+                value = float(raw)
+            except (TypeError, ValueError):
+                raise CommandError(f"'{self.name}' must be a number")
+            if value != value or value in (float("inf"), float("-inf")):
+                raise CommandError(f"'{self.name}' must be finite")
+            if self.minimum is not None and value < self.minimum:
+                raise CommandError(f"'{self.name}' must be at least {self.minimum}")
+            if self.maximum is not None and value > self.maximum:
+                raise CommandError(f"'{self.name}' must be at most {self.maximum}")
+            return value
+        if self.kind == "lines":
+            if isinstance(raw, str):
+                raw = raw.splitlines()
+            if not isinstance(raw, list):
+                raise CommandError(f"'{self.name}' must be a list or newline-separated text")
+            value = [str(item) for item in raw]
+        else:
+            value = str(raw)
+        if self.max_length is not None and len(value) > self.max_length:
+            raise CommandError(f"'{self.name}' is longer than {self.max_length}")
+        return value
+
+    def to_dict(self):
+        schema = {"name": self.name, "type": self.kind, "required": self.required}
+        for key in ("default", "minimum", "maximum", "max_length", "description"):
+            value = getattr(self, key)
+            if value not in (None, ""):
+                schema[key] = value
+        return schema
+
+
+class Command:
+    """A registered action.
+
+    handler(bot, **params) does the work. Queued commands run on the
+    executor lane named by lane. Inline commands run on the caller's thread
+    and return the response payload (or None for the default one), so they
+    must only do quick work; they may return (payload, status) to set the
+    HTTP status. A preempting command cancels in-flight jobs that claim any
+    of its resources. plan(bot, **params), when given, builds the
+    command's MotionPlan so it can be used as a /sequence step; a command
+    with only a plan is sequence-only.
+    """
+
+    def __init__(self, name, handler, params=(), lane="general", inline=False,
+                 coalesce=False, resources=(), status=None, description="", plan=None,
+                 preempt=False):
+        self.name = name
+        self.handler = handler
+        self.plan = plan
+        self.params = list(params)
+        self.lane = lane
+        self.inline = inline
+        self.coalesce = coalesce
+        self.preempt = preempt
+        # Devices the command drives; used for preemption and shown in /commands.
+        self.resources = tuple(resources)
+        self.status = status or f"Action '{name}' executed"
+        self.description = description
+
+    def validate(self, data):
+        return {p.arg: p.coerce(data.get(p.name)) for p in self.params}
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "description": self.description,
+            "params": [p.to_dict() for p in self.params],
+            "lane": None if self.inline else self.lane,
+            "inline": self.inline,
+            "coalesce": self.coalesce,
+            "preempt": self.preempt,
+            "command": self.handler is not None,
+            "sequence": self.plan is not None,
+            "resources": list(self.resources),
+        }
+
+
+class CommandRegistry:
+    """Every action, registered once and dispatched by name or key code.
+
+    HTTP and the keyboard loop both call dispatch(), so validation,
+    lane choice and busy handling are the same for every transport.
+    Lookups are dict hits.
+    """
+
+    def __init__(self):
+        self._commands = {}
+        # Webots key code -> (debounce label, command name, fixed params)
+        self._keys = {}
+
+    def register(self, name, handler, **options):
+        if name in self._commands:
+            raise ValueError(f"Command '{name}' is already registered")
+        command = Command(name, handler, **options)
+        self._commands[name] = command
+        return command
+
+    def bind_key(self, key, name, label=None, **params):
+        """Run command name when key is pressed, with params fixed."""
+        if name not in self._commands:
+            raise ValueError(f"Unknown command '{name}'")
+        code = ord(key) if isinstance(key, str) else key
+        self._keys[code] = (label or str(key), name, params)
+
+    def get(self, name):
+        return self._commands.get(name)
+
+    def key_binding(self, code):
+        return self._keys.get(code)
+
+    def dispatch(self, bot, name, data=None):
+        """Validate and run one command. Returns (payload, status)."""
+        start = time.perf_counter()
+        payload, status = self._dispatch(bot, name, data)
+        # Unknown names all count as one label value, so clients cannot grow the series.
+        action = name if name in self._commands else "unknown"
+        COMMAND_SECONDS.observe(time.perf_counter() - start, action=action)
+        COMMAND_REQUESTS.inc(action=action, status=status)
+        return payload, status
+
+    def _dispatch(self, bot, name, data):
+        command = self._commands.get(name)
+        if command is None:
+            return {"error": f"Unknown action '{name}'"}, 400
+        if command.handler is None:
+            return {"error": f"'{name}' can only be used in a sequence"}, 400
+        try:
+            params = command.validate(data or {})
+        except CommandError as e:
+            return {"error": f"Invalid '{name}': {e}"}, 400
+
+        if command.inline:
+            payload = command.handler(bot, **params)
+            if isinstance(payload, tuple):
+                return payload
+            return payload or {"status": command.status}, 200
+
+        job = bot.run_async(lambda: command.handler(bot, **params), lane=command.lane, name=name,
+                            coalesce_key=name if command.coalesce else None,
+                            resources=command.resources, preempt=command.preempt)
+        if job is None:
+            return {"error": f"Robot is busy, '{name}' rejected"}, 429
+        return {"status": command.status, "job": job.to_dict()}, 200
+
+    # -----------------------
+    # Sequences
+    # -----------------------
+    def compile(self, bot, steps, name="sequence"):
+        """Validate a step list and compile it into one MotionPlan.
+
+        A step is {"action": ..., <params>}, {"sequence": [steps]} or
+        {"parallel": [steps]}. Steps in a sequence run one after another
+        and steps in a parallel group start together. Any step may give
+        "at": an offset in seconds from the start of its group. Raises
+        CommandError on the first invalid step.
+        """
+        if not isinstance(steps, list) or not steps:
+            raise CommandError("'steps' must be a non-empty list")
+        counter = [0]
+        plan = MotionPlan(name)
+        plan.merge(self._compile_group(bot, steps, False, "steps", 1, counter))
+        if plan.duration > MAX_SEQUENCE_SECONDS:
+            raise CommandError(f"sequence runs {plan.duration:.1f}s, limit is {MAX_SEQUENCE_SECONDS:.0f}s")
+        return plan
+
+    def _compile_group(self, bot, steps, parallel, path, depth, counter):
+        if depth > MAX_SEQUENCE_DEPTH:
+            raise CommandError(f"{path}: nested deeper than {MAX_SEQUENCE_DEPTH}")
+        if not isinstance(steps, list) or not steps:
+            raise CommandError(f"{path}: must be a non-empty list")
+        group = MotionPlan("parallel" if parallel else "sequence")
+        for i, step in enumerate(steps):
+            step_path = f"{path}[{i}]"
+            if not isinstance(step, dict):
+                raise CommandError(f"{step_path}: must be an object")
+            child = self._compile_step(bot, step, step_path, depth, counter)
+            if "at" in step:
+                offset = Param("at", "number", minimum=0.0, maximum=MAX_SEQUENCE_SECONDS).coerce(step["at"])
+                group.merge(child, offset)
+            elif parallel:
+                group.merge(child)
+            else:
+                group.then(child)
+        return group
+
+    def _compile_step(self, bot, step, path, depth, counter):
+        if "sequence" in step:
+            return self._compile_group(bot, step["sequence"], False, f"{path}.sequence", depth + 1, counter)
+        if "parallel" in step:
+            return self._compile_group(bot, step["parallel"], True, f"{path}.parallel", depth + 1, counter)
+        counter[0] += 1
+        if counter[0] > MAX_SEQUENCE_STEPS:
+            raise CommandError(f"more than {MAX_SEQUENCE_STEPS} steps")
+        name = step.get("action")
+        command = self._commands.get(name)
+        if command is None:
+            raise CommandError(f"{path}: unknown action '{name}'")
+        if command.plan is None:
+            raise CommandError(f"{path}: '{name}' cannot be used in a sequence")
+        try:
+            params = command.validate(step)
+        except CommandError as e:
+            raise CommandError(f"{path}: {e}")
+        return command.plan(bot, **params)
+
+    def describe(self):
+        commands = [c.to_dict() for c in self._commands.values()]
+        bindings = {}
+        for code, (label, name, params) in self._keys.items():
+            bindings.setdefault(name, []).append({"key": label, "params": params})
+        for command in commands:
+            command["keys"] = bindings.get(command["name"], [])
+        return commands
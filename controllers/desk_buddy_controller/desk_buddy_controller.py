@@ -1,99 +1,549 @@
+import itertools
+import json
+import os
+import queue
 import threading
 import time
-import requests
-from controller import Robot, Keyboard
-from flask import Flask, request, jsonify
+import uuid
+from collections import OrderedDict
+from urllib.parse import parse_qs
+if os.environ.get("DESKBUDDY_MOCK", "0") == "1":
+    # Opt-in: run headless on simulated devices (CI, load tests, benchmarks).
+    from mock_controller import Robot, Keyboard
+else:
+    try:
+        from controller import Robot, Keyboard
+    except ImportError as e:
+        raise ImportError("Webots' controller module is not importable: check the Webots Python path, "
+                          "or set DESKBUDDY_MOCK=1 to run on simulated devices") from e
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from datetime import datetime, timedelta
-import re
+from action_executor import ActionExecutor, current_token
+from motion_scheduler import MotionPlan, MotionScheduler
+from instrumented_lock import InstrumentedLock
+from actuator_buffer import PRIORITY_MOTION, PRIORITY_STOP, ActuatorBuffer
+from speech_queue import PRIORITY_HIGH, PRIORITY_NORMAL, SpeechQueue
+from reminder_parser import ReminderParseCache
+from step_budget import StepBudget
+from keyboard_input import KEY_BACKSPACE, KEY_ENTER, KEY_TAB, KeyboardInput, TextBuffer
+from task_api_client import TaskApiClient
+from task_sync_queue import TaskSyncQueue, task_key
+from task_cache import TaskCache
+from task_db import SqliteTaskStore
+from reminder_scheduler import ReminderScheduler
+from async_api_server import AsyncApiServer, TextResponse, await_job, on_loop, sse_response
+from async_log import get_logger, start_logging, stop_logging
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY
+from event_bus import EventBus, format_sse
+from command_registry import MAX_SEQUENCE_SECONDS, CommandError, CommandRegistry, Param
+from datetime import datetime
+
+log = get_logger("controller")
+
+
+def _env_int(name, default, minimum=1):
+    """Integer setting from the environment, clamped to minimum; bad values warn and use default."""
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        log.warning("⚠️ Ignoring %s=%r: not an integer, using %d", name, raw, default)
+        return default
+    if value < minimum:
+        log.warning("⚠️ %s=%d is below %d, using %d", name, value, minimum, minimum)
+        return minimum
+    return value
+
+
+# Control step = the world's basicTimeStep x this multiplier (16 ms x 2 = 32 ms)
+CONTROL_MULTIPLIER = _env_int("DESKBUDDY_CONTROL_MULTIPLIER", 2)
+# "1": widen the control step while the controller overruns its budget
+CONTROL_ADAPTIVE = os.environ.get("DESKBUDDY_CONTROL_ADAPTIVE", "0") == "1"
+
+# Control API: "asyncio" (event-loop server) or "flask" (threaded Werkzeug dev server)
+API_SERVER = os.environ.get("DESKBUDDY_API_SERVER", "asyncio")
+API_HOST = "0.0.0.0"
+API_PORT = 8000
+
+# External task service, and the journal of changes not yet pushed to it
+TASK_API_URL = os.environ.get("DESKBUDDY_TASK_API_URL", "http://localhost:3000/api/tasks")
+TASK_JOURNAL = os.environ.get("DESKBUDDY_TASK_JOURNAL") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "task_journal.jsonl")
+# Local task database (SQLite); ":memory:" keeps tasks for this run only
+TASK_DB = os.environ.get("DESKBUDDY_TASK_DB") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "tasks.db")
+
+robot_instance = None
+
+REMINDER_PARSE_SECONDS = REGISTRY.histogram("deskbuddy_reminder_parse_seconds",
+                                            "parse_reminder_nlp time, cache hits included")
+
+
+# ==========================================
+# COMMANDS (shared by HTTP and the keyboard)
+# ==========================================
+COMMANDS = CommandRegistry()
+
+DURATION = Param("duration", "number", default=2.0, minimum=0.0, maximum=60.0,
+                 description="Seconds of simulation time; 0 keeps moving until stopped")
+MESSAGE = Param("message", "string", default="", max_length=500)
+HELLO_MESSAGE = "Hello! I'm your Robo Desk Buddy!"
+# Devices a stop cancels work on
+ACTUATORS = ("wheels", "head", "right_arm", "left_arm", "leds", "speech")
+
+COMMANDS.register("forward", lambda bot, duration: bot.move_forward(duration),
+                  params=[DURATION], lane="wheels", resources=["wheels"], preempt=True, description="Drive forward",
+                  plan=lambda bot, duration: bot.drive_plan(2.0, 2.0, duration, "forward"))
+COMMANDS.register("backward", lambda bot, duration: bot.move_backward(duration),
+                  params=[DURATION], lane="wheels", resources=["wheels"], preempt=True, description="Drive backward",
+                  plan=lambda bot, duration: bot.drive_plan(-2.0, -2.0, duration, "backward"))
+COMMANDS.register("turn_left", lambda bot, duration: bot.turn("left", duration),
+                  params=[DURATION], lane="wheels", resources=["wheels"], preempt=True,
+                  description="Turn in place to the left",
+                  plan=lambda bot, duration: bot.turn_plan("left", duration))
+COMMANDS.register("turn_right", lambda bot, duration: bot.turn("right", duration),
+                  params=[DURATION], lane="wheels", resources=["wheels"], preempt=True,
+                  description="Turn in place to the right",
+                  plan=lambda bot, duration: bot.turn_plan("right", duration))
+COMMANDS.register("speak", lambda bot, message: bot.speak(message),
+                  params=[MESSAGE], lane="speech", resources=["speech", "leds"], description="Say a message",
+                  plan=lambda bot, message: bot.speak_plan(message))
+COMMANDS.register("say_hello", lambda bot: bot.say_hello(), lane="speech", coalesce=True,
+                  resources=["speech", "leds"], description="Introduce itself",
+                  plan=lambda bot: bot.speak_plan(HELLO_MESSAGE))
+COMMANDS.register("blink", lambda bot: bot.blink_lights(), lane="leds", coalesce=True,
+                  resources=["leds"], description="Blink the eye LEDs",
+                  plan=lambda bot: bot.blink_plan())
+COMMANDS.register("wave", lambda bot: bot.wave(), lane="arms", coalesce=True,
+                  resources=["head", "right_arm"], description="Wave an arm and nod",
+                  plan=lambda bot: bot.wave_plan())
+COMMANDS.register("patrol_mode", lambda bot: bot.patrol_mode(), lane="wheels", coalesce=True, preempt=True,
+                  resources=["wheels"], description="Drive a square patrol",
+                  plan=lambda bot: bot.patrol_plan())
+COMMANDS.register("dance", lambda bot: bot.dance(), lane="wheels", coalesce=True, preempt=True,
+                  resources=["wheels", "head", "right_arm"], description="Short dance routine",
+                  plan=lambda bot: bot.dance_plan())
+COMMANDS.register("turn_and_speak", lambda bot, message: bot.turn_and_speak(message),
+                  params=[MESSAGE], lane="speech", resources=["wheels", "speech", "leds"],
+                  description="Turn left while speaking",
+                  plan=lambda bot, message: bot.turn_and_speak_plan(message))
+COMMANDS.register("all_actions", lambda bot: bot.all_actions(), coalesce=True,
+                  resources=["wheels", "head", "right_arm", "leds", "speech"],
+                  description="Drive, wave, blink and speak at once",
+                  plan=lambda bot: bot.all_actions_plan())
+COMMANDS.register("stop", lambda bot: bot.stop_all(), inline=True,
+                  resources=list(ACTUATORS), description="Stop every actuator and cancel running actions",
+                  plan=lambda bot: bot.rest_plan())
+
+
+def _cancel_job(bot, job):
+    cancelled = bot.executor.cancel(int(job))
+    if cancelled is None:
+        return {"error": f"Job {int(job)} is not queued or running"}, 404
+    log.info("⏹️ Cancelled job %s (%s)", cancelled.id, cancelled.name)
+    # A running job stops at its next step; a queued one is already gone.
+    state = "cancelled" if cancelled.status == "cancelled" else "cancelling"
+    return {"status": f"Job {cancelled.id} {state}", "job": cancelled.to_dict()}, 200
+
+
+COMMANDS.register("cancel", _cancel_job, inline=True,
+                  params=[Param("job", "number", required=True, minimum=1, description="Job id from /command")],
+                  description="Cancel a queued or running job")
+COMMANDS.register("wait", None, params=[Param("duration", "number", required=True, minimum=0.0,
+                                              maximum=MAX_SEQUENCE_SECONDS)],
+                  description="Pause between sequence steps",
+                  plan=lambda bot, duration: MotionPlan("wait").hold(duration))
+COMMANDS.register("stop_wheels", lambda bot: bot.stop_wheels(), inline=True,
+                  resources=["wheels"], description="Stop the wheels and cancel what is driving them")
+
+# Reminder/task commands
+
+
+def _add_reminder(bot, reminder_text):
+    task = bot.add_reminder_from_text(reminder_text)
+    return {"status": "Reminder added", "task": task}
+
+
+def _add_reminders(bot, reminders):
+    added = bot.add_reminders_bulk(reminders)
+    return {"status": f"{len(added)} reminders added", "tasks": added}
+
+
+COMMANDS.register("add_reminder", _add_reminder, inline=True, resources=["tasks"],
+                  params=[Param("reminder_text", "string", required=True, max_length=500)],
+                  description="Add a reminder from natural language, e.g. 'call mom tomorrow at 5pm'")
+COMMANDS.register("add_reminders", _add_reminders, inline=True, resources=["tasks"],
+                  params=[Param("reminders", "lines", default=[])],
+                  description="Add many reminders (a list or one per line)")
+
+
+def _list_tasks(bot, cursor, limit, since):
+    try:
+        return bot.list_tasks(cursor=cursor, limit=limit, since=since)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+
+def _remove_task(bot, task_id):
+    task = bot.remove_task(task_id)
+    if task is None:
+        return {"error": f"No task with id '{task_id}'"}, 404
+    return {"status": "Task removed", "task": task}
+
+
+def _update_task(bot, task_id, name, date, time_str):
+    changes = {k: v for k, v in (("name", name), ("date", date), ("time", time_str)) if v is not None}
+    try:
+        if date is not None:
+            datetime.strptime(date, "%Y-%m-%d")
+        if time_str is not None:
+            datetime.strptime(time_str, "%H:%M")
+    except ValueError:
+        return {"error": "Invalid 'update_task': date must be YYYY-MM-DD and time HH:MM"}, 400
+    task = bot.update_task(task_id, changes)
+    if task is None:
+        return {"error": f"No task with id '{task_id}'"}, 404
+    return {"status": "Task updated", "task": task}
+
+
+COMMANDS.register("list_tasks", _list_tasks, inline=True, resources=["tasks"],
+                  params=[Param("cursor", "string", max_length=100,
+                                description="next_cursor from the previous page"),
+                          Param("limit", "number", minimum=1, maximum=1000,
+                                description="Page size; all tasks when omitted"),
+                          Param("since", "number", minimum=0,
+                                description="version from an earlier response; returns only changes")],
+                  description="Return the task list, a page of it, or the changes since a version")
+COMMANDS.register("remove_task", _remove_task, inline=True, resources=["tasks"],
+                  params=[Param("id", "string", required=True, max_length=100, arg="task_id")],
+                  description="Delete one task by id")
+COMMANDS.register("update_task", _update_task, inline=True, resources=["tasks"],
+                  params=[Param("id", "string", required=True, max_length=100, arg="task_id"),
+                          Param("name", "string", max_length=500),
+                          Param("date", "string", max_length=10, description="YYYY-MM-DD"),
+                          Param("time", "string", max_length=5, description="HH:MM", arg="time_str")],
+                  description="Change a task's name, date or time by id")
+COMMANDS.register("list_tasks_vocal", lambda bot: bot.list_tasks_vocal(), lane="speech", coalesce=True,
+                  resources=["tasks", "speech"], status="Reading tasks aloud",
+                  description="Read the nearest tasks aloud")
+COMMANDS.register("clear_tasks", lambda bot: bot.clear_tasks(), inline=True, resources=["tasks"],
+                  status="All tasks cleared", description="Delete every task")
+
+# Keyboard bindings (Webots key codes are the upper-case letters)
+COMMANDS.bind_key("F", "forward", duration=0)
+COMMANDS.bind_key("R", "backward", duration=0)
+COMMANDS.bind_key("L", "turn_left", duration=0)
+COMMANDS.bind_key("G", "turn_right", duration=0)
+COMMANDS.bind_key(" ", "stop_wheels", label="SPACE")
+COMMANDS.bind_key("P", "patrol_mode")
+COMMANDS.bind_key("D", "dance")
+COMMANDS.bind_key("Y", "all_actions")
+COMMANDS.bind_key("T", "turn_and_speak", message="I am turning left while speaking!")
+COMMANDS.bind_key("W", "wave")
+COMMANDS.bind_key("B", "blink")
+COMMANDS.bind_key("H", "say_hello")
+COMMANDS.bind_key("K", "list_tasks_vocal")
+COMMANDS.bind_key("C", "clear_tasks")
+COMMANDS.bind_key("S", "stop")
+
+
+# ==========================================
+# API HANDLERS (shared by both servers)
+# ==========================================
+def dispatch_command(data):
+    """Handle one /command request body. Returns (payload, status)."""
+    global robot_instance
+    if not robot_instance:
+        return {"error": "Robot not initialized"}, 503
+    if not isinstance(data, dict):
+        return {"error": "Expected a JSON object"}, 400
+
+    action = data.get("action")
+    if not isinstance(action, str):
+        return {"error": "'action' must be a string"}, 400
+    log.debug("[API] Received: %s", action)
+    return COMMANDS.dispatch(robot_instance, action, data)
+
+
+def _reminder_text(item):
+    """A bulk item: a string, or an object with "reminder_text". Raises ValueError otherwise."""
+    if isinstance(item, dict):
+        item = item.get("reminder_text")
+    if not isinstance(item, str):
+        raise ValueError(f'Each reminder must be a string or {{"reminder_text": "..."}}, '
+                         f'got {json.dumps(item)[:80]}')
+    return item
+
+
+def parse_bulk_reminders(body, content_type):
+    """Reminder texts from a JSON array, {"reminders": [...]}, NDJSON or plain lines."""
+    content_type = content_type or ""
+    if "json" in content_type and "ndjson" not in content_type:
+        data = json.loads(body or "null")
+        reminders = data.get("reminders", []) if isinstance(data, dict) else data
+        if not isinstance(reminders, list):
+            raise ValueError("Expected a list of reminder texts")
+        return [_reminder_text(item) for item in reminders]
+    if "ndjson" in content_type:
+        reminders = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                raise ValueError(f"Invalid NDJSON line: {line[:80]}")
+            reminders.append(_reminder_text(item))
+        return reminders
+    return body.splitlines()
+
+
+def bulk_reminders_response(body, content_type):
+    global robot_instance
+    if not robot_instance:
+        return {"error": "Robot not initialized"}, 503
+    try:
+        reminders = parse_bulk_reminders(body, content_type)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    added = robot_instance.add_reminders_bulk(reminders)
+    return {"status": f"{len(added)} reminders added", "tasks": added}, 200
+
+
+def start_sequence_response(data):
+    """POST /sequence: compile {"steps": [...], "name": ...} into one plan and start it."""
+    global robot_instance
+    if not robot_instance:
+        return {"error": "Robot not initialized"}, 503
+    if not isinstance(data, dict):
+        return {"error": "Expected a JSON object"}, 400
+    name = str(data.get("name") or "sequence")[:64]
+    try:
+        plan = COMMANDS.compile(robot_instance, data.get("steps"), name)
+    except CommandError as e:
+        return {"error": f"Invalid sequence: {e}"}, 400
+    return {"sequence": robot_instance.start_sequence(plan)}, 200
+
+
+def sequence_status_response(sequence_id):
+    """GET /sequence?id=N"""
+    global robot_instance
+    if not robot_instance:
+        return {"error": "Robot not initialized"}, 503
+    try:
+        info = robot_instance.sequence_status(int(sequence_id))
+    except (TypeError, ValueError):
+        return {"error": "'id' must be an integer"}, 400
+    if info is None:
+        return {"error": f"Unknown sequence '{sequence_id}'"}, 404
+    return {"sequence": info}, 200
+
+
+def cancel_sequence_response(data):
+    """POST /sequence/cancel {"id": N}"""
+    global robot_instance
+    if not robot_instance:
+        return {"error": "Robot not initialized"}, 503
+    sequence_id = data.get("id") if isinstance(data, dict) else None
+    try:
+        info = robot_instance.cancel_sequence(int(sequence_id))
+    except (TypeError, ValueError):
+        return {"error": "'id' must be an integer"}, 400
+    if info is None:
+        return {"error": f"Unknown sequence '{sequence_id}'"}, 404
+    return {"sequence": info}, 200
+
+
+def commands_response():
+    return {"commands": COMMANDS.describe()}, 200
+
+
+def ping_response():
+    global robot_instance
+    status = "connected" if robot_instance else "disconnected"
+    return {"status": status, "robot": "DeskBuddy"}, 200
+
+
+def stats_response():
+    global robot_instance
+    if not robot_instance:
+        return {"error": "Robot not initialized"}, 503
+    return {
+        "executor": robot_instance.executor.stats(),
+        "locks": robot_instance.lock_stats(),
+        "task_api": robot_instance.task_api.stats(),
+        "sync": robot_instance.sync_queue.stats(),
+        "task_cache": robot_instance.task_cache.stats(),
+        "reminders": robot_instance.reminders.stats(),
+        "events": robot_instance.events.stats(),
+        "actuators": robot_instance.actuators.stats(),
+        "speech": robot_instance.speech.stats(),
+        "parse_cache": robot_instance.parse_cache.stats(),
+        "keyboard": robot_instance.keys.stats(),
+        "step": robot_instance.budget.stats(),
+    }, 200
+
+
+def metrics_response():
+    """Every registered metric in the Prometheus text format."""
+    return REGISTRY.render()
+
+
+def events_snapshot():
+    """Initial state for a new push client: connection status and the task list."""
+    global robot_instance
+    if not robot_instance:
+        return {"status": "disconnected"}
+    with robot_instance.task_lock:
+        tasks = robot_instance.tasks.all()
+        version = robot_instance.tasks.version
+    return {"status": "connected", "robot": "DeskBuddy", "tasks": tasks, "version": version}
 
-# Webots time step
-TIME_STEP = 32
 
 # ==========================================
 # FLASK APP SETUP
 # ==========================================
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
-robot_instance = None
 
 
 @app.route("/command", methods=["POST"])
 def handle_command():
     """Main endpoint to receive robot and task commands."""
-    global robot_instance
-    if not robot_instance:
-        return jsonify({"error": "Robot not initialized"}), 503
+    payload, status = dispatch_command(request.get_json(force=True))
+    return jsonify(payload), status
 
-    data = request.get_json(force=True)
-    action = data.get("action")
-    duration = float(data.get("duration", 2.0))
-    message = data.get("message", "")
-    reminder_text = data.get("reminder_text", "")
-
-    print(f"[API] Received: {action}")
-
-    # Robot movement & actions
-    if action == "forward":
-        robot_instance.run_async(lambda: robot_instance.move_forward(duration))
-    elif action == "backward":
-        robot_instance.run_async(lambda: robot_instance.move_backward(duration))
-    elif action == "turn_left":
-        robot_instance.run_async(lambda: robot_instance.turn("left", duration))
-    elif action == "turn_right":
-        robot_instance.run_async(lambda: robot_instance.turn("right", duration))
-    elif action == "speak":
-        robot_instance.run_async(lambda msg=message: robot_instance.speak(msg))
-    elif action == "blink":
-        robot_instance.run_async(robot_instance.blink_lights)
-    elif action == "wave":
-        robot_instance.run_async(robot_instance.wave)
-    elif action == "patrol_mode":
-        robot_instance.run_async(robot_instance.patrol_mode)
-    elif action == "dance":
-        robot_instance.run_async(robot_instance.dance)
-    elif action == "turn_and_speak":
-        robot_instance.run_async(lambda msg=message: robot_instance.turn_and_speak(msg))
-    elif action == "all_actions":
-        robot_instance.run_async(robot_instance.all_actions)
-    elif action == "stop":
-        robot_instance.stop_all()
-
-    # Reminder/task commands
-    elif action == "add_reminder":
-        robot_instance.add_reminder_from_text(reminder_text)
-        return jsonify({"status": "Reminder added"}), 200
-
-    elif action == "list_tasks":
-        tasks = robot_instance.get_tasks()
-        return jsonify({"tasks": tasks}), 200
-
-    elif action == "list_tasks_vocal":
-        robot_instance.run_async(robot_instance.list_tasks_vocal)
-        return jsonify({"status": "Reading tasks aloud"}), 200
-
-    elif action == "clear_tasks":
-        robot_instance.clear_tasks()
-        return jsonify({"status": "All tasks cleared"}), 200
 
-    else:
-        return jsonify({"error": f"Unknown action '{action}'"}), 400
+@app.route("/reminders/bulk", methods=["POST"])
+def add_reminders_bulk():
+    """Bulk reminder import: a JSON array, {"reminders": [...]}, NDJSON or one reminder per line."""
+    payload, status = bulk_reminders_response(request.get_data(as_text=True), request.content_type)
+    return jsonify(payload), status
+
 
-    return jsonify({"status": f"Action '{action}' executed"}), 200
+@app.route("/commands", methods=["GET"])
+def list_commands():
+    """Every command with its parameter schema, lane and key bindings."""
+    payload, status = commands_response()
+    return jsonify(payload), status
+
+
+@app.route("/sequence", methods=["POST"])
+def start_sequence():
+    """Run a list of steps (sequential/parallel groups, "at" offsets) as one plan."""
+    payload, status = start_sequence_response(request.get_json(force=True, silent=True))
+    return jsonify(payload), status
+
+
+@app.route("/sequence", methods=["GET"])
+def sequence_status():
+    payload, status = sequence_status_response(request.args.get("id"))
+    return jsonify(payload), status
+
+
+@app.route("/sequence/cancel", methods=["POST"])
+def cancel_sequence():
+    payload, status = cancel_sequence_response(request.get_json(force=True, silent=True))
+    return jsonify(payload), status
 
 
 @app.route("/ping", methods=["GET"])
 def ping():
     """Health check endpoint for dashboard connection testing."""
-    global robot_instance
-    status = "connected" if robot_instance else "disconnected"
-    return jsonify({"status": status, "robot": "DeskBuddy"}), 200
+    payload, status = ping_response()
+    return jsonify(payload), status
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    """Executor, lock wait-time and task API latency counters."""
+    payload, status = stats_response()
+    return jsonify(payload), status
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(metrics_response(), content_type=METRICS_CONTENT_TYPE)
+
+
+@app.route("/events", methods=["GET"])
+def events():
+    """Server-Sent Events push channel (holds one server thread per client)."""
+    if not robot_instance:
+        return jsonify({"error": "Robot not initialized"}), 503
+    bus = robot_instance.events
+    updates = queue.Queue()
+
+    def stream():
+        sub, _ = bus.subscribe(updates.put)
+        try:
+            snapshot = events_snapshot()
+            snapshot["state"] = bus.state()
+            yield "retry: 2000\n\n" + format_sse("snapshot", snapshot)
+            while True:
+                try:
+                    batch = updates.get(timeout=15.0)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield "".join(format_sse(e["type"], e, e["id"]) for e in batch)
+                sub.ack(len(batch))
+        finally:
+            bus.unsubscribe(sub)
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+# ==========================================
+# ASYNCIO SERVER ROUTES
+# ==========================================
+async def _command_after_job(job, payload, status):
+    await await_job(job)
+    payload["job"] = job.to_dict()
+    return payload, status
+
+
+def _async_command(req):
+    """POST /command; with "wait": true the reply is sent once the action has finished."""
+    data = req.json()
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    payload, status = dispatch_command(data)
+    job_info = payload.get("job")
+    if data.get("wait") and job_info:
+        job = robot_instance.executor.get_job(job_info["id"])
+        if job is not None:
+            return _command_after_job(job, payload, status)
+        payload["job"]["status"] = "done"
+    return payload, status
+
+
+ASYNC_ROUTES = {
+    ("POST", "/command"): _async_command,
+    ("POST", "/reminders/bulk"): lambda req: bulk_reminders_response(
+        req.body.decode("utf-8", "replace"), req.content_type),
+    ("GET", "/ping"): on_loop(lambda req: ping_response()),
+    ("GET", "/commands"): lambda req: commands_response(),
+    ("POST", "/sequence"): lambda req: start_sequence_response(req.json()),
+    ("GET", "/sequence"): lambda req: sequence_status_response(parse_qs(req.query).get("id", [None])[0]),
+    ("POST", "/sequence/cancel"): lambda req: cancel_sequence_response(req.json()),
+    ("GET", "/stats"): lambda req: stats_response(),
+    ("GET", "/metrics"): lambda req: TextResponse(metrics_response(), METRICS_CONTENT_TYPE),
+    # sse_response() needs the running loop; its snapshot is taken off the loop.
+    ("GET", "/events"): on_loop(lambda req: sse_response(robot_instance.events, req, events_snapshot)),
+}
 
 
 def start_api_server():
-    """Run Flask API in a background thread."""
-    print("🚀 Starting local control API on http://localhost:8000/command")
-    app.run(host="0.0.0.0", port=8000, debug=False, use_reloader=False, threaded=True)
+    """Run the control API in a background thread."""
+    log.info("🚀 Starting local control API (%s) on http://localhost:%s/command", API_SERVER, API_PORT)
+    if API_SERVER == "flask":
+        app.run(host=API_HOST, port=API_PORT, debug=False, use_reloader=False, threaded=True)
+    else:
+        AsyncApiServer(ASYNC_ROUTES, API_HOST, API_PORT).serve_forever()
 
 
 # ==========================================
@@ -103,25 +553,65 @@ class DeskBuddy(Robot):
     def __init__(self):
         super().__init__()
 
-        # Threading & locks
-        self.action_lock = threading.Lock()
-        self.active_threads = []
+        # Control step, derived from the world's basicTimeStep, and per-step CPU accounting.
+        self.budget = StepBudget(int(self.getBasicTimeStep()), CONTROL_MULTIPLIER, adaptive=CONTROL_ADAPTIVE)
+
+        # Threading & locks: devices are only written from the step loop
+        # (see ActuatorBuffer), so the task store is the one shared domain.
+        self.task_lock = InstrumentedLock("tasks")
+        # Pushed to /events subscribers once per step.
+        self.events = EventBus()
+        self.executor = ActionExecutor(on_job=self._on_job)
+        self.scheduler = MotionScheduler(self._apply_setpoint, rest={
+            "wheels": (0.0, 0.0), "leds": 0, "head": 0.0, "right_arm": 0.0, "left_arm": 0.0,
+        })
+        # /sequence handles: id -> MotionPlan, most recent last
+        self.sequences = OrderedDict()
+        self.sequence_lock = threading.Lock()
+        self.max_sequences = 64
+        self._sequence_ids = itertools.count(1)
 
         # Task management
-        self.tasks = []
-        self.api_url = "http://localhost:3000/api/tasks"
+        # Repeated phrases ("standup at 9am tomorrow") are parsed once per day.
+        self.parse_cache_size = 512
+        self.parse_cache = ReminderParseCache(self.parse_cache_size)
+        self.api_url = TASK_API_URL
+        self.api_pool_size = 4
+        self.api_retries = 3
+        self.task_api = TaskApiClient(self.api_url, pool_size=self.api_pool_size, retries=self.api_retries)
+        # Reminders are pushed upstream write-behind; unsynced changes live in the journal.
+        self.sync_journal = TASK_JOURNAL
+        self.sync_queue = TaskSyncQueue(self.task_api, self.sync_journal,
+                                        on_flush=lambda: self.task_cache.invalidate())
+        # Tasks persist locally, so they are here at startup even with the service down.
+        self.task_db = TASK_DB
+        self.tasks = SqliteTaskStore(self.task_db)
+        if self.sync_queue.stats()["pending"]:
+            # Re-apply changes the service has not seen, in case their commit was lost.
+            self.tasks.replace(self.sync_queue.overlay(self.tasks.all()))
+        # Server task list, revalidated at most once per TTL however many clients poll.
+        self.task_cache_ttl = 10.0
+        self.task_cache = TaskCache(
+            self.task_api, ttl=self.task_cache_ttl, on_update=self._on_server_tasks,
+            submit=lambda func: self.run_async(func, lane="tasks", name="refresh_tasks"),
+            generation=lambda: self.sync_queue.generation,
+        )
+        self.task_cache.refresh_async()
+        # Due reminders are announced from the step loop.
+        self.reminders = ReminderScheduler(self._fire_reminder)
+        now = time.time()
+        recent = datetime.fromtimestamp(now - self.reminders.grace)
+        self.reminders.schedule([task for _, task in self.tasks.upcoming(recent)], now)
 
-        # Key debouncing
-        self.last_key_time = {}
+        # Keyboard: every pending key is read each step, debounced on simulation time.
+        self.keyboard = self.getKeyboard()
+        self.keyboard.enable(self.budget.step_ms)
+        self.keys = KeyboardInput(self.keyboard)
         self.key_cooldown = 0.18
-        self.key_timestamps = {}
-
-        # Extra typing debounce
-        self.typing_cooldown = 0.15
 
         # INPUT MODE STATE MACHINE
         self.input_mode = "idle"
-        self.typed_text = ""
+        self.typed = TextBuffer()
 
         # Devices
         self.led_left = self.getDevice("eye_led_left")
@@ -160,188 +650,49 @@ class DeskBuddy(Robot):
             except Exception:
                 pass
 
+        # Desired setpoints; written to the devices once per step.
+        self.actuators = ActuatorBuffer()
+        wheels = {"left_wheel": self.left_wheel, "right_wheel": self.right_wheel,
+                  "left_rear_wheel": self.left_rear_wheel, "right_rear_wheel": self.right_rear_wheel}
+        for key, wheel in wheels.items():
+            self.actuators.register(key, lambda v, d=wheel: d.setVelocity(v), initial=0.0)
+        self.actuators.register("led_left", lambda v: self.led_left.set(v))
+        self.actuators.register("led_right", lambda v: self.led_right.set(v))
+        self.actuators.register("head", lambda v: self.head_motor.setPosition(v), initial=0.0)
+        self.actuators.register("right_arm", lambda v: self.right_hand_motor.setPosition(v), initial=0.0)
+        self.actuators.register("left_arm", lambda v: self.left_hand_motor.setPosition(v), initial=0.0)
+
+        # One speaker queue; played and animated from the step loop.
+        self.speech = SpeechQueue(
+            self.speaker, lambda v: self.actuators.write_many({"led_left": v, "led_right": v}))
+
         # Movement parameters
         self.max_speed = 6.28
         self.turn_speed = 3.0
 
+        self._register_metrics()
+
     # -----------------------
     # NLP parsing for reminders
     # -----------------------
     def parse_reminder_nlp(self, text):
-        """Advanced NLP parsing for date/time extraction."""
-        now = datetime.now()
-
-        reminder_date = now.strftime("%Y-%m-%d")
-        reminder_time = "12:00"
-        task_name = text.strip()
-
-        text_lower = text.lower()
-
-        # TIME extraction
-        time_match = re.search(r'(\b\d{1,2}:\d{2}\b)\s*(am|pm)?', text_lower)
-        if time_match:
-            time_part = time_match.group(1)
-            ampm = time_match.group(2)
-            hour, minute = map(int, time_part.split(':'))
-            if ampm:
-                ampm = ampm.lower()
-                if ampm == 'pm' and hour != 12:
-                    hour += 12
-                if ampm == 'am' and hour == 12:
-                    hour = 0
-            reminder_time = f"{hour:02d}:{minute:02d}"
-            task_name = task_name.replace(time_match.group(0), '').strip()
-        else:
-            time_match2 = re.search(r'\b(\d{1,2})\s*(am|pm)\b', text_lower)
-            if time_match2:
-                hour = int(time_match2.group(1))
-                ampm = time_match2.group(2).lower()
-                if ampm == 'pm' and hour != 12:
-                    hour += 12
-                if ampm == 'am' and hour == 12:
-                    hour = 0
-                reminder_time = f"{hour:02d}:00"
-                task_name = task_name.replace(time_match2.group(0), '').strip()
-
-        # DATE extraction
-        if 'tomorrow' in text_lower:
-            reminder_date = (now + timedelta(days=1)).strftime("%Y-%m-%d")
-            task_name = re.sub(r'\btomorrow\b', '', task_name, flags=re.IGNORECASE).strip()
-        elif 'today' in text_lower:
-            reminder_date = now.strftime("%Y-%m-%d")
-            task_name = re.sub(r'\btoday\b', '', task_name, flags=re.IGNORECASE).strip()
-        elif 'next week' in text_lower:
-            reminder_date = (now + timedelta(days=7)).strftime("%Y-%m-%d")
-            task_name = re.sub(r'next week', '', task_name, flags=re.IGNORECASE).strip()
-
-        # Weekday names
-        weekdays = {
-            'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-            'friday': 4, 'saturday': 5, 'sunday': 6
-        }
-
-        for day_name, day_num in weekdays.items():
-            if re.search(rf'\b(next\s+)?{day_name}\b', text_lower):
-                current_weekday = now.weekday()
-                days_ahead = (day_num - current_weekday) % 7
-                if days_ahead == 0 and 'next ' not in text_lower:
-                    days_ahead = 0
-                if re.search(rf'\bnext\s+{day_name}\b', text_lower):
-                    days_ahead = (day_num - current_weekday) % 7 + 7
-                if days_ahead == 0 and 'next ' in text_lower:
-                    days_ahead = 7
-                reminder_date = (now + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
-                task_name = re.sub(rf'\b(next\s+)?{day_name}\b', '', task_name, flags=re.IGNORECASE).strip()
-                break
-
-        # Month name + day (multiple formats)
-        month_names = {
-            'jan': 1, 'january': 1, 'feb': 2, 'february': 2,
-            'mar': 3, 'march': 3, 'apr': 4, 'april': 4,
-            'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
-            'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9,
-            'oct': 10, 'october': 10, 'nov': 11, 'november': 11,
-            'dec': 12, 'december': 12
-        }
-
-        # Try: "nov 21", "november 21"
-        for mname, mnum in month_names.items():
-            match = re.search(rf'\b{mname}\s+(\d{{1,2}})\b', text_lower)
-            if match:
-                day = int(match.group(1))
-                year = now.year
-                try:
-                    candidate = datetime(year, mnum, day)
-                    if candidate < now:
-                        candidate = datetime(year + 1, mnum, day)
-                    reminder_date = candidate.strftime("%Y-%m-%d")
-                    task_name = re.sub(rf'\b{mname}\s+\d{{1,2}}\b', '', task_name, flags=re.IGNORECASE).strip()
-                except ValueError:
-                    pass
-                break
-
-        # Try: "21 nov", "21 november", "21st november"
-        for mname, mnum in month_names.items():
-            match = re.search(rf'\b(\d{{1,2}})(?:st|nd|rd|th)?\s+{mname}\b', text_lower)
-            if match:
-                day = int(match.group(1))
-                year = now.year
-                try:
-                    candidate = datetime(year, mnum, day)
-                    if candidate < now:
-                        candidate = datetime(year + 1, mnum, day)
-                    reminder_date = candidate.strftime("%Y-%m-%d")
-                    task_name = re.sub(rf'\b\d{{1,2}}(?:st|nd|rd|th)?\s+{mname}\b', '', task_name, flags=re.IGNORECASE).strip()
-                except ValueError:
-                    pass
-                break
-
-        # Try: numeric formats "21/11", "21/10", "11/21" (DD/MM or MM/DD)
-        numeric_date = re.search(r'\b(\d{1,2})[/\-](\d{1,2})\b', text_lower)
-        if numeric_date and reminder_date == now.strftime("%Y-%m-%d"):
-            part1 = int(numeric_date.group(1))
-            part2 = int(numeric_date.group(2))
-            year = now.year
-            
-            # Try DD/MM first (European format)
-            try:
-                if part1 <= 31 and part2 <= 12:
-                    candidate = datetime(year, part2, part1)
-                    if candidate < now:
-                        candidate = datetime(year + 1, part2, part1)
-                    reminder_date = candidate.strftime("%Y-%m-%d")
-                    task_name = re.sub(r'\b\d{1,2}[/\-]\d{1,2}\b', '', task_name).strip()
-            except ValueError:
-                # Try MM/DD (US format)
-                try:
-                    if part1 <= 12 and part2 <= 31:
-                        candidate = datetime(year, part1, part2)
-                        if candidate < now:
-                            candidate = datetime(year + 1, part1, part2)
-                        reminder_date = candidate.strftime("%Y-%m-%d")
-                        task_name = re.sub(r'\b\d{1,2}[/\-]\d{1,2}\b', '', task_name).strip()
-                except ValueError:
-                    pass
-
-        # Final cleanup
-        task_name = re.sub(r'\s+', ' ', task_name)
-        task_name = re.sub(r'\b(remind me|reminder|on|at)\b', '', task_name, flags=re.IGNORECASE).strip()
-        task_name = task_name.lstrip(',:;-').strip()
-        if not task_name:
-            task_name = "Reminder"
-
-        return task_name, reminder_date, reminder_time
-
-    # -----------------------
-    # Key debouncing helpers
-    # -----------------------
-    def is_key_ready(self, key, cooldown=0.2):
-        """Check if enough time has passed since last key press."""
-        now = time.time()
-        last_time = self.key_timestamps.get(key, 0)
-        diff = now - last_time
-
-        if diff >= cooldown:
-            self.key_timestamps[key] = now
-            return True
-        else:
-            return False
+        """Advanced NLP parsing for date/time extraction (memoized per day)."""
+        with REMINDER_PARSE_SECONDS.time():
+            return self.parse_cache.parse(text)
 
     # -----------------------
     # Tasks / reminders
     # -----------------------
-    def add_reminder_from_text(self, text):
-        if not text or not text.strip():
-            print("⚠️ No reminder text provided.")
-            return
-
+    def build_task(self, text):
+        """Parse reminder text into a task dict."""
         task_name, reminder_date, reminder_time = self.parse_reminder_nlp(text)
         # 🧹 Clean up the extracted text before storing
         if task_name:
             task_name = task_name.strip()
             if task_name.isupper():
                 task_name = task_name.lower().capitalize()
-        task = {
+        return {
+            "id": uuid.uuid4().hex[:12],
             "name": task_name,
             "date": reminder_date,
             "time": reminder_time,
@@ -349,401 +700,640 @@ class DeskBuddy(Robot):
             "type": "reminder"
         }
 
-        with self.action_lock:
+    def add_reminder_from_text(self, text):
+        if not text or not text.strip():
+            log.warning("⚠️ No reminder text provided.")
+            return
+
+        task = self.build_task(text)
+        task_name, reminder_date, reminder_time = task["name"], task["date"], task["time"]
+
+        with self.task_lock:
             self.tasks.append(task)
+        self.reminders.schedule([task], time.time())
+        self.events.publish("tasks_added", tasks=[task])
 
-        print(f"✅ Reminder added: {task_name} — {reminder_date} {reminder_time}")
+        log.info("✅ Reminder added: %s — %s %s", task_name, reminder_date, reminder_time)
         # Only speak AFTER reminder is fully processed
         spoken_text = f"Reminder set: {task_name}, on {reminder_date} at {reminder_time}"
-        self.run_async(lambda: self.speak(spoken_text))
-
-        def sync_add():
-            try:
-                response = requests.post(self.api_url, json=task, timeout=5)
-                if response.status_code in (200, 201):
-                    print("🌐 Synced to API")
-                else:
-                    print(f"⚠️ Sync failed ({response.status_code})")
-            except Exception as e:
-                print(f"🚫 Could not reach API: {e}")
-
-        threading.Thread(target=sync_add, daemon=True).start()
-
-    def get_tasks(self):
-        """Get tasks from API with safe fallback to local list."""
-        try:
-            response = requests.get(self.api_url, timeout=5)
-            if response.status_code == 200:
-                fetched = response.json()
-                with self.action_lock:
-                    self.tasks = fetched
-                print(f"🌐 Fetched {len(fetched)} tasks from API")
-                return fetched
-        except requests.exceptions.RequestException as e:
-            print(f"🚫 Using local tasks: {e}")
-
-        with self.action_lock:
-            return list(self.tasks)
+        self.speak(spoken_text, wait=False)
+
+        self.sync_queue.enqueue_create(task)
+        return task
+
+    def add_reminders_bulk(self, texts):
+        """Parse many reminder texts, store them in one step and sync them in one request."""
+        tasks = [self.build_task(text) for text in texts if text and text.strip()]
+        if not tasks:
+            log.warning("⚠️ No reminder text provided.")
+            return []
+
+        with self.task_lock:
+            self.tasks.extend(tasks)
+        self.reminders.schedule(tasks, time.time())
+        self.events.publish("tasks_added", tasks=tasks)
+
+        log.info("✅ %d reminders added", len(tasks))
+        if len(tasks) == 1:
+            t = tasks[0]
+            spoken_text = f"Reminder set: {t['name']}, on {t['date']} at {t['time']}"
+        else:
+            first = min(tasks, key=lambda t: (t["date"], t["time"]))
+            spoken_text = (f"{len(tasks)} reminders set. "
+                           f"The first is {first['name']}, on {first['date']} at {first['time']}")
+        self.speak(spoken_text, wait=False)
+
+        self.sync_queue.enqueue_creates(tasks)
+        return tasks
+
+    def list_tasks(self, cursor=None, limit=None, since=None):
+        """Task listing for the API: everything, one page, or the changes since a version.
+
+        A since that is too old (or from an earlier run) gets a full
+        listing flagged "reset". Raises ValueError for a bad cursor.
+        """
+        self.task_cache.get()
+        with self.task_lock:
+            version = self.tasks.version
+            if since is not None:
+                delta = self.tasks.changes(int(since))
+                if delta is not None:
+                    tasks, removed = delta
+                    return {"tasks": tasks, "removed": removed, "version": version}
+            result = {"version": version}
+            if since is not None:
+                result["reset"] = True
+            if limit is None and cursor is None:
+                result["tasks"] = self.tasks.all()
+            else:
+                result["tasks"], result["next_cursor"] = self.tasks.page(cursor, int(limit or 50))
+            return result
+
+    def remove_task(self, task_id):
+        """Delete one task by id. Returns the removed task, or None."""
+        with self.task_lock:
+            task = self.tasks.remove(task_id)
+        if task is None:
+            return None
+        self.reminders.cancel(task)
+        self.events.publish("tasks_removed", ids=[task_id])
+        self.sync_queue.enqueue_delete(task_key(task))
+        log.info("🗑️ Removed task: %s", task.get("name"))
+        return task
+
+    def update_task(self, task_id, changes):
+        """Change fields of one task by id. Returns the updated task, or None."""
+        with self.task_lock:
+            old = self.tasks.get(task_id)
+            task = self.tasks.update(task_id, changes) if old is not None else None
+        if task is None:
+            return None
+        self.reminders.cancel(old)
+        self.reminders.schedule([task], time.time())
+        self.events.publish("task_updated", task=task)
+        self.sync_queue.enqueue_update(task)
+        log.info("✏️ Updated task: %s — %s %s", task.get("name"), task.get("date"), task.get("time"))
+        return task
+
+    def _on_server_tasks(self, server_tasks, generation=None):
+        """Cache refresh callback: merge the server list plus our unsynced changes.
+
+        The local store is the source of truth. Server tasks are added or
+        updated, but a local task missing from the list is kept: an empty
+        or partial list (a restarted or fresh service) never deletes
+        anything. A task is only deleted here when the server sends a
+        tombstone for it ({"id": ..., "deleted": true}).
+
+        Returns False, keeping the local tasks, when a sync was acknowledged
+        after the list was fetched: the list may lack what it pushed.
+        """
+        merged = self.sync_queue.overlay(server_tasks, generation)
+        if merged is None:
+            return False
+        live = [task for task in merged if not task.get("deleted")]
+        removed = [task_key(task) for task in merged if task.get("deleted") and task_key(task)]
+        with self.task_lock:
+            changes = self.tasks.merge(live, removed)
+            tasks = self.tasks.all() if changes else None
+        if not changes:
+            return
+        self.reminders.replace(tasks, time.time())
+        self.events.publish("tasks", tasks=tasks)
+
+    def _fire_reminder(self, task):
+        """Announce a due reminder. Runs on the step loop, so it only queues work."""
+        name = task.get("name", "Reminder")
+        log.info("⏰ Reminder due: %s (%s %s)", name, task.get("date"), task.get("time"))
+        self.events.publish("reminder", task=task)
+        cue = MotionPlan("reminder_cue").merge(self.wave_plan()).merge(self.blink_plan())
+        self.run_plan(cue, wait=False)
+        self.speak(f"Reminder: {name}", wait=False, priority=PRIORITY_HIGH)
 
     def list_tasks_vocal(self):
         """List tasks, sort by closeness to now, and speak top items."""
-        from datetime import datetime as dt
+        self.task_cache.get()
+        now = datetime.now()
+        with self.task_lock:
+            nearest = self.tasks.nearest(now)
+            upcoming = self.tasks.upcoming(now, 3)
 
-        try:
-            response = requests.get(self.api_url, timeout=5)
-            if response.status_code == 200:
-                server_tasks = response.json()
-                with self.action_lock:
-                    self.tasks = server_tasks
-                print("🌐 Fetched tasks from API")
-        except requests.exceptions.RequestException as e:
-            print(f"🚫 Using local tasks: {e}")
-
-        with self.action_lock:
-            task_list = list(self.tasks)
-
-        if not task_list:
-            print("📋 No tasks available.")
+        if not nearest:
+            log.info("📋 No tasks available.")
             self.speak("You have no tasks.")
             return
 
-        def parse_task_datetime(task):
-            try:
-                date_str = task.get('date', '')
-                time_str = task.get('time', '00:00')
-                dt_str = f"{date_str} {time_str}"
-                return dt.strptime(dt_str, "%Y-%m-%d %H:%M")
-            except Exception:
-                return dt.max
-
-        now = dt.now()
-        sorted_tasks = sorted(task_list, key=lambda t: abs((parse_task_datetime(t) - now).total_seconds()))
-        print(f"\n📋 YOU HAVE {len(sorted_tasks)} TASKS:")
-        for i, t in enumerate(sorted_tasks, 1):
-            td = parse_task_datetime(t)
-            if td != dt.max:
+        lines = [f"📋 YOU HAVE {len(nearest)} TASKS:"]
+        for i, (td, t) in enumerate(nearest, 1):
+            if td != datetime.max:
                 is_past = td < now
                 date_display = "Today" if td.date() == now.date() else t.get('date', 'No date')
                 status = "⏰ PAST" if is_past else "🔜 UPCOMING"
             else:
                 date_display = t.get('date', 'No date')
                 status = "❓ NO DATE"
-            print(f"{i}. {t.get('name')} - {date_display} at {t.get('time')} {status}")
+            lines.append(f"{i}. {t.get('name')} - {date_display} at {t.get('time')} {status}")
+        log.info("\n".join(lines))
 
-        total = len(sorted_tasks)
-        self.speak(f"You have {total} tasks.")
-        upcoming = [t for t in sorted_tasks if parse_task_datetime(t) >= now][:3]
+        # Queue everything at once so short lines are merged, then wait for the last.
+        total = len(nearest)
+        last = self.speak(f"You have {total} tasks.", wait=False)
         if upcoming:
-            self.speak("Your next tasks are:")
-            for t in upcoming:
-                self.speak(f"{t.get('name')}, on {t.get('date')} at {t.get('time')}")
+            self.speak("Your next tasks are:", wait=False)
+            for _, t in upcoming:
+                last = self.speak(f"{t.get('name')}, on {t.get('date')} at {t.get('time')}", wait=False)
+        self._wait_speech(last)
 
     def clear_tasks(self):
-        with self.action_lock:
+        with self.task_lock:
             count = len(self.tasks)
-            if count == 0:
-                print("📋 No tasks to clear.")
-                self.speak("No tasks to clear.")
-                return
             self.tasks.clear()
-        print(f"🧹 Cleared {count} tasks.")
-        self.speak(f"Cleared {count} tasks.")
-        try:
-            response = requests.delete(self.api_url, timeout=5)
-            if response.status_code in (200, 204):
-                print("🌐 Cleared all from API")
-        except Exception as e:
-            print(f"🚫 API clear failed: {e}")
+        self.reminders.clear()
+        self.events.publish("tasks_cleared", count=count)
+        # Called inline from the API and keyboard, so never wait for the speech.
+        if count == 0:
+            log.info("📋 No tasks to clear.")
+            self.speak("No tasks to clear.", wait=False)
+            return
+        self.sync_queue.enqueue_clear()
+        log.info("🧹 Cleared %d tasks.", count)
+        self.speak(f"Cleared {count} tasks.", wait=False)
+
+    # -----------------------
+    # Motion plans (applied by the step loop)
+    # -----------------------
+    def drive_plan(self, left_vel, right_vel, duration, name="drive"):
+        """Drive the wheels for duration simulation seconds, then stop."""
+        plan = MotionPlan(name)
+        plan.at(0.0, "wheels", (left_vel, right_vel))
+        plan.at(duration, "wheels", (0.0, 0.0))
+        return plan
+
+    def turn_plan(self, direction, duration):
+        if direction.lower() == 'left':
+            return self.drive_plan(-self.turn_speed, self.turn_speed, duration, "turn_left")
+        elif direction.lower() == 'right':
+            return self.drive_plan(self.turn_speed, -self.turn_speed, duration, "turn_right")
+        return MotionPlan("turn").hold(duration)
+
+    def wave_plan(self):
+        plan = MotionPlan("wave")
+        plan.at(0.0, "head", 0.2).at(0.0, "right_arm", 1)
+        plan.at(0.5, "head", -0.2).at(0.5, "right_arm", -1)
+        plan.at(1.0, "head", 0.0).at(1.0, "right_arm", 0.0)
+        return plan
+
+    def blink_plan(self, blinks=3, interval=0.5):
+        plan = MotionPlan("blink")
+        for i in range(blinks):
+            plan.at(i * interval, "leds", 1)
+            plan.at(i * interval + interval / 2, "leds", 0)
+        return plan.hold(blinks * interval)
+
+    def speak_plan(self, message):
+        """Queue speech at the plan start. The speech queue blinks the eyes while it plays.
+
+        The hold is only an estimate used to lay out sequences; the speech
+        itself ends when the speaker reports it has finished.
+        """
+        words = len(message.split())
+        plan = MotionPlan("speak")
+        plan.at(0.0, "speech", message)
+        return plan.hold(max(1.0, words * 0.28))
+
+    def patrol_plan(self):
+        plan = MotionPlan("patrol_mode")
+        for _ in range(4):
+            plan.then(self.drive_plan(2.0, 2.0, 2, "forward"))
+            plan.then(self.turn_plan("right", 1))
+        return plan
+
+    def dance_plan(self):
+        plan = MotionPlan("dance")
+        for _ in range(2):
+            plan.then(self.turn_plan("left", 0.5))
+            plan.then(self.turn_plan("right", 0.5))
+        plan.then(self.wave_plan())
+        plan.then(self.blink_plan())
+        return plan
+
+    def turn_and_speak_plan(self, message):
+        plan = MotionPlan("turn_and_speak")
+        plan.merge(self.turn_plan("left", 3))
+        plan.merge(self.speak_plan(message))
+        return plan
+
+    def all_actions_plan(self):
+        plan = MotionPlan("all_actions")
+        plan.merge(self.drive_plan(2.0, 2.0, 5, "forward"))
+        plan.merge(self.wave_plan())
+        plan.merge(self.blink_plan())
+        plan.merge(self.speak_plan("I am dancing while moving!"))
+        return plan
+
+    def rest_plan(self):
+        """Every actuator back to rest in one step."""
+        plan = MotionPlan("stop")
+        for channel, value in self.scheduler.rest.items():
+            plan.at(0.0, channel, value)
+        return plan
+
+    def run_plan(self, plan, wait=True):
+        """Hand a plan to the step-loop scheduler, optionally blocking until it ends.
+
+        Inside an executor job the plan is tied to the job's cancel token:
+        cancelling the job cancels the plan on the next step, and the
+        action stops at its next run_plan() with ActionCancelled.
+        """
+        token = current_token()
+        if token is not None:
+            token.check()
+            token.on_cancel(plan.cancel)
+        self.scheduler.submit(plan)
+        if wait:
+            plan.wait()
+            if token is not None:
+                token.check()
+        return plan
+
+    def _apply_setpoint(self, channel, value):
+        """Buffer one keyframe for its devices. Called only from the step loop.
+
+        Returns the Utterance for a speech keyframe, so cancelling the plan drops it.
+        """
+        if channel == "wheels":
+            self.set_wheel_velocity_differential(*value)
+        elif channel == "leds":
+            self.actuators.write_many({"led_left": value, "led_right": value})
+        elif channel in ("head", "right_arm", "left_arm"):
+            self.actuators.write(channel, value)
+        elif channel == "speech":
+            return self.speech.say(value)
+
+    def flush_actuators(self):
+        """Send this step's changed setpoints to the devices. Step loop only."""
+        changed = self.actuators.flush()
+        if not changed:
+            return
+        if changed.keys() & {"left_wheel", "right_wheel"}:
+            self.events.set_state("wheels", [self.actuators.value("left_wheel"),
+                                             self.actuators.value("right_wheel")])
+        if "led_left" in changed:
+            self.events.set_state("leds", changed["led_left"])
 
     # -----------------------
     # Movement helpers
     # -----------------------
-    def move_forward(self, duration=None):
+    def move_forward(self, duration=None, wait=True):
         if duration:
-            self.set_wheel_velocity(2.0)
-            time.sleep(duration)
-            self.stop()
-        else:
-            self.set_wheel_velocity(self.max_speed)
+            return self.run_plan(self.drive_plan(2.0, 2.0, duration, "forward"), wait)
+        self.set_wheel_velocity(self.max_speed)
 
-    def move_backward(self, duration=None):
+    def move_backward(self, duration=None, wait=True):
         if duration:
-            self.set_wheel_velocity(-2.0)
-            time.sleep(duration)
-            self.stop()
-        else:
-            self.set_wheel_velocity(-self.max_speed)
+            return self.run_plan(self.drive_plan(-2.0, -2.0, duration, "backward"), wait)
+        self.set_wheel_velocity(-self.max_speed)
 
-    def turn(self, direction, duration):
+    def turn(self, direction, duration=None, wait=True):
+        if duration:
+            return self.run_plan(self.turn_plan(direction, duration), wait)
         if direction.lower() == 'left':
             self.set_wheel_velocity_differential(-self.turn_speed, self.turn_speed)
         elif direction.lower() == 'right':
             self.set_wheel_velocity_differential(self.turn_speed, -self.turn_speed)
-        time.sleep(duration)
-        self.stop()
 
     def set_wheel_velocity(self, velocity):
-        with self.action_lock:
-            try:
-                self.left_wheel.setVelocity(velocity)
-                self.right_wheel.setVelocity(velocity)
-                self.left_rear_wheel.setVelocity(velocity)
-                self.right_rear_wheel.setVelocity(velocity)
-            except Exception:
-                pass
+        self.set_wheel_velocity_differential(velocity, velocity)
 
-    def set_wheel_velocity_differential(self, left_vel, right_vel):
-        with self.action_lock:
-            try:
-                self.left_wheel.setVelocity(left_vel)
-                self.right_wheel.setVelocity(right_vel)
-                self.left_rear_wheel.setVelocity(left_vel)
-                self.right_rear_wheel.setVelocity(right_vel)
-            except Exception:
-                pass
+    def set_wheel_velocity_differential(self, left_vel, right_vel, priority=PRIORITY_MOTION):
+        self.actuators.write_many({
+            "left_wheel": left_vel, "right_wheel": right_vel,
+            "left_rear_wheel": left_vel, "right_rear_wheel": right_vel,
+        }, priority)
 
     def stop(self):
-        with self.action_lock:
-            try:
-                self.left_wheel.setVelocity(0.0)
-                self.right_wheel.setVelocity(0.0)
-                self.left_rear_wheel.setVelocity(0.0)
-                self.right_rear_wheel.setVelocity(0.0)
-            except Exception:
-                pass
+        self.set_wheel_velocity_differential(0.0, 0.0, PRIORITY_STOP)
+
+    def stop_wheels(self):
+        """Stop the wheels and cancel the jobs and motion plans that drive them."""
+        cancelled = self.executor.cancel_matching(["wheels"])
+        plans = self.scheduler.cancel(["wheels"])
+        if cancelled or plans:
+            log.info("⏹️ Cancelled %d wheel actions and %d motion plans", len(cancelled), len(plans))
+        self.stop()
 
     # -----------------------
     # Actions
     # -----------------------
-    def speak(self, message):
-        """Speak with LED animation."""
-        print(f"🗣️ Speaking: '{message}'")
-        try:
-            self.speaker.speak(message, 1.0)
-        except Exception:
-            pass
-
-        words = len(message.split())
-        speak_duration = max(1.0, words * 0.28)
-        blink_interval = 0.45
-        elapsed = 0.0
-        while elapsed < speak_duration:
-            with self.action_lock:
-                try:
-                    self.led_left.set(1)
-                    self.led_right.set(1)
-                except Exception:
-                    pass
-            sleep_time = max(0, min(blink_interval / 2, speak_duration - elapsed))
-            if sleep_time > 0:
-                time.sleep(sleep_time)
-            elapsed += blink_interval / 2
-            
-            with self.action_lock:
-                try:
-                    self.led_left.set(0)
-                    self.led_right.set(0)
-                except Exception:
-                    pass
-            sleep_time = max(0, min(blink_interval / 2, speak_duration - elapsed))
-            if sleep_time > 0:
-                time.sleep(sleep_time)
-            elapsed += blink_interval / 2
-
-    def wave(self):
-        print("👋 Waving...")
-        with self.action_lock:
-            try:
-                self.head_motor.setPosition(0.2)
-                self.right_hand_motor.setPosition(1)
-            except Exception:
-                pass
-        time.sleep(0.5)
-        with self.action_lock:
-            try:
-                self.head_motor.setPosition(-0.2)
-                self.right_hand_motor.setPosition(-1)
-            except Exception:
-                pass
-        time.sleep(0.5)
-        with self.action_lock:
-            try:
-                self.head_motor.setPosition(0.0)
-                self.right_hand_motor.setPosition(0.0)
-            except Exception:
-                pass
-
-    def blink_lights(self):
-        print("✨ Blinking lights...")
-        for _ in range(3):
-            with self.action_lock:
-                try:
-                    self.led_left.set(1)
-                    self.led_right.set(1)
-                except Exception:
-                    pass
-            time.sleep(0.25)
-            with self.action_lock:
-                try:
-                    self.led_left.set(0)
-                    self.led_right.set(0)
-                except Exception:
-                    pass
-            time.sleep(0.25)
+    def speak(self, message, wait=True, priority=PRIORITY_NORMAL):
+        """Queue speech (played with LED animation by the step loop). Returns the Utterance."""
+        utterance = self.speech.say(message, priority)
+        token = current_token()
+        if token is not None:
+            token.on_cancel(utterance.cancel)
+        if wait:
+            self._wait_speech(utterance)
+        return utterance
+
+    def _wait_speech(self, utterance):
+        utterance.wait()
+        token = current_token()
+        if token is not None:
+            token.check()
+
+    def wave(self, wait=True):
+        log.info("👋 Waving...")
+        return self.run_plan(self.wave_plan(), wait)
+
+    def blink_lights(self, wait=True):
+        log.info("✨ Blinking lights...")
+        return self.run_plan(self.blink_plan(), wait)
 
     def say_hello(self):
-        self.speak("Hello! I'm your Robo Desk Buddy!")
+        self.speak(HELLO_MESSAGE)
 
     def patrol_mode(self):
         """Simple patrol: move forward, turn, repeat."""
-        print("🚶 Starting patrol mode...")
-        for _ in range(4):
-            self.move_forward(2)
-            self.turn("right", 1)
-        self.stop()
-        print("🚶 Patrol mode ended.")
-    
+        log.info("🚶 Starting patrol mode...")
+        self.run_plan(self.patrol_plan())
+        log.info("🚶 Patrol mode ended.")
+
     def dance(self):
         """Simple dance routine."""
-        print("💃 Starting dance...")
-        for _ in range(2):
-            self.turn("left", 0.5)
-            self.turn("right", 0.5)
-        self.wave()
-        self.blink_lights()
-        print("💃 Dance ended.")
-    
+        log.info("💃 Starting dance...")
+        self.run_plan(self.dance_plan())
+        log.info("💃 Dance ended.")
+
     def turn_and_speak(self, message):
         """Turn left while speaking a message."""
-        print("🔄 Turning and speaking...")
-        self.run_async(lambda: self.turn("left", 3))
-        self.speak(message)
-        print("🔄 Turn and speak ended.")
-    
+        log.info("🔄 Turning and speaking...")
+        self.run_plan(self.turn_and_speak_plan(message))
+        log.info("🔄 Turn and speak ended.")
+
     def all_actions(self):
         """Perform all actions simultaneously."""
-        print("🤹 Performing all actions...")
-        self.run_async(lambda: self.move_forward(5))
-        self.run_async(self.wave)
-        self.run_async(self.blink_lights)
-        self.run_async(lambda: self.speak("I am dancing while moving!"))
-        print("🤹 All actions started.")
+        log.info("🤹 Performing all actions...")
+        self.run_plan(self.all_actions_plan(), wait=False)
+        log.info("🤹 All actions started.")
 
     # -----------------------
-    # Async thread runner
+    # Sequences (/sequence)
     # -----------------------
-    def run_async(self, func):
-        def wrapper():
-            try:
-                func()
-            except Exception as e:
-                print(f"❌ Thread error: {e}")
-            finally:
-                with self.action_lock:
-                    thr = threading.current_thread()
-                    if thr in self.active_threads:
-                        self.active_threads.remove(thr)
-
-        thread = threading.Thread(target=wrapper, daemon=True)
-        with self.action_lock:
-            self.active_threads.append(thread)
-        thread.start()
-        return thread
+    def start_sequence(self, plan):
+        """Run a compiled sequence plan on the step loop and keep a handle to it."""
+        sequence_id = next(self._sequence_ids)
+        plan.sequence_id = sequence_id
+        with self.sequence_lock:
+            self.sequences[sequence_id] = plan
+            while len(self.sequences) > self.max_sequences:
+                self.sequences.popitem(last=False)
+        log.info("🎬 Sequence %s '%s' started (%.1fs)", sequence_id, plan.name, plan.duration)
+        self.run_plan(plan, wait=False)
+        self.events.publish("sequence", **self._sequence_info(plan))
+        return self._sequence_info(plan)
+
+    def _sequence_info(self, plan):
+        elapsed = 0.0
+        if plan.start_time is not None:
+            end = plan.end_time if plan.end_time is not None else self.scheduler.now
+            elapsed = min(plan.duration, end - plan.start_time)
+        return {
+            "id": plan.sequence_id,
+            "name": plan.name,
+            "status": plan.status,
+            "duration": round(plan.duration, 3),
+            "elapsed": round(max(0.0, elapsed), 3),
+            "keyframes": len(plan.keyframes),
+        }
+
+    def sequence_status(self, sequence_id):
+        with self.sequence_lock:
+            plan = self.sequences.get(sequence_id)
+        return self._sequence_info(plan) if plan else None
+
+    def cancel_sequence(self, sequence_id):
+        with self.sequence_lock:
+            plan = self.sequences.get(sequence_id)
+        if plan is None:
+            return None
+        if not plan.done.is_set():
+            plan.cancel()
+            log.info("⏹️ Sequence %s cancelled", sequence_id)
+        return self._sequence_info(plan)
+
+    # -----------------------
+    # Async action runner
+    # -----------------------
+    def run_async(self, func, lane=None, name=None, coalesce_key=None, resources=(), preempt=False):
+        """Queue func on the bounded executor. Returns the job, or None if rejected.
+
+        With preempt, motion plans that drive any of resources are
+        cancelled too, including ones no job owns: plans started with
+        wait=False, /sequence plans and reminder cues.
+        """
+        job = self.executor.submit(func, lane=lane, name=name, coalesce_key=coalesce_key,
+                                   resources=resources, preempt=preempt)
+        if job is None:
+            log.warning("⏳ Executor busy, dropped '%s'", name or getattr(func, "__name__", "action"))
+            return None
+        if preempt and resources:
+            plans = self.scheduler.cancel(resources)
+            if plans:
+                log.info("⏹️ '%s' preempted %d motion plans", job.name, len(plans))
+        return job
+
+    def _on_job(self, job):
+        """Executor callback: push action started/finished to /events clients."""
+        self.events.publish("action", **job.to_dict())
 
     def stop_all(self):
-        print("🛑 Stopping all...")
-        with self.action_lock:
-            try:
-                self.head_motor.setPosition(0.0)
-                self.led_left.set(0)
-                self.led_right.set(0)
-            except Exception:
-                pass
-            self.set_wheel_velocity(0.0)
+        log.info("🛑 Stopping all...")
+        # Cancel in-flight actions first so none of them drives a motor again.
+        cancelled = self.executor.cancel_matching(ACTUATORS)
+        plans = self.scheduler.cancel()
+        if cancelled or plans:
+            log.info("⏹️ Cancelled %d actions and %d motion plans", len(cancelled), len(plans))
+        self.speech.clear()
+        # Stop outranks any keyframe written in the same step.
+        self.actuators.write_many({"head": 0.0, "led_left": 0, "led_right": 0}, PRIORITY_STOP)
+        self.set_wheel_velocity_differential(0.0, 0.0, PRIORITY_STOP)
+        self.events.publish("stopped")
+
+    def lock_stats(self):
+        """Wait-time counters for every lock domain, including executor lanes."""
+        report = {self.task_lock.name: self.task_lock.stats()}
+        report.update(self.actuators.lock_stats())
+        report.update(self.executor.lock_stats())
+        return report
+
+    def _register_metrics(self):
+        """Scrape-time metrics read from counters the robot already keeps."""
+        def per_lock(key, scale=1):
+            return lambda: {(name,): s[key] * scale for name, s in self.lock_stats().items()}
+
+        def per_lane(key):
+            return lambda: {(name,): s[key] for name, s in self.executor.stats().items()}
+
+        REGISTRY.callback("deskbuddy_lock_acquisitions_total", "Lock acquisitions, by lock",
+                          per_lock("acquisitions"), "counter", ["lock"])
+        REGISTRY.callback("deskbuddy_lock_contended_total", "Lock acquisitions that had to wait, by lock",
+                          per_lock("contended"), "counter", ["lock"])
+        REGISTRY.callback("deskbuddy_lock_wait_seconds_total", "Time spent waiting for locks, by lock",
+                          per_lock("wait_total_ms", 0.001), "counter", ["lock"])
+        REGISTRY.callback("deskbuddy_threads", "Live Python threads", threading.active_count)
+        REGISTRY.callback("deskbuddy_executor_queue_depth", "Jobs waiting, by executor lane",
+                          per_lane("depth"), labels=["lane"])
+        REGISTRY.callback("deskbuddy_executor_running", "Jobs running, by executor lane",
+                          per_lane("running"), labels=["lane"])
+        REGISTRY.callback("deskbuddy_executor_rejected_total", "Jobs refused because their lane was full",
+                          per_lane("rejected"), "counter", ["lane"])
+        REGISTRY.callback("deskbuddy_tasks", "Tasks in the local store", lambda: len(self.tasks))
+        REGISTRY.callback("deskbuddy_event_subscribers", "Connected /events clients",
+                          lambda: self.events.stats()["subscribers"])
+        REGISTRY.callback("deskbuddy_speech_pending", "Utterances waiting for the speaker",
+                          lambda: self.speech.stats()["pending"])
 
     # -----------------------
-    # Input handling (typing)
+    # Input handling (keyboard)
     # -----------------------
-    def handle_debug_typing(self, key):
-        """DEBUG MODE: IMMEDIATE PRINT - Test typing and find special key codes."""
-        
-        # PRINT EVERY KEY IMMEDIATELY - NO CONDITIONS
-        print(f"[KEY={key}]", end="", flush=True)
-        
+    def handle_keys(self, events, now):
+        """Handle one step's key events. Returns False when Q asks to quit."""
+        for key, repeat in events:
+            if self.input_mode == "debug_typing":
+                self.handle_debug_typing(key, repeat)
+                continue
+            if self.input_mode == "adding_reminder":
+                self.handle_reminder_input(key, repeat)
+                continue
+            # Commands fire once per press; holding a key does not repeat them.
+            if repeat:
+                continue
+
+            # Registered commands
+            binding = COMMANDS.key_binding(key)
+            if binding:
+                label, command, params = binding
+                if self.keys.ready(label, now, self.key_cooldown):
+                    COMMANDS.dispatch(self, command, params)
+
+            # Debug Mode
+            elif key == ord('X'):
+                if self.keys.ready('X', now, self.key_cooldown):
+                    self.input_mode = "debug_typing"
+                    self.typed.clear()
+                    print("\n" + "=" * 60)
+                    print("🐛 DEBUG TYPING MODE")
+                    print("=" * 60)
+                    print("Type anything. Special keys will show their codes.")
+                    print("Press TAB to exit debug mode.")
+                    print("=" * 60 + "\n")
+                    print("Debug: ", end="", flush=True)
+
+            # Reminders
+            elif key == ord('M'):
+                if self.keys.ready('M', now, self.key_cooldown):
+                    self.input_mode = "adding_reminder"
+                    self.typed.clear()
+                    print("\n" + "=" * 60)
+                    print("⏰ ADD REMINDER MODE - NATURAL LANGUAGE")
+                    print("=" * 60)
+                    print("Type your reminder and press ENTER (Webots ENTER=4)")
+                    print("Press TAB to cancel")
+                    print("=" * 60)
+                    print("Examples: 'nov 21', '21st november', '21/11', 'tomorrow at 5pm'")
+                    print("=" * 60 + "\n")
+                    # NO SPEECH - just show the prompt immediately
+                    print("Reminder: ", end="", flush=True)
+
+            # System
+            elif key == ord('Q'):
+                if self.keys.ready('Q', now, self.key_cooldown):
+                    print("👋 Quitting...")
+                    self.stop_all()
+                    return False
+        return True
+
+    def handle_debug_typing(self, key, repeat=False):
+        """DEBUG MODE: echo every key code, to find special key codes."""
+        self.keys.echo(f"[KEY={key}]")
+
         # Exit on TAB
-        if key == 1:
+        if key == KEY_TAB:
+            if repeat:
+                return
             self.input_mode = "idle"
-            self.typed_text = ""
-            print("\n✅ DEBUG MODE ENDED\n")
+            self.typed.clear()
+            self.keys.echo("\n✅ DEBUG MODE ENDED\n\n")
             return
-        
+
         # If printable, also show the character
         if 32 <= key <= 126:
             ch = chr(key)
-            self.typed_text += ch
-            print(f"'{ch}' ", end="", flush=True)
-        
+            self.typed.append(ch)
+            self.keys.echo(f"'{ch}' ")
+
         # Show text after ENTER
-        if key == 4:
-            print(f"\n📝 Full text: '{self.typed_text}'\n")
-            print("Debug: ", end="", flush=True)
-    
-    def handle_reminder_input(self, key):
-        """Handle typing for reminder mode with proper key debouncing."""
-        
-        # Webots special keys (confirmed non-standard)
-        WEBOTS_BACKSPACE = 3
-        WEBOTS_ENTER = 4
-        WEBOTS_ESC = 1  # TAB key = 1 in Webots
-        
+        if key == KEY_ENTER and not repeat:
+            self.keys.echo(f"\n📝 Full text: '{self.typed.text()}'\n\nDebug: ")
+
+    def handle_reminder_input(self, key, repeat=False):
+        """Handle typing for reminder mode. Held characters and BACKSPACE repeat."""
         # ENTER key (Webots uses key 4)
-        if key == WEBOTS_ENTER:
-            if not self.is_key_ready('ENTER', cooldown=0.3):
-                return  # Debounce
-            reminder_text = self.typed_text.strip()
+        if key == KEY_ENTER:
+            if repeat:
+                return
+            reminder_text = self.typed.text().strip()
+            self.keys.flush_echo()
             if reminder_text:
                 print(f"\n\n🔍 Processing: '{reminder_text}'")
                 self.add_reminder_from_text(reminder_text)
                 self.input_mode = "idle"
-                self.typed_text = ""
+                self.typed.clear()
                 print("\n✅ Reminder created! Back to normal mode.\n")
             else:
                 print("\n⚠️ Cannot create empty reminder.")
             return
 
         # BACKSPACE key (Webots uses key 3)
-        if key == WEBOTS_BACKSPACE:
-            if not self.is_key_ready('BACKSPACE', cooldown=0.2):
-                return  # Debounce
-            if self.typed_text:
-                self.typed_text = self.typed_text[:-1]
+        if key == KEY_BACKSPACE:
+            if self.typed.backspace():
                 # Clear entire line and reprint with label
-                print(f"\r{' ' * 100}\rReminder: {self.typed_text}", end="", flush=True)
+                self.keys.echo(f"\r{' ' * 100}\rReminder: {self.typed.text()}")
             return
 
         # ESCAPE key (TAB = key 1 in Webots)
-        if key == WEBOTS_ESC:
-            if not self.is_key_ready('ESC', cooldown=0.3):
-                return  # Debounce
+        if key == KEY_TAB:
+            if repeat:
+                return
             self.input_mode = "idle"
-            self.typed_text = ""
-            print(f"\n\n❌ Reminder entry canceled. Back to normal mode.\n")
+            self.typed.clear()
+            self.keys.echo("\n\n❌ Reminder entry canceled. Back to normal mode.\n\n")
             return
 
-        # Printable characters (ASCII 32–126)
-        # Print character immediately, one at a time
+        # Printable characters (ASCII 32–126), echoed once per step
         if 32 <= key <= 126:
-            # Check cooldown to prevent repeats
-            if not self.is_key_ready(key, cooldown=0.12):
-                return  # Debounce - ignore this keypress
-            
-            try:
-                ch = chr(key)
-                self.typed_text += ch
-                # Print just the new character immediately
-                print(ch, end="", flush=True)
-            except Exception as e:
-                print(f"\n[ERROR] Failed to add character: {e}")
+            ch = chr(key)
+            self.typed.append(ch)
+            self.keys.echo(ch)
 
 
 # ==========================================
@@ -751,12 +1341,12 @@ class DeskBuddy(Robot):
 # ==========================================
 def main():
     global robot_instance
+    start_logging()
+    if Robot.__module__ == "mock_controller":
+        log.warning("🧪 Running on SIMULATED devices (mock_controller), not Webots")
     bot = DeskBuddy()
     robot_instance = bot
 
-    keyboard = bot.getKeyboard()
-    keyboard.enable(TIME_STEP)
-
     # Start Flask API thread
     api_thread = threading.Thread(target=start_api_server, daemon=True)
     api_thread.start()
@@ -773,6 +1363,8 @@ def main():
     print("SYSTEM:    S=Stop All | Q=Quit")
     print("=" * 70)
     print("📡 API: http://localhost:8000/command")
+    print(f"⏱️ Control step: {bot.budget.step_ms} ms "
+          f"({bot.budget.multiplier} x basicTimeStep {bot.budget.basic_step} ms)")
     print("=" * 70)
     print("\nExamples:")
     print("  'remind me at 5 pm tomorrow'")
@@ -780,119 +1372,28 @@ def main():
     print("  'call mom today at 3:30 pm'")
     print("=" * 70)
 
-    while bot.step(TIME_STEP) != -1:
-        key = keyboard.getKey()
-        if key == -1:
-            continue
-
-        # If in debug typing mode
-        if bot.input_mode == "debug_typing":
-            bot.handle_debug_typing(key)
-            continue
-
-        # If typing in reminder mode
-        if bot.input_mode == "adding_reminder":
-            bot.handle_reminder_input(key)
-            continue
-
-        # Idle mode controls
-        if key == ord('F'):
-            if bot.is_key_ready('F'):
-                bot.move_forward()
-        elif key == ord('R'):
-            if bot.is_key_ready('R'):
-                bot.move_backward()
-        elif key == ord('L'):
-            if bot.is_key_ready('L'):
-                bot.set_wheel_velocity_differential(-bot.turn_speed, bot.turn_speed)
-        elif key == ord('G'):
-            if bot.is_key_ready('G'):
-                bot.set_wheel_velocity_differential(bot.turn_speed, -bot.turn_speed)
-        elif key == ord(' '):
-            if bot.is_key_ready('SPACE'):
-                bot.stop()
-
-        # Threaded Movement
-        elif key == ord('P'):
-            if bot.is_key_ready('P'):
-                bot.run_async(bot.patrol_mode)
-        elif key == ord('D'):
-            if bot.is_key_ready('D'):
-                bot.run_async(bot.dance)
-        elif key == ord('Y'):
-            if bot.is_key_ready('Y'):
-                bot.run_async(bot.all_actions)
-        elif key == ord('T'):
-            if bot.is_key_ready('T'):
-                bot.run_async(lambda: bot.turn_and_speak("I am turning left while speaking!"))
-
-        # Actions
-        elif key == ord('W'):
-            if bot.is_key_ready('W'):
-                bot.run_async(bot.wave)
-        elif key == ord('B'):
-            if bot.is_key_ready('B'):
-                bot.run_async(bot.blink_lights)
-        elif key == ord('H'):
-            if bot.is_key_ready('H'):
-                bot.run_async(bot.say_hello)
-
-        # Debug Mode
-        elif key == ord('X'):
-            if bot.is_key_ready('X'):
-                bot.input_mode = "debug_typing"
-                bot.typed_text = ""
-                # Clear X from timestamps
-                bot.key_timestamps.clear()
-                print("\n" + "=" * 60)
-                print("🐛 DEBUG TYPING MODE")
-                print("=" * 60)
-                print("Type anything. Special keys will show their codes.")
-                print("Press TAB to exit debug mode.")
-                print("=" * 60 + "\n")
-                print("Debug: ", end="", flush=True)
-
-        # Reminders
-        elif key == ord('M'):
-            if bot.is_key_ready('M'):
-                bot.input_mode = "adding_reminder"
-                bot.typed_text = ""  # Clear any previous text
-                # Clear the 'M' key timestamp so it doesn't get registered as typed text
-                if 'M' in bot.key_timestamps:
-                    del bot.key_timestamps['M']
-                if ord('M') in bot.key_timestamps:
-                    del bot.key_timestamps[ord('M')]
-                print("\n" + "=" * 60)
-                print("⏰ ADD REMINDER MODE - NATURAL LANGUAGE")
-                print("=" * 60)
-                print("Type your reminder and press ENTER (Webots ENTER=4)")
-                print("Press TAB to cancel")
-                print("=" * 60)
-                print("Examples: 'nov 21', '21st november', '21/11', 'tomorrow at 5pm'")
-                print("=" * 60 + "\n")
-                # NO SPEECH - just show the prompt immediately
-                print("Reminder: ", end="", flush=True)
-
-        elif key == ord('K'):
-            if bot.is_key_ready('K'):
-                bot.run_async(bot.list_tasks_vocal)
-
-        elif key == ord('C'):
-            if bot.is_key_ready('C'):
-                bot.run_async(bot.clear_tasks)
-
-        # System
-        elif key == ord('S'):
-            if bot.is_key_ready('S'):
-                bot.stop_all()
-        elif key == ord('Q'):
-            if bot.is_key_ready('Q'):
-                print("👋 Quitting...")
-                bot.stop_all()
-                break
-
-    print("🤖 Desk Buddy shutting down...")
+    while bot.step(bot.budget.step_ms) != -1:
+        started = time.perf_counter()
+        bot.budget.begin(started)
+        sim_time = bot.getTime()
+        # Keys first, so what they start reaches the devices this step.
+        running = bot.handle_keys(bot.keys.drain(sim_time, started), sim_time)
+        bot.keys.flush_echo()
+        if not running:
+            break
+
+        bot.scheduler.tick(sim_time)
+        bot.speech.tick(sim_time)
+        bot.reminders.advance(time.time())
+        bot.flush_actuators()
+        bot.events.flush()
+        if bot.budget.end():
+            bot.keyboard.enable(bot.budget.step_ms)
+
+    log.info("🤖 Desk Buddy shutting down...")
+    bot.tasks.close()
+    stop_logging()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,143 @@
+import itertools
+import json
+import threading
+import time
+from collections import deque
+
+from async_log import get_logger
+
+log = get_logger("events")
+
+
+class Subscription:
+    """One push client. deliver(events) is called from the step loop."""
+
+    def __init__(self, deliver, max_backlog=256):
+        self.deliver = deliver
+        self.max_backlog = max_backlog
+        # Events handed over but not yet written out by the client.
+        self.backlog = 0
+        self.dropped = 0
+        # Set when events were dropped; the client should resend a snapshot.
+        self.overflowed = False
+        self._lock = threading.Lock()
+
+    def _reserve(self, count):
+        with self._lock:
+            if self.backlog >= self.max_backlog:
+                self.dropped += count
+                self.overflowed = True
+                return False
+            self.backlog += count
+            return True
+
+    def ack(self, count):
+        """Called by the client once it has written count events."""
+        with self._lock:
+            self.backlog = max(0, self.backlog - count)
+
+
+class EventBus:
+    """Collects robot events from any thread and pushes them once per step.
+
+    publish() only appends to a list, so actions, the executor and the API
+    never wait on a client. State values (wheels, LEDs) are coalesced: only
+    the last value per key within a step is sent, and only if it changed.
+    flush() is called from the step loop and hands each subscriber that
+    step's events in one batch, so updates reach clients within one
+    simulation step. With no events nothing is sent.
+    """
+
+    def __init__(self, history=256):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending = []
+        self._pending_state = {}
+        self._state = {}
+        self._history = deque(maxlen=history)
+        self._subscribers = []
+        self.published = 0
+        self.flushes = 0
+        self.dropped = 0
+
+    # -----------------------
+    # Producers (any thread)
+    # -----------------------
+    def publish(self, event_type, **data):
+        with self._lock:
+            self._pending.append((event_type, data, time.time()))
+
+    def set_state(self, key, value):
+        """Record the latest value of a piece of robot state."""
+        with self._lock:
+            self._pending_state[key] = value
+
+    def state(self):
+        with self._lock:
+            return dict(self._state)
+
+    # -----------------------
+    # Subscribers
+    # -----------------------
+    def subscribe(self, deliver, last_id=None, max_backlog=256):
+        """Register deliver(events); returns (subscription, missed events after last_id)."""
+        sub = Subscription(deliver, max_backlog)
+        with self._lock:
+            missed = [e for e in self._history if last_id is not None and e["id"] > last_id]
+            self._subscribers.append(sub)
+        return sub, missed
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    # -----------------------
+    # Step loop
+    # -----------------------
+    def flush(self):
+        """Deliver everything published since the last step."""
+        if not self._pending and not self._pending_state:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, []
+            state, self._pending_state = self._pending_state, {}
+            changed = {k: v for k, v in state.items() if self._state.get(k) != v}
+            self._state.update(changed)
+            events = []
+            if changed:
+                pending.append(("state", changed, time.time()))
+            for event_type, data, ts in pending:
+                event = {"id": next(self._ids), "type": event_type, "ts": round(ts, 3), "data": data}
+                events.append(event)
+                self._history.append(event)
+            subscribers = list(self._subscribers)
+            self.published += len(events)
+            self.flushes += 1
+        if not events:
+            return
+        for sub in subscribers:
+            if not sub._reserve(len(events)):
+                # Slow client: skip rather than buffer without bound.
+                self.dropped += len(events)
+                continue
+            try:
+                sub.deliver(events)
+            except Exception as e:
+                log.error("❌ Event delivery failed: %s", e)
+                self.unsubscribe(sub)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "flushes": self.flushes,
+                "dropped": self.dropped,
+            }
+
+
+def format_sse(event_type, data, event_id=None):
+    """One Server-Sent Events frame."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_type}\ndata: {json.dumps(data)}\n\n"
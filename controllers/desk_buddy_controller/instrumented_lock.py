@@ -0,0 +1,58 @@
+import threading
+import time
+
+
+class InstrumentedLock:
+    """threading.Lock that records how often and how long callers waited for it."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(False):
+            self.acquisitions += 1
+            return True
+        if not blocking:
+            return False
+        start = time.perf_counter()
+        acquired = self._lock.acquire(True, timeout)
+        if acquired:
+            waited = time.perf_counter() - start
+            # Counters are updated while holding the lock, so no extra guard is needed.
+            self.acquisitions += 1
+            self.contended += 1
+            self.wait_total += waited
+            if waited > self.wait_max:
+                self.wait_max = waited
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def _is_owned(self):
+        # Lets threading.Condition use this lock without its acquire(False)
+        # probe, which would otherwise inflate the acquisition counter.
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def stats(self):
+        return {
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "wait_total_ms": round(1000 * self.wait_total, 3),
+            "wait_max_ms": round(1000 * self.wait_max, 3),
+        }
@@ -0,0 +1,141 @@
+import time
+from collections import deque
+
+# Webots reports these non-standard codes for the editing keys.
+KEY_TAB = 1
+KEY_BACKSPACE = 3
+KEY_ENTER = 4
+
+
+class TextBuffer:
+    """A line being typed, kept as a list of characters."""
+
+    def __init__(self):
+        self._chars = []
+
+    def append(self, text):
+        self._chars.extend(text)
+
+    def backspace(self):
+        if not self._chars:
+            return False
+        self._chars.pop()
+        return True
+
+    def clear(self):
+        self._chars.clear()
+
+    def text(self):
+        return "".join(self._chars)
+
+    def __len__(self):
+        return len(self._chars)
+
+
+class KeyboardInput:
+    """Reads every key Webots reports, once per step.
+
+    Webots hands out the keys currently held one getKey() call at a time
+    until it returns -1. drain() empties that list every step, so no key
+    waits for a later step. A key counts as pressed on the first step it
+    appears and, while held, repeats after repeat_delay and then every
+    repeat_interval seconds. Debouncing runs on simulation time, so it
+    follows the simulation speed rather than the wall clock.
+
+    Echo output is collected during the step and printed once by
+    flush_echo(); the time from the step returning to that print is
+    recorded as the input-to-echo latency.
+    """
+
+    def __init__(self, keyboard, repeat_delay=0.5, repeat_interval=0.1, max_keys=16):
+        self.keyboard = keyboard
+        self.repeat_delay = repeat_delay
+        self.repeat_interval = repeat_interval
+        # Webots reports at most 7 keys; the cap only guards against a stuck device.
+        self.max_keys = max_keys
+        # code -> simulation time of its next repeat, for keys held last step
+        self._held = {}
+        # label -> simulation time it last fired, for ready()
+        self._fired = {}
+        self._echo = []
+        self._step_started = None
+        self.latencies = deque(maxlen=512)
+        self.reads = 0
+        self.presses = 0
+        self.repeats = 0
+        self.debounced = 0
+        self.max_per_step = 0
+
+    def drain(self, now, started=None):
+        """Key events for the step at simulation time now, as (code, repeat) pairs.
+
+        started is the perf_counter() value taken when the step returned.
+        """
+        self._step_started = time.perf_counter() if started is None else started
+        codes = []
+        for _ in range(self.max_keys):
+            code = self.keyboard.getKey()
+            if code == -1:
+                break
+            codes.append(code)
+        self.reads += len(codes)
+        self.max_per_step = max(self.max_per_step, len(codes))
+
+        events = []
+        held = {}
+        for code in codes:
+            if code in held:
+                continue
+            next_repeat = self._held.get(code)
+            if next_repeat is None:
+                self.presses += 1
+                events.append((code, False))
+                held[code] = now + self.repeat_delay
+            elif now >= next_repeat:
+                self.repeats += 1
+                events.append((code, True))
+                held[code] = now + self.repeat_interval
+            else:
+                held[code] = next_repeat
+        self._held = held
+        return events
+
+    def ready(self, label, now, cooldown=0.2):
+        """True if label has not fired within cooldown seconds of simulation time."""
+        last = self._fired.get(label)
+        if last is not None and now - last < cooldown:
+            self.debounced += 1
+            return False
+        self._fired[label] = now
+        return True
+
+    # -----------------------
+    # Echo
+    # -----------------------
+    def echo(self, text):
+        self._echo.append(text)
+
+    def flush_echo(self):
+        """Print this step's echo in one write."""
+        if not self._echo:
+            return
+        text, self._echo = "".join(self._echo), []
+        print(text, end="", flush=True)
+        if self._step_started is not None:
+            self.latencies.append(time.perf_counter() - self._step_started)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            "reads": self.reads,
+            "presses": self.presses,
+            "repeats": self.repeats,
+            "debounced": self.debounced,
+            "max_keys_per_step": self.max_per_step,
+            "echo_latency_ms": {
+                "avg": round(1000 * sum(latencies) / count, 3) if count else 0.0,
+                "p99": round(1000 * latencies[min(count - 1, int(count * 0.99))], 3) if count else 0.0,
+                "max": round(1000 * latencies[-1], 3) if count else 0.0,
+            },
+        }
@@ -0,0 +1,236 @@
+"""Headless stand-in for the Webots `controller` module.
+
+Provides Robot and Keyboard with simulated motors, LEDs, a speaker and a
+keyboard, so DeskBuddy, the API and the reminder subsystem run without
+Webots (in CI, load tests and benchmarks). Simulation time advances by
+the requested step on every step() call; step_latency adds a wall-clock
+delay per step, and the default of 0 runs as fast as the controller
+allows.
+
+The controller only uses it when DESKBUDDY_MOCK=1, so a broken Webots
+install fails loudly instead of driving fake devices.
+
+    DESKBUDDY_MOCK_STEP_LATENCY  seconds of wall time per step (default 0)
+    DESKBUDDY_MOCK_MAX_STEPS     stop the simulation after this many steps
+"""
+import os
+import time
+
+# Matches basicTimeStep in worlds/Deskworld.wbt
+BASIC_TIME_STEP = 16.0
+
+
+class Device:
+    def __init__(self, name):
+        self.name = name
+        self.writes = 0
+
+    def getName(self):
+        return self.name
+
+    def _advance(self, now, dt):
+        pass
+
+
+class Motor(Device):
+    """Position control, or velocity control once the position is set to inf."""
+
+    def __init__(self, name, max_velocity=10.0):
+        super().__init__(name)
+        self.max_velocity = max_velocity
+        self.position = 0.0
+        self.target = 0.0
+        self.velocity = max_velocity
+
+    def setPosition(self, position):
+        self.writes += 1
+        self.target = position
+
+    def setVelocity(self, velocity):
+        self.writes += 1
+        self.velocity = max(-self.max_velocity, min(self.max_velocity, velocity))
+
+    def getTargetPosition(self):
+        return self.target
+
+    def getVelocity(self):
+        return self.velocity
+
+    def getMaxVelocity(self):
+        return self.max_velocity
+
+    def _advance(self, now, dt):
+        if self.target in (float("inf"), float("-inf")):
+            self.position += self.velocity * dt
+            return
+        step = abs(self.velocity) * dt
+        delta = self.target - self.position
+        self.position = self.target if abs(delta) <= step else self.position + step * (1 if delta > 0 else -1)
+
+
+class LED(Device):
+    def __init__(self, name):
+        super().__init__(name)
+        self.value = 0
+
+    def set(self, value):
+        self.writes += 1
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class Speaker(Device):
+    """Speaks for about 0.28 s of simulation time per word.
+
+    As in Webots, isSpeaking() only turns true on the step after speak().
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.language = "en-US"
+        self.spoken = []
+        self._queued = None
+        self._until = 0.0
+        self._now = 0.0
+
+    def setLanguage(self, language):
+        self.language = language
+        return True
+
+    def getLanguage(self):
+        return self.language
+
+    def speak(self, text, volume=1.0):
+        self.writes += 1
+        self.spoken.append(text)
+        self._queued = max(1.0, len(text.split()) * 0.28)
+
+    def isSpeaking(self):
+        return self._now < self._until
+
+    def _advance(self, now, dt):
+        self._now = now
+        if self._queued is not None:
+            self._until = now + self._queued
+            self._queued = None
+
+
+class Keyboard:
+    """Simulated keyboard. Keys are injected with press(), hold() or type()."""
+
+    SHIFT = 65536
+    CONTROL = 131072
+    ALT = 262144
+    KEY = 65535
+    END = 312
+    HOME = 313
+    LEFT = 314
+    UP = 315
+    RIGHT = 316
+    DOWN = 317
+    PAGEUP = 366
+    PAGEDOWN = 367
+    NUMPAD_HOME = 375
+    NUMPAD_LEFT = 376
+    NUMPAD_UP = 377
+    NUMPAD_RIGHT = 378
+    NUMPAD_DOWN = 379
+    NUMPAD_END = 382
+
+    def __init__(self):
+        self.sampling_period = 0
+        # Steps still to report, each a list of held key codes.
+        self._script = []
+        self._current = []
+
+    def enable(self, sampling_period):
+        self.sampling_period = sampling_period
+
+    def disable(self):
+        self.sampling_period = 0
+
+    def getSamplingPeriod(self):
+        return self.sampling_period
+
+    def getKey(self):
+        return self._current.pop(0) if self._current else -1
+
+    def press(self, key, steps=1):
+        """Hold key (a code or a character) for the next steps steps."""
+        self.hold([key], steps)
+
+    def hold(self, keys, steps=1):
+        codes = [ord(k) if isinstance(k, str) else k for k in keys]
+        for i in range(steps):
+            if i < len(self._script):
+                self._script[i] = self._script[i] + codes
+            else:
+                self._script.append(list(codes))
+
+    def type(self, text):
+        """Queue text one key per step, after anything already queued."""
+        for ch in text:
+            self._script.append([ord(ch.upper())])
+            # A key must be released before it can be pressed again.
+            self._script.append([])
+
+    def _advance(self):
+        self._current = self._script.pop(0) if self._script else []
+
+
+class Robot:
+    """Headless robot: devices are created on first getDevice() by name."""
+
+    step_latency = float(os.environ.get("DESKBUDDY_MOCK_STEP_LATENCY", "0"))
+    max_steps = int(os.environ["DESKBUDDY_MOCK_MAX_STEPS"]) if os.environ.get("DESKBUDDY_MOCK_MAX_STEPS") else None
+
+    def __init__(self):
+        self._time = 0.0
+        self._devices = {}
+        self._keyboard = Keyboard()
+        self.steps = 0
+
+    def getDevice(self, name):
+        device = self._devices.get(name)
+        if device is None:
+            if name.endswith("_motor"):
+                device = Motor(name)
+            elif "led" in name:
+                device = LED(name)
+            elif "speaker" in name:
+                device = Speaker(name)
+            else:
+                device = Device(name)
+            self._devices[name] = device
+        return device
+
+    def getKeyboard(self):
+        return self._keyboard
+
+    def getBasicTimeStep(self):
+        return BASIC_TIME_STEP
+
+    def getTime(self):
+        return self._time
+
+    def getName(self):
+        return "mock"
+
+    def step(self, duration):
+        if self.max_steps is not None and self.steps >= self.max_steps:
+            return -1
+        dt = duration / 1000.0
+        self._time += dt
+        self.steps += 1
+        for device in self._devices.values():
+            device._advance(self._time, dt)
+        self._keyboard._advance()
+        if self.step_latency > 0:
+            time.sleep(self.step_latency)
+        return 0
+
+    def device_writes(self):
+        """Writes per device since start, for benchmarks."""
+        return {name: device.writes for name, device in self._devices.items()}
@@ -0,0 +1,154 @@
+import threading
+
+from async_log import get_logger
+
+log = get_logger("motion")
+
+
+class MotionPlan:
+    """Timed keyframes for one action, expressed as offsets in simulation seconds.
+
+    Each keyframe is (offset, channel, value). The scheduler applies it on the
+    first step whose simulation time reaches plan start + offset. Work a
+    keyframe starts that outlives its step, such as queued speech, is
+    kept as a handle and cancelled with the plan.
+    """
+
+    def __init__(self, name="plan"):
+        self.name = name
+        self.keyframes = []
+        self.duration = 0.0
+        self.start_time = None
+        self.end_time = None
+        self.done = threading.Event()
+        self.cancelled = False
+        self._cursor = 0
+        # Objects with cancel() returned by apply(), e.g. queued Utterances
+        self._handles = []
+
+    def at(self, offset, channel, value):
+        """Add a keyframe at offset seconds from the plan start."""
+        self.keyframes.append((offset, channel, value))
+        self.duration = max(self.duration, offset)
+        return self
+
+    def hold(self, until):
+        """Keep the plan running until the given offset even without keyframes."""
+        self.duration = max(self.duration, until)
+        return self
+
+    def merge(self, other, offset=0.0):
+        """Overlay another plan's keyframes, shifted by offset."""
+        for kf_offset, channel, value in other.keyframes:
+            self.at(offset + kf_offset, channel, value)
+        self.hold(offset + other.duration)
+        return self
+
+    def then(self, other):
+        """Append another plan after this one finishes."""
+        return self.merge(other, self.duration)
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def cancel(self):
+        """Stop the plan on the next step; channels it drove go back to rest and its queued speech is dropped."""
+        self.cancelled = True
+        for handle in list(self._handles):
+            handle.cancel()
+
+    @property
+    def status(self):
+        if self.done.is_set():
+            return "cancelled" if self.cancelled else "done"
+        if self.cancelled:
+            return "cancelling"
+        return "queued" if self.start_time is None else "running"
+
+
+class MotionScheduler:
+    """Applies MotionPlan keyframes from the simulation step loop.
+
+    Plans can be submitted from any thread; tick() must be called once per
+    robot.step() with the current simulation time, and is the only place
+    keyframes are applied. apply(channel, value) may return a handle with
+    cancel() for work that outlives the step; cancelling the plan cancels it.
+    """
+
+    def __init__(self, apply, rest=None):
+        self._apply = apply
+        # channel -> value written when a plan driving it is cancelled
+        self.rest = rest or {}
+        self._lock = threading.Lock()
+        self._incoming = []
+        self._active = []
+        self.now = 0.0
+
+    def submit(self, plan):
+        plan.keyframes.sort(key=lambda kf: kf[0])
+        with self._lock:
+            self._incoming.append(plan)
+        return plan
+
+    def tick(self, now):
+        """Apply every keyframe that is due at simulation time now."""
+        self.now = now
+        with self._lock:
+            if self._incoming:
+                for plan in self._incoming:
+                    plan.start_time = now
+                self._active.extend(self._incoming)
+                self._incoming = []
+        if not self._active:
+            return
+
+        still_active = []
+        for plan in self._active:
+            if plan.cancelled:
+                self._rest(plan)
+                plan.end_time = now
+                plan.done.set()
+                continue
+            keyframes = plan.keyframes
+            elapsed = now - plan.start_time + 1e-9
+            while plan._cursor < len(keyframes) and keyframes[plan._cursor][0] <= elapsed:
+                _, channel, value = keyframes[plan._cursor]
+                plan._cursor += 1
+                try:
+                    handle = self._apply(channel, value)
+                except Exception as e:
+                    log.error("❌ Keyframe %s/%s failed: %s", plan.name, channel, e)
+                    continue
+                if handle is not None:
+                    plan._handles.append(handle)
+            if plan._cursor >= len(keyframes) and elapsed >= plan.duration:
+                plan.end_time = now
+                plan.done.set()
+            else:
+                still_active.append(plan)
+        self._active = still_active
+
+    def _rest(self, plan):
+        # Also catches a handle added while cancel() was running on another thread.
+        for handle in plan._handles:
+            handle.cancel()
+        channels = {channel for _, channel, _ in plan.keyframes[:plan._cursor]}
+        for channel in channels:
+            if channel in self.rest:
+                try:
+                    self._apply(channel, self.rest[channel])
+                except Exception as e:
+                    log.error("❌ Resetting %s after %s failed: %s", channel, plan.name, e)
+
+    def cancel(self, channels=None):
+        """Cancel queued and active plans that drive any of channels (all if None)."""
+        channels = set(channels) if channels is not None else None
+        cancelled = []
+        with self._lock:
+            for plan in self._incoming + self._active:
+                if plan.done.is_set() or plan.cancelled:
+                    continue
+                if channels is None or channels & {channel for _, channel, _ in plan.keyframes}:
+                    plan.cancel()
+                    cancelled.append(plan)
+        return cancelled
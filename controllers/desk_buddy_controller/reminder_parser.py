@@ -0,0 +1,258 @@
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+WEEKDAYS = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6
+}
+
+MONTH_NAMES = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2,
+    'mar': 3, 'march': 3, 'apr': 4, 'april': 4,
+    'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9,
+    'oct': 10, 'october': 10, 'nov': 11, 'november': 11,
+    'dec': 12, 'december': 12
+}
+
+# Longest names first so "september" is not read as "sep" + "tember".
+_MONTH_ALT = "|".join(sorted(MONTH_NAMES, key=len, reverse=True))
+_WEEKDAY_ALT = "|".join(WEEKDAYS)
+
+# Every date/time token the parser understands, as one alternation. A single
+# finditer() over the lower-cased text yields all tokens left to right.
+_TOKEN_RE = re.compile(
+    rf"""
+      \b(?P<hm>\d{{1,2}}:\d{{2}})(?:\s*(?P<hm_ampm>am|pm)\b|\b)
+    | \b(?P<h>\d{{1,2}})\s*(?P<h_ampm>am|pm)\b
+    | \b(?P<md_month>{_MONTH_ALT})\s+(?P<md_day>\d{{1,2}})\b
+    | \b(?P<dm_day>\d{{1,2}})(?:st|nd|rd|th)?\s+(?P<dm_month>{_MONTH_ALT})\b
+    | \b(?P<num1>\d{{1,2}})[/\-](?P<num2>\d{{1,2}})\b
+    | \b(?P<rel>tomorrow|today)\b
+    | (?P<next_week>next\ week)
+    | \b(?P<wd_next>next\s+)?(?P<wd>{_WEEKDAY_ALT})\b
+    """,
+    re.VERBOSE,
+)
+_SPACES_RE = re.compile(r'\s+')
+_FILLER_RE = re.compile(r'\b(remind me|reminder|on|at)\b', re.IGNORECASE)
+
+# Relative dates in the order the original if/elif chain checked them.
+_REL_PRIORITY = ("tomorrow", "today", "next week")
+_REL_DAYS = {"tomorrow": 1, "today": 0, "next week": 7}
+
+
+def _to_24h(hour, ampm):
+    if ampm == 'pm' and hour != 12:
+        hour += 12
+    if ampm == 'am' and hour == 12:
+        hour = 0
+    return hour
+
+
+def _next_occurrence(now, month, day):
+    candidate = datetime(now.year, month, day)
+    if candidate < now:
+        candidate = datetime(now.year + 1, month, day)
+    return candidate
+
+
+def parse_reminder(text, now=None):
+    """Extract (task_name, date, time) from a natural-language reminder.
+
+    All tokens are found in one pass of a precompiled scanner; the matched
+    spans are then cut out of the text to leave the task name.
+    """
+    now = now or datetime.now()
+    today = now.strftime("%Y-%m-%d")
+    reminder_date = today
+    reminder_time = "12:00"
+    text_lower = text.lower()
+
+    hm = h = numeric = None
+    rel = {}
+    weekday = month_day = day_month = None
+    weekday_next = False
+    weekday_spans = []
+    month_day_spans = []
+    day_month_spans = []
+
+    for m in _TOKEN_RE.finditer(text_lower):
+        if m.group('hm'):
+            if hm is None:
+                hm = m
+        elif m.group('h'):
+            if h is None:
+                h = m
+        elif m.group('md_month'):
+            month = MONTH_NAMES[m.group('md_month')]
+            if month_day is None or month < month_day[0]:
+                month_day = (month, m)
+                month_day_spans = []
+            if month == month_day[0]:
+                month_day_spans.append(m.span())
+        elif m.group('dm_month'):
+            month = MONTH_NAMES[m.group('dm_month')]
+            if day_month is None or month < day_month[0]:
+                day_month = (month, m)
+                day_month_spans = []
+            if month == day_month[0]:
+                day_month_spans.append(m.span())
+        elif m.group('num1'):
+            if numeric is None:
+                numeric = m
+        elif m.group('wd'):
+            day_num = WEEKDAYS[m.group('wd')]
+            if weekday is None or day_num < weekday:
+                weekday = day_num
+                weekday_next = False
+                weekday_spans = []
+            if day_num == weekday:
+                weekday_next = weekday_next or bool(m.group('wd_next'))
+                weekday_spans.append(m.span())
+        elif m.group('next_week'):
+            rel.setdefault('next week', []).append(m.span())
+        else:
+            rel.setdefault(m.group('rel'), []).append(m.span())
+
+    removed = []
+
+    # TIME
+    if hm is not None:
+        hour, minute = map(int, hm.group('hm').split(':'))
+        ampm = hm.group('hm_ampm')
+        if ampm:
+            hour = _to_24h(hour, ampm)
+        reminder_time = f"{hour:02d}:{minute:02d}"
+        removed.append(hm.span())
+    elif h is not None:
+        hour = _to_24h(int(h.group('h')), h.group('h_ampm'))
+        reminder_time = f"{hour:02d}:00"
+        removed.append(h.span())
+
+    # Relative DATE
+    for word in _REL_PRIORITY:
+        if word in rel:
+            reminder_date = (now + timedelta(days=_REL_DAYS[word])).strftime("%Y-%m-%d")
+            removed.extend(rel[word])
+            break
+
+    # Weekday names
+    if weekday is not None:
+        days_ahead = (weekday - now.weekday()) % 7
+        if weekday_next:
+            days_ahead += 7
+        elif days_ahead == 0 and 'next ' in text_lower:
+            days_ahead = 7
+        reminder_date = (now + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
+        removed.extend(weekday_spans)
+
+    # Month name + day ("nov 21"), then day + month name ("21st november")
+    for found, spans, day_group in ((month_day, month_day_spans, 'md_day'),
+                                    (day_month, day_month_spans, 'dm_day')):
+        if found is None:
+            continue
+        month, m = found
+        try:
+            reminder_date = _next_occurrence(now, month, int(m.group(day_group))).strftime("%Y-%m-%d")
+            removed.extend(spans)
+        except ValueError:
+            pass
+
+    # Numeric "21/11" (DD/MM); only when nothing else set the date
+    if numeric is not None and reminder_date == today:
+        part1 = int(numeric.group('num1'))
+        part2 = int(numeric.group('num2'))
+        if part1 <= 31 and part2 <= 12:
+            try:
+                reminder_date = _next_occurrence(now, part2, part1).strftime("%Y-%m-%d")
+                removed.append(numeric.span())
+            except ValueError:
+                pass
+
+    # Cut matched spans out of the original text (same offsets as text_lower
+    # unless lower-casing changed the length, which only happens for a few
+    # non-ASCII characters).
+    source = text if len(text) == len(text_lower) else text_lower
+    if removed:
+        pieces = []
+        pos = 0
+        for start, end in sorted(set(removed)):
+            if start >= pos:
+                pieces.append(source[pos:start])
+                pos = end
+        pieces.append(source[pos:])
+        source = "".join(pieces)
+
+    # Final cleanup
+    task_name = _SPACES_RE.sub(' ', source.strip())
+    task_name = _FILLER_RE.sub('', task_name).strip()
+    task_name = task_name.lstrip(',:;-').strip()
+    if not task_name:
+        task_name = "Reminder"
+
+    return task_name, reminder_date, reminder_time
+
+
+def normalize_reminder_text(text):
+    """Cache key for a phrase: whitespace collapsed; case kept, since names keep it."""
+    return " ".join(text.split())
+
+
+class ReminderParseCache:
+    """LRU cache in front of parse_reminder.
+
+    Keys are the normalized phrase; the whole cache belongs to one calendar
+    day, because relative phrases ("tomorrow", "friday", "nov 21") resolve
+    against today's date. The first lookup on a new day drops every entry.
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._day = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def parse(self, text, now=None):
+        now = now or datetime.now()
+        day = now.date()
+        key = normalize_reminder_text(text)
+        with self._lock:
+            if day != self._day:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._day = day
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+        result = parse_reminder(key, now)
+        with self._lock:
+            if day == self._day and self.maxsize > 0:
+                self._entries[key] = result
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return result
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,175 @@
+import math
+import threading
+
+from task_store import parse_due
+from task_sync_queue import task_key
+
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS
+LEVELS = 5  # 64**5 one-second ticks is roughly 34 years
+
+
+class _Timer:
+    __slots__ = ("tick", "key", "task", "cancelled")
+
+    def __init__(self, tick, key, task):
+        self.tick = tick
+        self.key = key
+        self.task = task
+        self.cancelled = False
+
+
+class ReminderScheduler:
+    """Hierarchical timer wheel that fires reminders when they come due.
+
+    Level 0 has 64 one-second slots, and each higher level's slot covers 64
+    of the level below. Scheduling and cancelling are O(1). advance() does
+    O(1) work per elapsed tick, plus moving a timer down one level each
+    time its slot is reached. advance() is called from the step loop with
+    the wall clock, so no thread waits per reminder.
+    """
+
+    def __init__(self, on_fire, resolution=1.0, grace=60.0):
+        self.on_fire = on_fire
+        self.resolution = resolution
+        # Tasks already overdue by more than this are not announced.
+        self.grace = grace
+        self._lock = threading.Lock()
+        self._wheels = [[[] for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self._overflow = []
+        self._timers = {}
+        self._fired = set()
+        self._current = None
+        self.fired = 0
+
+    def _to_tick(self, timestamp):
+        return math.ceil(timestamp / self.resolution)
+
+    def _place(self, timer):
+        if timer.tick <= self._current:
+            timer.tick = self._current + 1
+        delta = timer.tick - self._current
+        for level in range(LEVELS):
+            if delta < 1 << (SLOT_BITS * (level + 1)):
+                slot = (timer.tick >> (SLOT_BITS * level)) & (SLOTS - 1)
+                self._wheels[level][slot].append(timer)
+                return
+        self._overflow.append(timer)
+
+    # -----------------------
+    # Scheduling
+    # -----------------------
+    def _entry(self, task):
+        """(key, due timestamp) for task, or None when it has no due time."""
+        due = parse_due(task)
+        if due.year == 9999:
+            return None
+        due_ts = due.timestamp()
+        return (task_key(task) or task.get("name"), due_ts), due_ts
+
+    def _schedule(self, task, key, due_ts, now):
+        if key in self._timers or key in self._fired or due_ts < now - self.grace:
+            return
+        timer = _Timer(self._to_tick(due_ts), key, task)
+        self._timers[key] = timer
+        if self._current is None:
+            self._current = math.floor(now / self.resolution)
+        self._place(timer)
+
+    def _entries(self, tasks):
+        # Parsing due dates is the slow part, so it runs before the lock is
+        # taken; advance() on the step loop only waits for the dict updates.
+        entries = []
+        for task in tasks:
+            entry = self._entry(task)
+            if entry is not None:
+                entries.append((task,) + entry)
+        return entries
+
+    def schedule(self, tasks, now):
+        """Add reminders for tasks that are not already scheduled or fired."""
+        entries = self._entries(tasks)
+        with self._lock:
+            for task, key, due_ts in entries:
+                self._schedule(task, key, due_ts, now)
+
+    def replace(self, tasks, now):
+        """Make the pending set match tasks: cancel missing ones, schedule new ones."""
+        entries = self._entries(tasks)
+        keep = {key for _, key, _ in entries}
+        with self._lock:
+            for key in [key for key in self._timers if key not in keep]:
+                self._timers.pop(key).cancelled = True
+            self._fired &= keep
+            for task, key, due_ts in entries:
+                self._schedule(task, key, due_ts, now)
+
+    def cancel(self, task):
+        """Drop the pending reminder for task, if any."""
+        entry = self._entry(task)
+        if entry is None:
+            return
+        with self._lock:
+            timer = self._timers.pop(entry[0], None)
+            if timer is not None:
+                timer.cancelled = True
+
+    def clear(self):
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancelled = True
+            self._timers.clear()
+
+    # -----------------------
+    # Step loop
+    # -----------------------
+    def advance(self, now):
+        """Fire every reminder due at or before now (wall-clock seconds)."""
+        target = math.floor(now / self.resolution)
+        due = []
+        with self._lock:
+            if self._current is None or not self._timers:
+                # Nothing pending: jump straight to now instead of walking empty slots.
+                self._current = max(self._current or target, target)
+                return
+            while self._current < target and self._timers:
+                self._current += 1
+                self._cascade()
+                index = self._current & (SLOTS - 1)
+                slot = self._wheels[0][index]
+                if slot:
+                    self._wheels[0][index] = []
+                    for timer in slot:
+                        if not timer.cancelled:
+                            due.append(timer)
+                            self._timers.pop(timer.key, None)
+                            self._fired.add(timer.key)
+            self._current = max(self._current, target) if not self._timers else self._current
+        for timer in due:
+            self.fired += 1
+            self.on_fire(timer.task)
+
+    def _cascade(self):
+        """Move timers down from every higher-level slot the cursor just entered."""
+        levels = []
+        for level in range(1, LEVELS):
+            if self._current & ((1 << (SLOT_BITS * level)) - 1):
+                break
+            levels.append(level)
+        if levels and levels[-1] == LEVELS - 1 and self._overflow:
+            overflow, self._overflow = self._overflow, []
+            for timer in overflow:
+                if not timer.cancelled:
+                    self._place(timer)
+        for level in reversed(levels):
+            index = (self._current >> (SLOT_BITS * level)) & (SLOTS - 1)
+            timers = self._wheels[level][index]
+            if timers:
+                self._wheels[level][index] = []
+                for timer in timers:
+                    if not timer.cancelled:
+                        self._place(timer)
+
+    def stats(self):
+        with self._lock:
+            return {"pending": len(self._timers), "fired": self.fired}
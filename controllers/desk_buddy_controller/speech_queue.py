@@ -0,0 +1,207 @@
+import heapq
+import itertools
+import threading
+
+from async_log import get_logger
+
+log = get_logger("speech")
+
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+
+
+class Utterance:
+    """One queued piece of speech; wait() blocks until it has been spoken."""
+
+    def __init__(self, text, priority):
+        self.text = text
+        self.priority = priority
+        self.status = "queued"
+        self.queued_at = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def cancel(self):
+        """Drop the utterance if it has not started playing yet."""
+        if self.status == "queued":
+            self.status = "cancelled"
+            self.done.set()
+
+    def _finish(self, status):
+        if not self.done.is_set():
+            self.status = status
+            self.done.set()
+
+
+class SpeechQueue:
+    """Single speaker queue, driven by the step loop.
+
+    say() can be called from any thread and never blocks. Utterances play
+    one at a time, highest priority first. An utterance identical to one
+    still waiting is not queued twice, and consecutive short utterances of
+    the same priority are merged into one speaker.speak() call. Playback
+    ends when speaker.isSpeaking() goes false, not after a word-count
+    guess, and the eye LEDs blink on simulation time while it plays.
+    """
+
+    def __init__(self, speaker, set_leds, volume=1.0, max_pending=32,
+                 merge_chars=160, short_chars=60, blink_interval=0.45):
+        self.speaker = speaker
+        # set_leds(value) buffers an LED setpoint for this step.
+        self.set_leds = set_leds
+        self.volume = volume
+        self.max_pending = max_pending
+        self.merge_chars = merge_chars
+        self.short_chars = short_chars
+        self.blink_interval = blink_interval
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._heap = []
+        self._pending = {}
+        self._playing = []
+        self._started_at = None
+        self._heard = False
+        self._deadline = None
+        self._led = 0
+        self.now = 0.0
+        self.spoken = 0
+        self.speak_calls = 0
+        self.merged = 0
+        self.deduped = 0
+        self.dropped = 0
+        self.wait_total = 0.0
+
+    # -----------------------
+    # Producers (any thread)
+    # -----------------------
+    def say(self, text, priority=PRIORITY_NORMAL):
+        """Queue text. Returns its Utterance (an existing one if text is already waiting)."""
+        text = " ".join(str(text).split())
+        with self._lock:
+            existing = self._pending.get(text)
+            if existing is not None and existing.status == "queued":
+                self.deduped += 1
+                existing.priority = max(existing.priority, priority)
+                return existing
+            utterance = Utterance(text, priority)
+            if not text:
+                utterance._finish("done")
+                return utterance
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                utterance._finish("dropped")
+                return utterance
+            utterance.queued_at = self.now
+            self._pending[text] = utterance
+            heapq.heappush(self._heap, (-priority, next(self._seq), utterance))
+        return utterance
+
+    def clear(self):
+        """Cancel everything still waiting. The current utterance plays out."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._heap = []
+        for utterance in pending.values():
+            utterance.cancel()
+        return len(pending)
+
+    # -----------------------
+    # Step loop
+    # -----------------------
+    def tick(self, now):
+        """Advance playback at simulation time now."""
+        self.now = now
+        if self._playing:
+            if not self._finished(now):
+                self._animate(now)
+                return
+            for utterance in self._playing:
+                utterance._finish("done")
+            self.spoken += len(self._playing)
+            self._playing = []
+            self._write_leds(0)
+        if self._pending:
+            self._start_next(now)
+
+    def _finished(self, now):
+        try:
+            speaking = self.speaker.isSpeaking()
+        except Exception:
+            # No playback state available: fall back to the deadline.
+            return now >= self._deadline
+        if speaking:
+            self._heard = True
+            return False
+        # isSpeaking() only turns true on the step after speak(); give it a second.
+        return self._heard or now - self._started_at >= 1.0 or now >= self._deadline
+
+    def _start_next(self, now):
+        with self._lock:
+            group = []
+            while self._heap:
+                neg_priority, _, utterance = self._heap[0]
+                if utterance.status != "queued":
+                    heapq.heappop(self._heap)
+                    if self._pending.get(utterance.text) is utterance:
+                        del self._pending[utterance.text]
+                    continue
+                if group:
+                    length = sum(len(u.text) + 1 for u in group) + len(utterance.text)
+                    if (-neg_priority != group[0].priority or len(utterance.text) > self.short_chars
+                            or len(group[-1].text) > self.short_chars or length > self.merge_chars):
+                        break
+                heapq.heappop(self._heap)
+                del self._pending[utterance.text]
+                utterance.status = "playing"
+                group.append(utterance)
+        if not group:
+            return
+        self.merged += len(group) - 1
+        for utterance in group:
+            self.wait_total += now - utterance.queued_at
+        text = " ".join(self._sentence(u.text) for u in group) if len(group) > 1 else group[0].text
+        words = len(text.split())
+        self._playing = group
+        self._started_at = now
+        self._heard = False
+        # Upper bound only; completion normally comes from isSpeaking().
+        self._deadline = now + max(1.0, words * 0.28) * 2 + 1.0
+        self.speak_calls += 1
+        log.info("🗣️ Speaking: '%s'", text)
+        try:
+            self.speaker.speak(text, self.volume)
+        except Exception as e:
+            log.error("❌ Speech failed: %s", e)
+            self._deadline = now
+        self._animate(now)
+
+    @staticmethod
+    def _sentence(text):
+        return text if text[-1] in ".!?" else text + "."
+
+    def _animate(self, now):
+        phase = int((now - self._started_at) / (self.blink_interval / 2)) % 2
+        self._write_leds(1 - phase)
+
+    def _write_leds(self, value):
+        if value != self._led:
+            self._led = value
+            self.set_leds(value)
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        started = self.spoken + len(self._playing)
+        return {
+            "pending": pending,
+            "playing": len(self._playing),
+            "spoken": self.spoken,
+            "speak_calls": self.speak_calls,
+            "merged": self.merged,
+            "deduped": self.deduped,
+            "dropped": self.dropped,
+            "avg_wait_s": round(self.wait_total / started, 3) if started else 0.0,
+        }
@@ -0,0 +1,123 @@
+import time
+from collections import deque
+
+from async_log import get_logger
+from metrics import REGISTRY
+
+log = get_logger("step")
+
+STEP_SECONDS = REGISTRY.histogram("deskbuddy_step_seconds", "Controller time per step, CPU and wall clock",
+                                  ["clock"], buckets=(0.0005, 0.001, 0.002, 0.004, 0.008, 0.016, 0.032,
+                                                      0.064, 0.128, 0.256))
+STEP_OVERRUNS = REGISTRY.counter("deskbuddy_step_overruns_total", "Steps whose controller CPU time exceeded the step")
+
+
+class StepBudget:
+    """Controller time per simulation step, measured against the step budget.
+
+    The control step is the world's basicTimeStep times multiplier, and
+    its length is the budget: at real-time speed that is all the wall time
+    the controller has between two step() calls. begin() and end()
+    bracket the controller's own work each step, not the time spent
+    inside step() waiting for Webots. A step whose CPU time exceeds the
+    budget is an overrun.
+
+    With adaptive set, the multiplier goes up by one when more than
+    raise_ratio of the last window steps overran, and back down (never
+    below its starting value) once the window's p99 CPU time fits in
+    lower_ratio of the smaller budget.
+    """
+
+    def __init__(self, basic_step, multiplier=1, adaptive=False, max_multiplier=8,
+                 window=200, raise_ratio=0.05, lower_ratio=0.5):
+        self.basic_step = basic_step
+        self.base_multiplier = multiplier
+        self.multiplier = multiplier
+        self.adaptive = adaptive
+        self.max_multiplier = max(multiplier, max_multiplier)
+        self.raise_ratio = raise_ratio
+        self.lower_ratio = lower_ratio
+        self._window = deque(maxlen=window)
+        self._cpu_start = 0.0
+        self._wall_start = 0.0
+        self.steps = 0
+        self.cpu_total = 0.0
+        self.cpu_max = 0.0
+        self.wall_total = 0.0
+        self.wall_max = 0.0
+        self.overruns = 0
+        self.wall_overruns = 0
+        self.rate_changes = 0
+
+    @property
+    def step_ms(self):
+        """Control step in milliseconds, a whole multiple of basicTimeStep."""
+        return self.basic_step * self.multiplier
+
+    def begin(self, started=None):
+        self._cpu_start = time.thread_time()
+        self._wall_start = time.perf_counter() if started is None else started
+
+    def end(self):
+        """Close the step's measurement. Returns True if the control step changed."""
+        cpu = time.thread_time() - self._cpu_start
+        wall = time.perf_counter() - self._wall_start
+        budget = self.step_ms / 1000.0
+        self.steps += 1
+        self.cpu_total += cpu
+        self.wall_total += wall
+        self.cpu_max = max(self.cpu_max, cpu)
+        self.wall_max = max(self.wall_max, wall)
+        self._window.append(cpu)
+        STEP_SECONDS.observe(cpu, clock="cpu")
+        STEP_SECONDS.observe(wall, clock="wall")
+        if wall > budget:
+            self.wall_overruns += 1
+        if cpu > budget:
+            self.overruns += 1
+            STEP_OVERRUNS.inc()
+            if self.overruns == 1 or self.overruns % 100 == 0:
+                log.warning("⚠️ Step overran its %s ms budget: %.1f ms CPU (%d overruns in %d steps)",
+                            self.step_ms, 1000 * cpu, self.overruns, self.steps)
+        if self.adaptive and len(self._window) == self._window.maxlen:
+            return self._adapt(budget)
+        return False
+
+    def _adapt(self, budget):
+        window = sorted(self._window)
+        overran = sum(1 for cpu in window if cpu > budget)
+        if overran > self.raise_ratio * len(window) and self.multiplier < self.max_multiplier:
+            self._set_multiplier(self.multiplier + 1)
+            return True
+        p99 = window[int(len(window) * 0.99)]
+        smaller = self.basic_step * (self.multiplier - 1) / 1000.0
+        if self.multiplier > self.base_multiplier and p99 < self.lower_ratio * smaller:
+            self._set_multiplier(self.multiplier - 1)
+            return True
+        return False
+
+    def _set_multiplier(self, multiplier):
+        self.multiplier = multiplier
+        self.rate_changes += 1
+        self._window.clear()
+        log.info("⏱️ Control step is now %s ms (%d x %s ms)", self.step_ms, multiplier, self.basic_step)
+
+    def stats(self):
+        window = sorted(self._window)
+        steps = self.steps or 1
+        return {
+            "basic_step_ms": self.basic_step,
+            "multiplier": self.multiplier,
+            "step_ms": self.step_ms,
+            "adaptive": self.adaptive,
+            "steps": self.steps,
+            "cpu_avg_ms": round(1000 * self.cpu_total / steps, 3),
+            "cpu_p99_ms": round(1000 * window[int(len(window) * 0.99)], 3) if window else 0.0,
+            "cpu_max_ms": round(1000 * self.cpu_max, 3),
+            "wall_avg_ms": round(1000 * self.wall_total / steps, 3),
+            "wall_max_ms": round(1000 * self.wall_max, 3),
+            "budget_used": round(self.cpu_total / steps / (self.step_ms / 1000.0), 4),
+            "overruns": self.overruns,
+            "wall_overruns": self.wall_overruns,
+            "rate_changes": self.rate_changes,
+        }
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import REGISTRY
+
+TASK_API_SECONDS = REGISTRY.histogram("deskbuddy_task_api_request_seconds",
+                                      "Task service round trips, by operation", ["op"])
+TASK_API_ERRORS = REGISTRY.counter("deskbuddy_task_api_errors_total",
+                                   "Task service calls that failed or returned 5xx, by operation", ["op"])
+
+
+class TaskApiClient:
+    """Keep-alive HTTP client for the external task service.
+
+    All task-sync paths share one requests.Session, so connections are
+    pooled and reused instead of opened per call. Connection errors and
+    gateway errors are retried with exponential backoff.
+    """
+
+    def __init__(self, base_url, pool_size=4, retries=3, backoff=0.3, timeout=5):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "PUT", "DELETE"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+
+    def _request(self, op, method, path="", **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = self.session.request(method, self.base_url + path, **kwargs)
+            ok = response.status_code < 500
+            return response
+        finally:
+            self._record(op, time.perf_counter() - start, ok)
+
+    def _record(self, op, elapsed, ok):
+        TASK_API_SECONDS.observe(elapsed, op=op)
+        if not ok:
+            TASK_API_ERRORS.inc(op=op)
+        with self._stats_lock:
+            s = self._stats.setdefault(op, {"calls": 0, "errors": 0, "total": 0.0, "max": 0.0})
+            s["calls"] += 1
+            if not ok:
+                s["errors"] += 1
+            s["total"] += elapsed
+            s["max"] = max(s["max"], elapsed)
+
+    def list_tasks(self, **kwargs):
+        return self._request("list", "GET", **kwargs)
+
+    def create_task(self, task):
+        return self._request("create", "POST", json=task)
+
+    def create_tasks(self, tasks):
+        """Create many tasks in one request, falling back to one POST each.
+
+        Returns one response per task, in order. Without a bulk route the
+        POSTs stop at the first 5xx or connection error, and the tasks
+        after it get no response, so the list can be shorter than tasks.
+        A connection error on the first POST is raised.
+        """
+        response = self._request("create_bulk", "POST", "/bulk", json=tasks, timeout=2 * self.timeout)
+        if response.status_code not in (404, 405):
+            return [response] * len(tasks)
+        # Task service without a bulk route.
+        responses = []
+        for task in tasks:
+            try:
+                response = self.create_task(task)
+            except requests.RequestException:
+                if not responses:
+                    raise
+                break
+            responses.append(response)
+            if response.status_code >= 500:
+                break
+        return responses
+
+    def delete_task(self, task_id):
+        return self._request("delete", "DELETE", f"/{task_id}")
+
+    def clear_tasks(self):
+        return self._request("clear", "DELETE")
+
+    def stats(self):
+        """Per-operation call counts and latency in milliseconds."""
+        with self._stats_lock:
+            return {
+                op: {
+                    "calls": s["calls"],
+                    "errors": s["errors"],
+                    "avg_ms": round(1000 * s["total"] / s["calls"], 3),
+                    "max_ms": round(1000 * s["max"], 3),
+                }
+                for op, s in self._stats.items()
+            }
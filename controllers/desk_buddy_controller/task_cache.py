@@ -0,0 +1,143 @@
+import threading
+import time
+
+from async_log import get_logger
+
+log = get_logger("task_cache")
+
+
+class TaskCache:
+    """TTL cache of the task service's task list with stale-while-revalidate.
+
+    get() never touches the network: when the cached list is older than the
+    TTL it starts one background refresh and returns immediately. Refreshes
+    are conditional (If-None-Match / If-Modified-Since), so an unchanged list
+    costs the service a 304. However many clients poll, at most one refresh
+    runs per TTL interval.
+
+    generation() names the local state a fetch starts from (see
+    TaskSyncQueue.generation). on_update(tasks, generation) gets the value
+    read before the request and returns False when the list is already
+    outdated; the list is then dropped and the next get() fetches again.
+    """
+
+    def __init__(self, client, ttl=10.0, on_update=None, submit=None, generation=None):
+        self.client = client
+        self.ttl = ttl
+        self.on_update = on_update
+        self.generation = generation
+        # submit(func) runs func in the background; returns falsy if it refused.
+        self.submit = submit or self._spawn
+        self.tasks = None
+        self.etag = None
+        self.last_modified = None
+        self.fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.hits = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.discarded = 0
+
+    def get(self):
+        """Cached server task list (None before the first successful fetch)."""
+        with self._lock:
+            fresh = time.monotonic() - self.fetched_at < self.ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            tasks = self.tasks
+        if not fresh:
+            self.refresh_async()
+        return tasks
+
+    def invalidate(self):
+        """Force the next get() to revalidate against the service."""
+        with self._lock:
+            self.fetched_at = 0.0
+
+    def refresh_async(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        if not self.submit(self._refresh):
+            with self._lock:
+                self._refreshing = False
+
+    @staticmethod
+    def _spawn(func):
+        thread = threading.Thread(target=func, name="task-cache-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    def refresh(self):
+        """Revalidate now, blocking the caller. Returns the cached list."""
+        with self._lock:
+            if self._refreshing:
+                return self.tasks
+            self._refreshing = True
+        self._refresh()
+        return self.tasks
+
+    def _refresh(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        started = self.generation() if self.generation else None
+        try:
+            response = self.client.list_tasks(headers=headers)
+            if response.status_code == 304:
+                with self._lock:
+                    self.not_modified += 1
+                    if started == (self.generation() if self.generation else None):
+                        self.fetched_at = time.monotonic()
+                return
+            if response.status_code != 200:
+                self._record_error()
+                return
+            tasks = response.json()
+            if self.on_update and self.on_update(tasks, started) is False:
+                with self._lock:
+                    self.discarded += 1
+                    self.fetched_at = 0.0
+                log.info("🌐 Dropped a task list fetched before the last sync")
+                return
+            with self._lock:
+                self.tasks = tasks
+                self.etag = response.headers.get("ETag")
+                self.last_modified = response.headers.get("Last-Modified")
+                self.fetched_at = time.monotonic()
+                self.refreshes += 1
+            log.info("🌐 Fetched %d tasks from API", len(tasks))
+        except Exception as e:
+            self._record_error()
+            log.warning("🚫 Using local tasks: %s", e)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _record_error(self):
+        with self._lock:
+            self.errors += 1
+            # Back off for a full TTL instead of retrying on every get().
+            self.fetched_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            age = time.monotonic() - self.fetched_at if self.fetched_at else None
+            return {
+                "ttl": self.ttl,
+                "age_s": round(age, 3) if age is not None else None,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "refreshes": self.refreshes,
+                "not_modified": self.not_modified,
+                "errors": self.errors,
+                "discarded": self.discarded,
+            }
@@ -0,0 +1,378 @@
+import bisect
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from async_log import get_logger
+from task_store import assign_id, parse_due
+
+log = get_logger("task_db")
+
+# Sort key of tasks without a usable date/time: after every dated task.
+UNDATED = datetime.max.isoformat()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id      TEXT PRIMARY KEY,
+    due     TEXT NOT NULL,
+    seq     INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    name    TEXT,
+    date    TEXT,
+    time    TEXT,
+    created TEXT,
+    type    TEXT,
+    extra   TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_due ON tasks (due, seq);
+CREATE INDEX IF NOT EXISTS tasks_version ON tasks (version);
+CREATE TABLE IF NOT EXISTS removed (
+    id      TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS removed_version ON removed (version);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+# Task fields with their own column; any others are kept as JSON in "extra".
+FIELDS = ("name", "date", "time", "created", "type")
+COLUMNS = "id, " + ", ".join(FIELDS) + ", extra"
+
+
+def _encode(task):
+    """Column values (id, *FIELDS, extra) for a task. Non-string fields go to extra, so None stays None."""
+    values = [task["id"]]
+    extra = {}
+    for field in FIELDS:
+        value = task.get(field)
+        if field in task and not isinstance(value, str):
+            extra[field] = value
+            value = None
+        values.append(value)
+    extra.update((k, v) for k, v in task.items() if k != "id" and k not in FIELDS)
+    values.append(json.dumps(extra, sort_keys=True) if extra else None)
+    return tuple(values)
+
+
+def _decode(row):
+    """Task dict from column values (id, *FIELDS, extra)."""
+    task = {"id": row[0]}
+    for field, value in zip(FIELDS, row[1:-1]):
+        if value is not None:
+            task[field] = value
+    if row[-1] is not None:
+        task.update(json.loads(row[-1]))
+    return task
+
+
+class _Ids:
+    """The store's IDs as a container, for assign_id()."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __contains__(self, task_id):
+        return self.db.execute("SELECT 1 FROM tasks WHERE id = ?", (task_id,)).fetchone() is not None
+
+
+class SqliteTaskStore:
+    """Tasks persisted in SQLite, indexed by ID and ordered by due time.
+
+    Tasks survive restarts, so the controller starts with its reminders
+    even while the task service is down, and the service is only a sync
+    peer. The database runs in WAL mode. Each row holds the task's due
+    time and its usual fields (FIELDS) as columns, so rows become dicts
+    without JSON decoding; only other keys are kept as JSON in "extra".
+    The (due, seq) index answers upcoming and paged listings without
+    loading every task. Every task gets a stable string "id"
+    (assign_id). Every change bumps version, and changes(since) returns
+    only what changed after a version; versions carry over across
+    restarts.
+
+    Writes are batched: single-task changes share one transaction, which
+    is committed after batch_size changes or commit_interval seconds,
+    while bulk changes commit as they finish. Reads on the same
+    connection see uncommitted changes. Callers serialise access
+    (DeskBuddy.task_lock); an internal lock also covers the committer.
+    """
+
+    def __init__(self, path, batch_size=100, commit_interval=1.0, max_removed=1024):
+        self.path = path
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.max_removed = max_removed
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL with NORMAL syncs at checkpoints, not on every commit.
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._ids = _Ids(self._db)
+        self._pending = 0
+        self._batch_started = None
+        self.commits = 0
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        # A new database starts from the clock, so a version from another
+        # database falls below the horizon and gets a full reload.
+        self.version = meta.get("version") or int(time.time() * 1000)
+        self._horizon = meta.get("horizon", self.version)
+        self._seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM tasks").fetchone()[0]
+        self._stop = threading.Event()
+        self._committer = threading.Thread(target=self._run, name="task-db-commit", daemon=True)
+        self._committer.start()
+        log.info("🗄️ Task database %s: %d tasks", path, len(self))
+
+    # -----------------------
+    # Transactions
+    # -----------------------
+    def _begin(self):
+        if self._batch_started is None:
+            self._db.execute("BEGIN")
+            self._batch_started = time.monotonic()
+
+    def _wrote(self, changes, bulk=False):
+        self._pending += changes
+        if bulk or self._pending >= self.batch_size:
+            self._commit()
+
+    def _commit(self):
+        if self._batch_started is None:
+            return
+        self._prune_removed()
+        self._db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                             [("version", self.version), ("horizon", self._horizon)])
+        self._db.execute("COMMIT")
+        self._pending = 0
+        self._batch_started = None
+        self.commits += 1
+
+    def _run(self):
+        while not self._stop.wait(self.commit_interval / 2):
+            with self._lock:
+                started = self._batch_started
+                if started is not None and time.monotonic() - started >= self.commit_interval:
+                    try:
+                        self._commit()
+                    except sqlite3.Error as e:
+                        log.error("❌ Task database commit failed: %s", e)
+
+    def close(self):
+        self._stop.set()
+        self._committer.join()
+        with self._lock:
+            self._commit()
+            self._db.close()
+
+    # -----------------------
+    # Rows
+    # -----------------------
+    def _row(self, task):
+        self.version += 1
+        self._seq += 1
+        values = _encode(task)
+        return (values[0], parse_due(task).isoformat(), self._seq, self.version) + values[1:]
+
+    def _put(self, rows):
+        self._db.executemany(f"INSERT OR REPLACE INTO tasks (id, due, seq, version, {COLUMNS[4:]}) "
+                             f"VALUES (?, ?, ?, ?, {', '.join('?' * (len(FIELDS) + 1))})", rows)
+        self._db.executemany("DELETE FROM removed WHERE id = ?", [(row[0],) for row in rows])
+
+    def _delete(self, ids):
+        rows = []
+        for task_id in ids:
+            self.version += 1
+            rows.append((task_id, self.version))
+        self._db.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id, _ in rows])
+        self._db.executemany("INSERT OR REPLACE INTO removed (id, version) VALUES (?, ?)", rows)
+
+    def _prune_removed(self):
+        row = self._db.execute("SELECT version FROM removed ORDER BY version DESC LIMIT 1 OFFSET ?",
+                               (self.max_removed,)).fetchone()
+        if row is not None:
+            self._db.execute("DELETE FROM removed WHERE version <= ?", (row[0],))
+            self._horizon = max(self._horizon, row[0])
+
+    # -----------------------
+    # Changes
+    # -----------------------
+    def append(self, task):
+        with self._lock:
+            assign_id(task, self._ids)
+            self._begin()
+            self._put([self._row(task)])
+            self._wrote(1)
+        return task
+
+    def extend(self, tasks):
+        tasks = list(tasks)
+        with self._lock:
+            rows = []
+            for task in tasks:
+                assign_id(task, self._ids)
+                rows.append(self._row(task))
+            self._begin()
+            self._put(rows)
+            self._wrote(len(rows), bulk=len(rows) > 8)
+        return tasks
+
+    def replace(self, tasks):
+        """Adopt a full task list. Unchanged tasks keep their version. Returns the number of changes."""
+        incoming = {}
+        for task in tasks:
+            incoming[assign_id(task, incoming)] = task
+        with self._lock:
+            stored = {row[0]: row for row in self._db.execute(f"SELECT {COLUMNS} FROM tasks")}
+            gone = [task_id for task_id in stored if task_id not in incoming]
+            rows = [self._row(task) for task_id, task in incoming.items() if stored.get(task_id) != _encode(task)]
+            if not gone and not rows:
+                return 0
+            self._begin()
+            self._delete(gone)
+            self._put(rows)
+            self._wrote(len(gone) + len(rows), bulk=True)
+        return len(gone) + len(rows)
+
+    def merge(self, tasks, removed=()):
+        """Add or update tasks and delete the ids in removed; every other task is kept.
+
+        Used for lists from the task service, which may be empty or
+        partial, so a task missing from tasks is never deleted. Returns the
+        number of changes.
+        """
+        incoming = {}
+        for task in tasks:
+            incoming[assign_id(task, incoming)] = task
+        with self._lock:
+            stored = {row[0]: row for row in self._db.execute(f"SELECT {COLUMNS} FROM tasks")}
+            gone = [task_id for task_id in set(removed) if task_id in stored and task_id not in incoming]
+            rows = [self._row(task) for task_id, task in incoming.items() if stored.get(task_id) != _encode(task)]
+            if not gone and not rows:
+                return 0
+            self._begin()
+            self._delete(gone)
+            self._put(rows)
+            self._wrote(len(gone) + len(rows), bulk=True)
+        return len(gone) + len(rows)
+
+    def get(self, task_id):
+        with self._lock:
+            row = self._db.execute(f"SELECT {COLUMNS} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return _decode(row) if row is not None else None
+
+    def remove(self, task_id):
+        """Remove a task by ID. Returns the removed task, or None."""
+        with self._lock:
+            task = self.get(task_id)
+            if task is None:
+                return None
+            self._begin()
+            self._delete([task_id])
+            self._wrote(1)
+        return task
+
+    def update(self, task_id, changes):
+        """Replace fields of a task. Returns the new task dict, or None if there is no such task."""
+        with self._lock:
+            task = self.get(task_id)
+            if task is None:
+                return None
+            task.update(changes)
+            task["id"] = task_id
+            self._begin()
+            self._put([self._row(task)])
+            self._wrote(1)
+        return task
+
+    def clear(self):
+        with self._lock:
+            self._begin()
+            self._db.execute("DELETE FROM tasks")
+            self._db.execute("DELETE FROM removed")
+            self.version += 1
+            self._horizon = self.version
+            self._wrote(1, bulk=True)
+
+    def changes(self, since):
+        """(tasks changed, ids removed) after version since, or None if a full reload is needed."""
+        with self._lock:
+            if since < self._horizon or since > self.version:
+                return None
+            changed = [_decode(row) for row in self._db.execute(
+                f"SELECT {COLUMNS} FROM tasks WHERE version > ? ORDER BY version", (since,))]
+            removed = [task_id for task_id, in self._db.execute(
+                "SELECT id FROM removed WHERE version > ? ORDER BY version", (since,))]
+        return changed, removed
+
+    # -----------------------
+    # Queries
+    # -----------------------
+    def _query(self, where, args=(), order="due, seq", limit=None):
+        """(due, task) pairs for the rows matching where, at most limit of them."""
+        with self._lock:
+            rows = self._db.execute(f"SELECT due, {COLUMNS} FROM tasks WHERE {where} ORDER BY {order} LIMIT ?",
+                                    (*args, -1 if limit is None else limit)).fetchall()
+        return [(datetime.fromisoformat(row[0]), _decode(row[1:])) for row in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def all(self):
+        with self._lock:
+            rows = self._db.execute(f"SELECT {COLUMNS} FROM tasks ORDER BY due, seq").fetchall()
+        return [_decode(row) for row in rows]
+
+    def page(self, cursor=None, limit=50):
+        """Up to limit tasks in due order after cursor, and the cursor for the next page.
+
+        Cursors name a position, not an index, so pages stay consistent
+        while tasks are added or removed. Raises ValueError for a bad cursor.
+        """
+        after = ("", -1)
+        if cursor:
+            due, _, seq = cursor.rpartition("~")
+            try:
+                after = (datetime.fromisoformat(due).isoformat(), int(seq))
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid cursor '{cursor}'")
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT due, seq, {COLUMNS} FROM tasks WHERE (due, seq) > (?, ?) ORDER BY due, seq LIMIT ?",
+                (*after, limit + 1)).fetchall()
+        tasks = [_decode(row[2:]) for row in rows[:limit]]
+        if len(rows) <= limit:
+            return tasks, None
+        due, seq = rows[limit - 1][:2]
+        return tasks, f"{due}~{seq}"
+
+    def upcoming(self, now, k=None):
+        """The next k (default all) dated tasks due at or after now, soonest first, as (due, task)."""
+        return self._query("due >= ? AND due < ?", (now.isoformat(), UNDATED), limit=k)
+
+    def nearest(self, now):
+        """All tasks ordered by distance from now, as (due, task); undated tasks last.
+
+        One scan of the due index, then a walk outward from now's
+        position that merges the past and future halves.
+        """
+        entries = self._query("1")
+        dues = [due for due, _ in entries]
+        i = bisect.bisect_left(dues, now)
+        end = bisect.bisect_left(dues, datetime.max)
+        lo, hi = i - 1, i
+        ordered = []
+        while lo >= 0 or hi < end:
+            if hi >= end or (lo >= 0 and now - entries[lo][0] < entries[hi][0] - now):
+                ordered.append(entries[lo])
+                lo -= 1
+            else:
+                ordered.append(entries[hi])
+                hi += 1
+        ordered.extend(entries[end:])
+        return ordered
@@ -0,0 +1,28 @@
+import hashlib
+import json
+from datetime import datetime
+
+
+def parse_due(task):
+    """Due datetime of a task, or datetime.max when it has no usable date/time."""
+    try:
+        return datetime.strptime(f"{task.get('date', '')} {task.get('time', '00:00')}", "%Y-%m-%d %H:%M")
+    except Exception:
+        return datetime.max
+
+
+def assign_id(task, taken):
+    """Give task a stable string "id" not already in taken, unless it has one. Returns the id."""
+    if task.get("id") not in (None, ""):
+        task["id"] = str(task["id"])
+        return task["id"]
+    base = task.get("created")
+    if not base:
+        content = json.dumps([task.get("name"), task.get("date"), task.get("time")])
+        base = hashlib.sha1(content.encode()).hexdigest()[:12]
+    task_id, n = str(base), 1
+    while task_id in taken:
+        n += 1
+        task_id = f"{base}-{n}"
+    task["id"] = task_id
+    return task_id
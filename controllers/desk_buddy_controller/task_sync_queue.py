@@ -0,0 +1,260 @@
+import json
+import os
+import threading
+import time
+
+from async_log import get_logger
+
+log = get_logger("task_sync")
+
+
+def task_key(task):
+    """Identity used to match a local task with its pending sync operations."""
+    return task.get("id") or task.get("created")
+
+
+class TaskSyncQueue:
+    """Write-behind queue that pushes task changes to the task service.
+
+    Callers enqueue creates, deletes and clears and return immediately.
+    Every operation is appended to a local journal before it is queued, so
+    pending changes survive a restart. A background thread flushes batches
+    to the service and retries with backoff while it is unreachable.
+
+    Pending operations are coalesced: a delete cancels a still-pending
+    create of the same task, and a clear drops everything queued before it.
+
+    generation counts acknowledged batches. A server list fetched before
+    an acknowledgement may lack the change that overlay() no longer
+    holds, so overlay() refuses lists from an older generation.
+    """
+
+    def __init__(self, client, journal_path, batch_size=50, retry_interval=2.0, max_retry_interval=60.0,
+                 on_flush=None):
+        self.client = client
+        self.on_flush = on_flush
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self._cond = threading.Condition()
+        self._pending = []
+        self._inflight = set()
+        self._seq = 0
+        self._stop = False
+        self.flushed = 0
+        self.generation = 0
+        self.failures = 0
+        self.coalesced = 0
+        self.last_error = None
+        self._replay()
+        self._thread = threading.Thread(target=self._run, name="task-sync", daemon=True)
+        self._thread.start()
+
+    # -----------------------
+    # Journal
+    # -----------------------
+    def _replay(self):
+        if not os.path.exists(self.journal_path):
+            return
+        acked = set()
+        ops = []
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn write at the end of the file
+                if entry.get("op") == "ack":
+                    acked.update(entry.get("seqs", []))
+                else:
+                    ops.append(entry)
+        for entry in ops:
+            self._seq = max(self._seq, entry["seq"])
+            if entry["seq"] not in acked:
+                self._add(entry)
+        if ops:
+            log.info("📒 Restored %d pending task changes from journal", len(self._pending))
+
+    def _append_journal(self, entries):
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+
+    def _compact_journal(self):
+        """Rewrite the journal with only the operations still pending."""
+        tmp = self.journal_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in self._pending:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp, self.journal_path)
+
+    # -----------------------
+    # Enqueue
+    # -----------------------
+    def _add(self, entry):
+        op = entry["op"]
+        if op == "clear":
+            self.coalesced += len(self._pending)
+            self._pending = [entry]
+        elif op == "delete":
+            for i, pending in enumerate(self._pending):
+                if (pending["op"] == "create" and pending["seq"] not in self._inflight
+                        and task_key(pending["task"]) == entry["key"]):
+                    del self._pending[i]
+                    self.coalesced += 2
+                    return
+            self._pending.append(entry)
+        else:
+            self._pending.append(entry)
+
+    def _enqueue(self, entries):
+        with self._cond:
+            for entry in entries:
+                self._seq += 1
+                entry["seq"] = self._seq
+            self._append_journal(entries)
+            for entry in entries:
+                self._add(entry)
+            self._cond.notify()
+
+    def enqueue_create(self, task):
+        self._enqueue([{"op": "create", "task": task}])
+
+    def enqueue_creates(self, tasks):
+        self._enqueue([{"op": "create", "task": task} for task in tasks])
+
+    def enqueue_delete(self, key):
+        self._enqueue([{"op": "delete", "key": key}])
+
+    def enqueue_update(self, task):
+        """The service has no update route, so an update is a delete and a re-create."""
+        self._enqueue([{"op": "delete", "key": task_key(task)}, {"op": "create", "task": task}])
+
+    def enqueue_clear(self):
+        self._enqueue([{"op": "clear"}])
+
+    # -----------------------
+    # Views
+    # -----------------------
+    def overlay(self, server_tasks, generation=None):
+        """Apply still-pending local changes on top of a task list from the server.
+
+        With generation (read before the list was fetched), returns None
+        if a batch was acknowledged since then.
+        """
+        with self._cond:
+            if generation is not None and generation != self.generation:
+                return None
+            pending = list(self._pending)
+        tasks = list(server_tasks)
+        for entry in pending:
+            if entry["op"] == "clear":
+                tasks = []
+            elif entry["op"] == "delete":
+                tasks = [t for t in tasks if task_key(t) != entry["key"]]
+            else:
+                key = task_key(entry["task"])
+                if all(task_key(t) != key for t in tasks):
+                    tasks.append(entry["task"])
+        return tasks
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "flushed": self.flushed,
+                "coalesced": self.coalesced,
+                "failures": self.failures,
+                "last_error": self.last_error,
+            }
+
+    # -----------------------
+    # Flushing
+    # -----------------------
+    def _next_batch(self):
+        """Leading run of operations that can go out in one request."""
+        first = self._pending[0]
+        if first["op"] != "create":
+            return [first]
+        batch = []
+        for entry in self._pending:
+            if entry["op"] != "create" or len(batch) >= self.batch_size:
+                break
+            batch.append(entry)
+        return batch
+
+    def _send(self, batch):
+        """Push batch to the service. Returns the leading entries it is done with."""
+        op = batch[0]["op"]
+        if op == "clear":
+            responses = [self.client.clear_tasks()]
+        elif op == "delete":
+            response = self.client.delete_task(batch[0]["key"])
+            if response.status_code == 404:
+                return batch
+            responses = [response]
+        elif len(batch) == 1:
+            responses = [self.client.create_task(batch[0]["task"])]
+        else:
+            responses = self.client.create_tasks([entry["task"] for entry in batch])
+        done = []
+        for entry, response in zip(batch, responses):
+            if 400 <= response.status_code < 500:
+                # The service will never accept this change; drop it instead of retrying forever.
+                log.warning("⚠️ Task service rejected %s (%s), dropping it", op, response.status_code)
+            elif response.status_code >= 300:
+                break
+            done.append(entry)
+        return done
+
+    def _run(self):
+        delay = self.retry_interval
+        while True:
+            with self._cond:
+                while not self._pending and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                batch = self._next_batch()
+                self._inflight = {entry["seq"] for entry in batch}
+
+            try:
+                done = self._send(batch)
+                error = None if len(done) == len(batch) else "task service error"
+            except Exception as e:
+                done, error = [], str(e)
+
+            with self._cond:
+                self._inflight = set()
+                if done:
+                    # Only what the service accepted is acked; the rest is retried.
+                    sent = {entry["seq"] for entry in done}
+                    self._pending = [e for e in self._pending if e["seq"] not in sent]
+                    self.flushed += len(done)
+                    self.generation += 1
+                    if self._pending:
+                        self._append_journal([{"op": "ack", "seqs": sorted(sent)}])
+                    else:
+                        self._compact_journal()
+                if error is None:
+                    delay = self.retry_interval
+                else:
+                    self.failures += 1
+                    self.last_error = error
+            if done and self.on_flush:
+                self.on_flush()
+            if error is None:
+                continue
+            with self._cond:
+                log.warning("🚫 Task sync deferred (%s), retrying in %.0fs", error, delay)
+                deadline = time.monotonic() + delay
+                while not self._stop and time.monotonic() < deadline:
+                    self._cond.wait(deadline - time.monotonic())
+                delay = min(delay * 2, self.max_retry_interval)
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "controllers", "desk_buddy_controller"))
+
+from async_api_server import AsyncApiServer, on_loop  # noqa: E402
+
+
+class AsyncApiServerTest(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        thread = threading.current_thread
+        routes = {
+            ("POST", "/echo"): lambda req: ({"body": req.body.decode(), "thread": thread().name}, 200),
+            ("GET", "/slow"): lambda req: self.release.wait(5) and ({"slow": True}, 200),
+            ("GET", "/ping"): on_loop(lambda req: ({"thread": thread().name}, 200)),
+        }
+        self.server = AsyncApiServer(routes, "127.0.0.1", 0)
+
+    def _run(self, coro):
+        async def main():
+            server = await asyncio.start_server(self.server._handle_connection, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await coro(port)
+        return asyncio.run(main())
+
+    @staticmethod
+    async def _exchange(port, raw):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(raw)
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return data
+
+    def test_non_numeric_content_length_is_400(self):
+        raw = b"POST /echo HTTP/1.1\r\nContent-Length: ten\r\n\r\n"
+        data = self._run(lambda port: self._exchange(port, raw))
+        self.assertTrue(data.startswith(b"HTTP/1.1 400 "), data)
+
+    def test_chunked_body_is_411(self):
+        raw = b"POST /echo HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nhello\r\n0\r\n\r\n"
+        data = self._run(lambda port: self._exchange(port, raw))
+        self.assertTrue(data.startswith(b"HTTP/1.1 411 "), data)
+
+    def test_handlers_run_off_the_event_loop(self):
+        raw = b"POST /echo HTTP/1.1\r\nContent-Length: 2\r\nConnection: close\r\n\r\nhi"
+        data = self._run(lambda port: self._exchange(port, raw))
+        self.assertIn(b'"body": "hi"', data)
+        self.assertNotIn(b'"thread": "MainThread"', data)
+
+    def test_blocking_handler_does_not_stall_other_connections(self):
+        async def scenario(port):
+            slow = asyncio.ensure_future(self._exchange(port, b"GET /slow HTTP/1.1\r\nConnection: close\r\n\r\n"))
+            ping = await self._exchange(port, b"GET /ping HTTP/1.1\r\nConnection: close\r\n\r\n")
+            self.assertFalse(slow.done())
+            self.release.set()
+            return ping, await slow
+
+        ping, slow = self._run(scenario)
+        self.assertIn(b'"thread": "MainThread"', ping)
+        self.assertIn(b'"slow": true', slow)
+
+
+if __name__ == "__main__":
+    unittest.main()
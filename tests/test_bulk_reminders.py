@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "controllers", "desk_buddy_controller"))
+
+os.environ.setdefault("DESKBUDDY_MOCK", "1")
+import desk_buddy_controller as dbc  # noqa: E402
+
+
+class _Robot:
+    def __init__(self):
+        self.added = []
+
+    def add_reminders_bulk(self, texts):
+        self.added.extend(texts)
+        return [{"name": text} for text in texts]
+
+
+class ParseBulkRemindersTest(unittest.TestCase):
+    def test_json_array_unwraps_objects_like_ndjson(self):
+        items = ["standup at 9am", {"reminder_text": "call mom tomorrow"}]
+        from_json = dbc.parse_bulk_reminders(json.dumps(items), "application/json")
+        from_ndjson = dbc.parse_bulk_reminders("\n".join(json.dumps(i) for i in items), "application/x-ndjson")
+        self.assertEqual(from_json, ["standup at 9am", "call mom tomorrow"])
+        self.assertEqual(from_ndjson, from_json)
+
+    def test_wrapped_object(self):
+        body = json.dumps({"reminders": [{"reminder_text": "gym today"}]})
+        self.assertEqual(dbc.parse_bulk_reminders(body, "application/json"), ["gym today"])
+
+    def test_non_string_items_are_rejected(self):
+        for item in (None, 42, ["nested"], {"text": "no reminder_text key"}):
+            body = json.dumps([item])
+            with self.subTest(item=item):
+                with self.assertRaises(ValueError):
+                    dbc.parse_bulk_reminders(body, "application/json")
+                with self.assertRaises(ValueError):
+                    dbc.parse_bulk_reminders(body[1:-1], "application/x-ndjson")
+
+    def test_plain_lines(self):
+        self.assertEqual(dbc.parse_bulk_reminders("a\nb", "text/plain"), ["a", "b"])
+
+
+class BulkRemindersResponseTest(unittest.TestCase):
+    def setUp(self):
+        self.previous = dbc.robot_instance
+        self.robot = dbc.robot_instance = _Robot()
+
+    def tearDown(self):
+        dbc.robot_instance = self.previous
+
+    def test_null_item_is_a_400_and_adds_nothing(self):
+        payload, status = dbc.bulk_reminders_response('["pay rent", null]', "application/json")
+        self.assertEqual(status, 400)
+        self.assertIn("error", payload)
+        self.assertEqual(self.robot.added, [])
+
+    def test_object_items_are_added_by_text(self):
+        payload, status = dbc.bulk_reminders_response('[{"reminder_text": "pay rent"}]', "application/json")
+        self.assertEqual(status, 200)
+        self.assertEqual(self.robot.added, ["pay rent"])
+
+
+if __name__ == "__main__":
+    unittest.main()
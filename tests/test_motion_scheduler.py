@@ -0,0 +1,62 @@
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "controllers", "desk_buddy_controller"))
+
+os.environ.setdefault("DESKBUDDY_MOCK", "1")
+import desk_buddy_controller as dbc  # noqa: E402
+from motion_scheduler import MotionPlan, MotionScheduler  # noqa: E402
+from speech_queue import SpeechQueue  # noqa: E402
+
+
+class _Speaker:
+    def __init__(self):
+        self.spoken = []
+        self.speaking = False
+
+    def speak(self, text, volume):
+        self.spoken.append(text)
+        self.speaking = True
+
+    def isSpeaking(self):
+        return self.speaking
+
+
+class SequenceSpeechTest(unittest.TestCase):
+    def setUp(self):
+        self.speaker = _Speaker()
+        self.speech = SpeechQueue(self.speaker, lambda value: None)
+        bot = SimpleNamespace(speech=self.speech)
+        self.scheduler = MotionScheduler(lambda channel, value: dbc.DeskBuddy._apply_setpoint(bot, channel, value))
+
+    def test_cancelling_a_sequence_drops_its_queued_speech(self):
+        # Something long is already playing, so the sequence's line waits in the queue.
+        self.speech.say("a long announcement that is still playing")
+        self.speech.tick(0.0)
+        plan = MotionPlan("sequence").at(0.0, "speech", "step two").hold(2.0)
+        self.scheduler.submit(plan)
+        self.scheduler.tick(0.0)
+        self.assertEqual(self.speech.stats()["pending"], 1)
+
+        plan.cancel()
+        self.scheduler.tick(0.1)
+        self.speaker.speaking = False
+        for step in range(1, 5):
+            self.speech.tick(0.5 * step)
+        self.assertEqual(self.speaker.spoken, ["a long announcement that is still playing"])
+        self.assertEqual(plan.status, "cancelled")
+
+    def test_finished_sequence_speech_is_spoken(self):
+        plan = MotionPlan("sequence").at(0.0, "speech", "hello").hold(0.5)
+        self.scheduler.submit(plan)
+        self.scheduler.tick(0.0)
+        self.speech.tick(0.0)
+        self.scheduler.tick(1.0)
+        self.assertEqual(plan.status, "done")
+        self.assertEqual(self.speaker.spoken, ["hello"])
+
+
+if __name__ == "__main__":
+    unittest.main()
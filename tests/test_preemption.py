@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "controllers", "desk_buddy_controller"))
+
+os.environ.setdefault("DESKBUDDY_MOCK", "1")
+import desk_buddy_controller as dbc  # noqa: E402
+from action_executor import ActionExecutor, current_token  # noqa: E402
+from motion_scheduler import MotionPlan, MotionScheduler  # noqa: E402
+
+
+class PreemptOwnerlessPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.applied = []
+        self.ran = threading.Event()
+        scheduler = MotionScheduler(lambda channel, value: self.applied.append((channel, value)),
+                                    rest={"wheels": (0.0, 0.0), "leds": 0})
+        self.bot = SimpleNamespace(executor=ActionExecutor(), scheduler=scheduler)
+
+    def tearDown(self):
+        self.bot.executor.shutdown()
+
+    def _submit(self, resources, preempt=True):
+        return dbc.DeskBuddy.run_async(self.bot, self.ran.set, lane="wheels", name="forward",
+                                       resources=resources, preempt=preempt)
+
+    def test_preempt_cancels_a_plan_no_job_owns(self):
+        # Like all_actions or a /sequence: submitted with wait=False, so no job is left to cancel.
+        plan = MotionPlan("all_actions").at(0.0, "wheels", (2.0, 2.0)).at(5.0, "wheels", (0.0, 0.0))
+        self.bot.scheduler.submit(plan)
+        self.bot.scheduler.tick(0.0)
+        self.assertIsNotNone(self._submit(["wheels"]))
+        self.assertTrue(self.ran.wait(5))
+        self.bot.scheduler.tick(0.1)
+        self.assertTrue(plan.done.is_set())
+        self.assertEqual(plan.status, "cancelled")
+        self.assertEqual(self.applied, [("wheels", (2.0, 2.0)), ("wheels", (0.0, 0.0))])
+
+    def test_plans_on_other_channels_keep_running(self):
+        blink = self.bot.scheduler.submit(MotionPlan("blink").at(0.0, "leds", 1).hold(1.0))
+        self._submit(["wheels"])
+        self.bot.scheduler.tick(0.0)
+        self.assertFalse(blink.cancelled)
+
+    def test_without_preempt_plans_are_left_alone(self):
+        plan = self.bot.scheduler.submit(MotionPlan("drive").at(0.0, "wheels", (2.0, 2.0)).hold(5.0))
+        self._submit(["wheels"], preempt=False)
+        self.assertFalse(plan.cancelled)
+
+    def test_dance_does_not_claim_the_speech_leds(self):
+        dance = dbc.COMMANDS.get("dance").resources
+        speak = dbc.COMMANDS.get("speak").resources
+        self.assertFalse(set(dance) & set(speak))
+
+
+class StopWheelsTest(unittest.TestCase):
+    def setUp(self):
+        self.applied = []
+        scheduler = MotionScheduler(lambda channel, value: self.applied.append((channel, value)),
+                                    rest={"wheels": (0.0, 0.0)})
+        self.stopped = []
+        self.bot = SimpleNamespace(executor=ActionExecutor(), scheduler=scheduler,
+                                   stop=lambda: self.stopped.append(True))
+        self.bot.stop_wheels = lambda: dbc.DeskBuddy.stop_wheels(self.bot)
+
+    def tearDown(self):
+        self.bot.executor.shutdown()
+
+    def test_stop_wheels_cancels_the_patrol_driving_them(self):
+        started, cancelled = threading.Event(), threading.Event()
+
+        def patrol():
+            # Like patrol_mode: the job waits on its plan until cancelled.
+            current_token().on_cancel(cancelled.set)
+            started.set()
+            cancelled.wait(5)
+
+        job = self.bot.executor.submit(patrol, lane="wheels", name="patrol_mode", resources=["wheels"])
+        self.assertTrue(started.wait(5))
+        plan = MotionPlan("patrol_mode").at(0.0, "wheels", (2.0, 2.0)).at(2.0, "wheels", (2.0, 2.0)).hold(8.0)
+        self.bot.scheduler.submit(plan)
+        self.bot.scheduler.tick(0.0)
+
+        dbc.COMMANDS.dispatch(self.bot, "stop_wheels")
+        self.bot.scheduler.tick(2.0)
+        self.assertEqual(self.stopped, [True])
+        self.assertEqual(plan.status, "cancelled")
+        self.assertTrue(job.token.cancelled)
+        # The wheels went back to rest and the next keyframe never ran.
+        self.assertEqual(self.applied, [("wheels", (2.0, 2.0)), ("wheels", (0.0, 0.0))])
+
+
+if __name__ == "__main__":
+    unittest.main()
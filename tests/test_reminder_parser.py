@@ -0,0 +1,85 @@
+import os
+import sys
+import unittest
+from datetime import datetime
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "desk_buddy_controller"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from bench_reminder_parser import generate_corpus, legacy_parse  # noqa: E402
+from reminder_parser import ReminderParseCache, parse_reminder  # noqa: E402
+
+# A Wednesday, as in the parser benchmark.
+NOW = datetime(2025, 6, 11, 10, 30)
+
+
+class LegacyDifferenceTest(unittest.TestCase):
+    """Phrases the old parser mis-read because its patterns overlapped."""
+
+    def test_hh_mm_with_attached_am_pm(self):
+        cases = {
+            "reminder: pick up groceries 7:45am": ("pick up groceries", "2025-06-11", "07:45"),
+            "remind me to 7:45am team meeting tomorrow": ("to team meeting", "2025-06-12", "07:45"),
+            "reminder: 7:45am gym nov 21": ("gym", "2025-11-21", "07:45"),
+            "7:45am call mom 5-6": ("call mom", "2026-06-05", "07:45"),
+            "remind me to thursday water the plants 7:45am": ("to water the plants", "2025-06-12", "07:45"),
+            "submit report 11:05pm": ("submit report", "2025-06-11", "23:05"),
+        }
+        for phrase, expected in cases.items():
+            with self.subTest(phrase=phrase):
+                self.assertEqual(parse_reminder(phrase, NOW), expected)
+                # Legacy read "7:45am" as 45:00 and left "7:" in the name.
+                self.assertNotEqual(legacy_parse(phrase, NOW), expected)
+
+    def test_time_before_month_day(self):
+        cases = {
+            "gym at 10:15 nov 21": ("gym", "2025-11-21", "10:15"),
+            "remind me at 10:15 nov 21 review PR": ("review PR", "2025-11-21", "10:15"),
+        }
+        for phrase, expected in cases.items():
+            with self.subTest(phrase=phrase):
+                self.assertEqual(parse_reminder(phrase, NOW), expected)
+                # Legacy took the "15 nov" inside "10:15 nov 21" as the date.
+                self.assertEqual(legacy_parse(phrase, NOW)[1], "2025-11-15")
+
+    def test_corpus_differs_only_in_those_phrases(self):
+        for phrase in generate_corpus(3000):
+            if "7:45am" in phrase or "10:15 nov" in phrase:
+                continue
+            with self.subTest(phrase=phrase):
+                self.assertEqual(parse_reminder(phrase, NOW), legacy_parse(phrase, NOW))
+
+
+class ParseReminderTest(unittest.TestCase):
+    def test_dates(self):
+        cases = {
+            "call mom tomorrow at 5 pm": ("call mom", "2025-06-12", "17:00"),
+            "standup next week": ("standup", "2025-06-18", "12:00"),
+            "gym on next friday at 9am": ("gym", "2025-06-20", "09:00"),
+            "pay rent wednesday": ("pay rent", "2025-06-11", "12:00"),
+            "dentist 21st november": ("dentist", "2025-11-21", "12:00"),
+            "review PR 3 march 12 am": ("review PR", "2026-03-03", "00:00"),
+            "submit report 21/11": ("submit report", "2025-11-21", "12:00"),
+            "remind me": ("Reminder", "2025-06-11", "12:00"),
+        }
+        for phrase, expected in cases.items():
+            with self.subTest(phrase=phrase):
+                self.assertEqual(parse_reminder(phrase, NOW), expected)
+
+    def test_keeps_case_of_task_name(self):
+        self.assertEqual(parse_reminder("Call MOM at 3:30 pm", NOW), ("Call MOM", "2025-06-11", "15:30"))
+
+
+class ReminderParseCacheTest(unittest.TestCase):
+    def test_hits_share_normalized_key_and_reset_on_new_day(self):
+        cache = ReminderParseCache(maxsize=2)
+        self.assertEqual(cache.parse("gym  tomorrow", NOW), ("gym", "2025-06-12", "12:00"))
+        self.assertEqual(cache.parse("gym tomorrow", NOW), ("gym", "2025-06-12", "12:00"))
+        self.assertEqual(cache.parse("gym tomorrow", datetime(2025, 6, 12, 8, 0)), ("gym", "2025-06-13", "12:00"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["invalidations"]), (1, 2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
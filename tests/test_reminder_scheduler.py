@@ -0,0 +1,83 @@
+import os
+import sys
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "controllers", "desk_buddy_controller"))
+
+from reminder_scheduler import SLOTS, ReminderScheduler  # noqa: E402
+
+# Ticks are one minute, the resolution of task due times.
+MINUTE = 60.0
+START = datetime(2030, 1, 7, 9, 0).timestamp()
+
+
+def task(name, minutes):
+    due = datetime.fromtimestamp(START + minutes * MINUTE)
+    return {"id": name, "name": name, "date": due.strftime("%Y-%m-%d"), "time": due.strftime("%H:%M")}
+
+
+class TimerWheelTest(unittest.TestCase):
+    def setUp(self):
+        self.fired = []
+        self.wheel = ReminderScheduler(lambda t: self.fired.append(t["name"]), resolution=MINUTE)
+
+    def advance(self, minutes):
+        self.wheel.advance(START + minutes * MINUTE)
+
+    def test_fires_exactly_on_time_at_every_level_boundary(self):
+        # Last slot of a level, first slot of the next, and one past it, for levels 0 to 3.
+        edges = [SLOTS ** level for level in (1, 2, 3)]
+        offsets = [n + d for n in edges for d in (-1, 0, 1)]
+        self.wheel.schedule([task(f"t{n}", n) for n in offsets], START)
+        for n in offsets:
+            self.advance(n - 1)
+            self.assertNotIn(f"t{n}", self.fired, f"fired early at offset {n}")
+            self.advance(n)
+            self.assertEqual(self.fired[-1], f"t{n}", f"not fired at offset {n}")
+        self.assertEqual(self.fired, [f"t{n}" for n in offsets])
+        self.assertEqual(self.wheel.stats(), {"pending": 0, "fired": len(offsets)})
+
+    def test_one_big_advance_fires_everything_in_due_order(self):
+        offsets = [5, SLOTS + 3, SLOTS ** 2 + 7]
+        self.wheel.schedule([task(f"t{n}", n) for n in reversed(offsets)], START)
+        self.advance(SLOTS ** 2 + 10)
+        self.assertEqual(self.fired, [f"t{n}" for n in offsets])
+
+    def test_replace_cancels_missing_and_schedules_new(self):
+        self.wheel.schedule([task("a", 10), task("b", 100)], START)
+        self.wheel.replace([task("a", 10), task("c", 5000)], START)
+        self.assertEqual(self.wheel.stats()["pending"], 2)
+        self.advance(6000)
+        self.assertEqual(self.fired, ["a", "c"])
+
+    def test_replace_does_not_refire_or_duplicate(self):
+        self.wheel.replace([task("a", 10)], START)
+        self.wheel.replace([task("a", 10)], START)
+        self.advance(10)
+        self.wheel.replace([task("a", 10)], START + 10 * MINUTE)
+        self.advance(20)
+        self.assertEqual(self.fired, ["a"])
+
+    def test_moving_a_task_reschedules_it(self):
+        self.wheel.replace([task("a", 10)], START)
+        self.wheel.replace([task("a", SLOTS + 10)], START)
+        self.advance(SLOTS)
+        self.assertEqual(self.fired, [])
+        self.advance(SLOTS + 10)
+        self.assertEqual(self.fired, ["a"])
+
+    def test_overdue_beyond_grace_is_not_announced(self):
+        self.wheel.schedule([task("old", -10), task("recent", 0)], START + 30)
+        self.advance(1)
+        self.assertEqual(self.fired, ["recent"])
+
+    def test_cancel(self):
+        self.wheel.schedule([task("a", 3)], START)
+        self.wheel.cancel(task("a", 3))
+        self.advance(10)
+        self.assertEqual(self.fired, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
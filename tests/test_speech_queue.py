@@ -0,0 +1,138 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "controllers", "desk_buddy_controller"))
+
+from speech_queue import PRIORITY_HIGH, PRIORITY_LOW, SpeechQueue  # noqa: E402
+
+
+class _Speaker:
+    def __init__(self):
+        self.spoken = []
+        self.speaking = False
+
+    def speak(self, text, volume):
+        self.spoken.append(text)
+        self.speaking = True
+
+    def isSpeaking(self):
+        return self.speaking
+
+
+class _SilentSpeaker:
+    """A speaker without playback state, like a failed device lookup."""
+
+    def __init__(self):
+        self.spoken = []
+
+    def speak(self, text, volume):
+        self.spoken.append(text)
+
+    def isSpeaking(self):
+        raise RuntimeError("no playback state")
+
+
+class SpeechQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.speaker = _Speaker()
+        self.leds = []
+        self.speech = SpeechQueue(self.speaker, self.leds.append)
+
+    def finish(self, now):
+        """Let the current utterance be heard on one step, then stop speaking."""
+        self.speech.tick(now - 0.05)
+        self.speaker.speaking = False
+        self.speech.tick(now)
+
+    def test_identical_waiting_text_is_queued_once(self):
+        first = self.speech.say("water the  plants", PRIORITY_LOW)
+        second = self.speech.say("water the plants", PRIORITY_HIGH)
+        self.assertIs(first, second)
+        self.assertEqual(first.priority, PRIORITY_HIGH)
+        self.speech.tick(0.0)
+        self.finish(0.5)
+        self.assertEqual(self.speaker.spoken, ["water the plants"])
+        self.assertEqual(first.status, "done")
+        stats = self.speech.stats()
+        self.assertEqual((stats["deduped"], stats["spoken"], stats["speak_calls"]), (1, 1, 1))
+
+    def test_text_already_playing_is_queued_again(self):
+        self.speech.say("hello")
+        self.speech.tick(0.0)
+        again = self.speech.say("hello")
+        self.assertEqual(again.status, "queued")
+        self.finish(0.5)
+        self.finish(1.0)
+        self.assertEqual(self.speaker.spoken, ["hello", "hello"])
+
+    def test_short_same_priority_utterances_merge_into_one_speak(self):
+        parts = [self.speech.say(text) for text in ("Task one", "Task two!", "Task three")]
+        self.speech.tick(0.0)
+        self.assertEqual(self.speaker.spoken, ["Task one. Task two! Task three."])
+        self.finish(0.5)
+        self.assertTrue(all(u.status == "done" for u in parts))
+        stats = self.speech.stats()
+        self.assertEqual((stats["merged"], stats["spoken"], stats["speak_calls"]), (2, 3, 1))
+
+    def test_merge_stops_at_priority_change_and_long_text(self):
+        long_text = "a reminder that is far too long to be merged with the short ones around it"
+        self.speech.say("low one", PRIORITY_LOW)
+        self.speech.say("urgent", PRIORITY_HIGH)
+        self.speech.say("also urgent", PRIORITY_HIGH)
+        self.speech.say(long_text, PRIORITY_LOW)
+        self.speech.tick(0.0)
+        for step in range(1, 4):
+            self.finish(step * 0.5)
+        self.assertEqual(self.speaker.spoken, ["urgent. also urgent.", "low one", long_text])
+
+    def test_playback_ends_when_the_speaker_stops(self):
+        utterance = self.speech.say("one two")
+        self.speech.tick(0.0)
+        # Far past any word-count estimate, but the speaker is still talking.
+        for now in (1.0, 5.0, 20.0):
+            self.speech.tick(now)
+            self.assertEqual(utterance.status, "playing")
+        self.finish(20.1)
+        self.assertEqual(utterance.status, "done")
+        self.assertEqual(self.leds[-1], 0)
+
+    def test_next_utterance_starts_as_soon_as_speaking_stops(self):
+        self.speech.say("a fairly long sentence with quite a few words in it to read out")
+        self.speech.say("b" * 70)
+        self.speech.tick(0.0)
+        self.finish(0.2)
+        self.assertEqual(len(self.speaker.spoken), 2)
+
+    def test_never_heard_speaking_ends_after_one_second(self):
+        utterance = self.speech.say("hi")
+        self.speech.tick(0.0)
+        self.speaker.speaking = False
+        self.speech.tick(0.5)
+        self.assertEqual(utterance.status, "playing")
+        self.speech.tick(1.0)
+        self.assertEqual(utterance.status, "done")
+
+    def test_without_playback_state_ends_at_the_deadline(self):
+        speech = SpeechQueue(_SilentSpeaker(), lambda value: None)
+        utterance = speech.say("one two three")
+        speech.tick(0.0)
+        speech.tick(2.9)
+        self.assertEqual(utterance.status, "playing")
+        speech.tick(3.0)
+        self.assertEqual(utterance.status, "done")
+
+    def test_clear_cancels_waiting_but_not_playing(self):
+        playing = self.speech.say("x" * 70)
+        self.speech.tick(0.0)
+        waiting = self.speech.say("later")
+        self.assertEqual(self.speech.clear(), 1)
+        self.assertEqual(waiting.status, "cancelled")
+        self.finish(0.5)
+        self.speech.tick(1.0)
+        self.assertEqual(playing.status, "done")
+        self.assertEqual(self.speaker.spoken, ["x" * 70])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import os
+import sqlite3
+import sys
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "controllers", "desk_buddy_controller"))
+
+from task_db import SqliteTaskStore  # noqa: E402
+
+
+class UpcomingTest(unittest.TestCase):
+    def setUp(self):
+        self.store = SqliteTaskStore(":memory:")
+        tasks = [{"name": f"t{day}", "date": f"2030-01-0{day}", "time": "09:00"} for day in range(1, 6)]
+        self.store.replace(tasks + [{"name": "undated"}])
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_limit_is_applied(self):
+        upcoming = self.store.upcoming(datetime(2030, 1, 2), 2)
+        self.assertEqual([task["name"] for _, task in upcoming], ["t2", "t3"])
+
+    def test_no_limit_returns_every_dated_task(self):
+        upcoming = self.store.upcoming(datetime(2029, 1, 1))
+        self.assertEqual([task["name"] for _, task in upcoming], ["t1", "t2", "t3", "t4", "t5"])
+
+    def test_limit_only_binds_integers(self):
+        with self.assertRaises(sqlite3.Error):
+            self.store.upcoming(datetime(2029, 1, 1), "1; DROP TABLE tasks")
+        self.assertEqual(len(self.store), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
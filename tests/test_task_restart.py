@@ -0,0 +1,98 @@
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "desk_buddy_controller"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+os.environ.setdefault("DESKBUDDY_MOCK", "1")
+import desk_buddy_controller as dbc  # noqa: E402
+from stub_task_service import StubTaskService  # noqa: E402
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class RestartAgainstEmptyServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp(prefix="deskbuddy-test-")
+        self.service = StubTaskService().start()
+        self._saved = dbc.TASK_API_URL, dbc.TASK_JOURNAL, dbc.TASK_DB
+        dbc.TASK_API_URL = self.service.url
+        dbc.TASK_JOURNAL = os.path.join(self.data_dir, "task_journal.jsonl")
+        dbc.TASK_DB = os.path.join(self.data_dir, "tasks.db")
+        self.bots = []
+
+    def tearDown(self):
+        for bot in self.bots:
+            self._shutdown(bot)
+        dbc.TASK_API_URL, dbc.TASK_JOURNAL, dbc.TASK_DB = self._saved
+        self.service.stop()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def _start(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            bot = dbc.DeskBuddy()
+        self.bots.append(bot)
+        self.assertTrue(wait_until(lambda: bot.task_cache.tasks is not None))
+        return bot
+
+    def _shutdown(self, bot):
+        if bot in self.bots:
+            self.bots.remove(bot)
+            bot.sync_queue.stop()
+            bot.tasks.close()
+            bot.executor.shutdown()
+
+    def _names(self, bot):
+        with bot.task_lock:
+            return [task["name"] for task in bot.tasks.all()]
+
+    def test_local_tasks_survive_an_empty_service(self):
+        bot = self._start()
+        bot.add_reminder_from_text("call mom tomorrow at 5pm")
+        self.assertTrue(wait_until(lambda: bot.sync_queue.stats()["pending"] == 0))
+        self.assertEqual(len(self.service.tasks), 1)
+        self._shutdown(bot)
+
+        # The service comes back with nothing, e.g. after losing its data.
+        with self.service.lock:
+            self.service.tasks = []
+        bot = self._start()
+        self.assertEqual(bot.task_cache.tasks, [])
+        bot.task_cache.refresh()
+        self.assertEqual(self._names(bot), ["call mom"])
+        self.assertEqual(bot.reminders.stats()["pending"], 1)
+
+    def test_server_tasks_are_merged_in(self):
+        bot = self._start()
+        bot.add_reminder_from_text("water plants tomorrow at 9am")
+        self.assertTrue(wait_until(lambda: bot.sync_queue.stats()["pending"] == 0))
+        with self.service.lock:
+            self.service.tasks = [{"id": "remote-1", "name": "from the phone", "date": "2030-01-01",
+                                   "time": "08:00"}]
+        bot.task_cache.refresh()
+        self.assertEqual(sorted(self._names(bot)), ["from the phone", "water plants"])
+
+    def test_tombstone_deletes_the_local_task(self):
+        bot = self._start()
+        task = bot.add_reminder_from_text("dentist tomorrow at 3pm")
+        self.assertTrue(wait_until(lambda: bot.sync_queue.stats()["pending"] == 0))
+        with self.service.lock:
+            self.service.tasks = [{"id": task["id"], "deleted": True}]
+        bot.task_cache.refresh()
+        self.assertEqual(self._names(bot), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
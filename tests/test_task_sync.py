@@ -0,0 +1,130 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "controllers", "desk_buddy_controller"))
+
+import requests  # noqa: E402
+from task_api_client import TaskApiClient  # noqa: E402
+from task_cache import TaskCache  # noqa: E402
+from task_sync_queue import TaskSyncQueue  # noqa: E402
+
+
+class _Response:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.headers = {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class _Service:
+    """Task service whose GET snapshots the list, then waits for release."""
+
+    def __init__(self):
+        self.tasks = []
+        self.listed = threading.Event()
+        self.release = threading.Event()
+
+    def list_tasks(self, headers=None):
+        snapshot = list(self.tasks)
+        self.listed.set()
+        self.release.wait(5)
+        return _Response(200, snapshot)
+
+    def create_task(self, task):
+        self.tasks.append(task)
+        return _Response(201)
+
+
+class StaleRefreshTest(unittest.TestCase):
+    def setUp(self):
+        self.service = _Service()
+        self.queue = TaskSyncQueue(self.service, os.path.join(tempfile.mkdtemp(), "journal.jsonl"))
+        self.applied = []
+        self.cache = TaskCache(self.service, on_update=self._on_update, generation=lambda: self.queue.generation)
+
+    def tearDown(self):
+        self.queue.stop()
+
+    def _on_update(self, tasks, generation):
+        merged = self.queue.overlay(tasks, generation)
+        if merged is None:
+            return False
+        self.applied.append(merged)
+
+    def test_list_fetched_before_a_flush_is_discarded(self):
+        refresh = threading.Thread(target=self.cache.refresh)
+        refresh.start()
+        self.assertTrue(self.service.listed.wait(5))
+        # The create is pushed and acknowledged while the GET is in flight.
+        self.queue.enqueue_create({"id": "a", "name": "pay rent"})
+        deadline = time.monotonic() + 5
+        while self.queue.stats()["pending"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.service.release.set()
+        refresh.join(5)
+        self.assertEqual(self.applied, [])
+        self.assertEqual(self.cache.discarded, 1)
+
+        self.cache.refresh()
+        self.assertEqual(self.applied, [[{"id": "a", "name": "pay rent"}]])
+
+
+class _NoBulkSession:
+    """requests.Session stand-in for a service without /bulk; statuses are answered in order."""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.posted = []
+
+    def request(self, method, url, json=None, **kwargs):
+        if url.endswith("/bulk"):
+            return _Response(404)
+        status = self.statuses.pop(0) if self.statuses else 201
+        if isinstance(status, Exception):
+            raise status
+        self.posted.append(json["name"])
+        return _Response(status)
+
+
+class CreateFallbackTest(unittest.TestCase):
+    def _client(self, statuses):
+        client = TaskApiClient("http://tasks.invalid/api/tasks")
+        client.session = _NoBulkSession(statuses)
+        return client
+
+    def test_stops_at_the_first_server_error(self):
+        client = self._client([201, 503, 201])
+        responses = client.create_tasks([{"name": "a"}, {"name": "b"}, {"name": "c"}])
+        self.assertEqual([r.status_code for r in responses], [201, 503])
+        self.assertEqual(client.session.posted, ["a", "b"])
+
+    def test_connection_error_after_a_success_reports_the_success(self):
+        client = self._client([201, requests.ConnectionError("reset")])
+        responses = client.create_tasks([{"name": "a"}, {"name": "b"}])
+        self.assertEqual([r.status_code for r in responses], [201])
+
+    def test_sync_queue_acks_only_accepted_tasks(self):
+        client = self._client([201, 503])
+        queue = TaskSyncQueue(client, os.path.join(tempfile.mkdtemp(), "journal.jsonl"), retry_interval=0.05)
+        try:
+            queue.enqueue_creates([{"id": "a", "name": "a"}, {"id": "b", "name": "b"}, {"id": "c", "name": "c"}])
+            deadline = time.monotonic() + 5
+            while queue.stats()["pending"] and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(queue.stats()["pending"], 0)
+            # "a" went through once; "b" failed and was retried with "c".
+            self.assertEqual(client.session.posted, ["a", "b", "b", "c"])
+            self.assertEqual(queue.stats()["failures"], 1)
+        finally:
+            queue.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()